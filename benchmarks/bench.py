@@ -0,0 +1,283 @@
+"""Offline benchmarks of the client against a local mock of the Twitter API
+
+Every scenario runs in a fresh process so that its peak RSS is its own, and
+reports pages/sec, tweets/sec and the time spent in each stage: HTTP,
+JSON decoding, model building and storage.
+
+    python -m benchmarks.bench --pages 50 --latency 0.005 --output results.json
+    python -m benchmarks.bench --compare results.json
+
+Cold import time is measured with `python -X importtime` and checked against
+`IMPORT_BUDGETS` with `--import-budget`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable
+
+from benchmarks.mock_api import FakeAPI, twitter_routes
+from search_client import SearchClient
+from search_client.database import save_to_db
+from search_client.models import parse_page
+from search_client.save import write_to_csv
+
+STAGES = ("http", "decode", "models", "storage")
+
+# seconds allowed for the cold import of each statement
+IMPORT_BUDGETS = {
+    "import search_client": 0.02,
+    "from search_client import SearchClient": 0.15,
+}
+
+
+class StageTimer:
+    """Accumulate the time spent in each stage, and keep the decoded search pages"""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = defaultdict(float)
+        self.pages: list[dict] = []
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            with self.stage(stage):
+                return fn(*args, **kwargs)
+
+        return timed
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+
+    def instrument(self, client: SearchClient) -> None:
+        client.transport.get = self.wrap("http", client.transport.get)
+        client.decoder.decode = self.wrap("decode", client.decoder.decode)
+        decode_search = self.wrap("decode", client.decoder.decode_search)
+
+        def keep(content):
+            page = decode_search(content)
+            self.pages.append(page)
+            return page
+
+        client.decoder.decode_search = keep
+
+    def build_models(self) -> int:
+        with self.stage("models"):
+            return sum(len(parse_page(page)) for page in self.pages)
+
+
+def bench_get_tweets(client: SearchClient, timer: StageTimer, config: dict, workdir: str) -> list[dict]:
+    return client.get_tweets(["python"], config["pages"] * 100)
+
+
+def bench_get_all_tweets(client: SearchClient, timer: StageTimer, config: dict, workdir: str) -> list[dict]:
+    return client.get_all_tweets(["python"], max_results=500, max_page=config["pages"], tweet_only=True)
+
+
+def bench_save_to_db(client: SearchClient, timer: StageTimer, config: dict, workdir: str) -> list[dict]:
+    tweets = bench_get_tweets(client, timer, config, workdir)
+    with timer.stage("storage"):
+        save_to_db(tweets, os.path.join(workdir, "tweets.db"))
+    return tweets
+
+
+def bench_write_to_csv(client: SearchClient, timer: StageTimer, config: dict, workdir: str) -> list[dict]:
+    tweets = bench_get_tweets(client, timer, config, workdir)
+    with timer.stage("storage"):
+        write_to_csv(tweets, os.path.join(workdir, "tweets.csv"))
+    return tweets
+
+
+SCENARIOS = {
+    "get_tweets": bench_get_tweets,
+    "get_all_tweets": bench_get_all_tweets,
+    "save_to_db": bench_save_to_db,
+    "write_to_csv": bench_write_to_csv,
+}
+
+
+def run_scenario(name: str, base_url: str, config: dict) -> dict:
+    """Run one scenario in the current process, meant to be called in a fresh one"""
+    with tempfile.TemporaryDirectory() as workdir, SearchClient(
+        "token", base_url=base_url, decoder=config["decoder"]
+    ) as client:
+        timer = StageTimer()
+        timer.instrument(client)
+        start = time.perf_counter()
+        tweets = SCENARIOS[name](client, timer, config, workdir)
+        timer.build_models()
+        seconds = time.perf_counter() - start
+
+    pages = len(timer.pages)
+    # kilobytes on Linux, bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+    return {
+        "name": name,
+        "decoder": client.decoder.name,
+        "pages": pages,
+        "tweets": len(tweets),
+        "seconds": round(seconds, 6),
+        "pages_per_sec": round(pages / seconds, 2),
+        "tweets_per_sec": round(len(tweets) / seconds, 2),
+        "peak_rss_mb": round(peak_rss, 2),
+        "stages": {stage: round(timer.seconds.get(stage, 0.0), 6) for stage in STAGES},
+    }
+
+
+def run(names: list[str], config: dict, repeat: int = 3) -> list[dict]:
+    """Best of `repeat` runs of every scenario, each run in a new process"""
+    routes = twitter_routes(
+        pages=config["pages"],
+        text_size=config["text_size"],
+        rate_limit=config["rate_limit"],
+    )
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with FakeAPI(routes, latency=config["latency"]) as api:
+        for name in names:
+            runs = []
+            for _ in range(repeat):
+                with ctx.Pool(1) as pool:
+                    runs.append(pool.apply(run_scenario, (name, api.base_url, config)))
+            results.append(min(runs, key=lambda r: r["seconds"]))
+    return results
+
+
+def import_time(statement: str, repeat: int = 3, cwd: str | None = None) -> float:
+    """Best cold import time of `statement` in seconds, over `repeat` fresh interpreters.
+
+    Only the modules of the package count, not the interpreter startup: the
+    cumulative times of the top-level `search_client` imports reported by
+    `-X importtime` are summed.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        stderr = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stderr
+        total = 0
+        for line in stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            _, cumulative, name = line[len("import time:") :].split("|")
+            # nested imports are indented under the module importing them
+            if name.startswith(" search_client") and cumulative.strip().isdigit():
+                total += int(cumulative)
+        best = min(best, total / 1e6)
+    return best
+
+
+def check_import_budgets(budgets: dict[str, float] = IMPORT_BUDGETS) -> list[str]:
+    """Statements whose cold import takes longer than their budget"""
+    over = []
+    for statement, budget in budgets.items():
+        seconds = import_time(statement)
+        print(f"{statement:<44}{seconds * 1000:>8.1f} ms  (budget {budget * 1000:.0f} ms)")
+        if seconds > budget:
+            over.append(statement)
+    return over
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Scenarios whose tweets/sec dropped by more than `threshold` (e.g. 0.1 for 10%)"""
+    previous = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    print(f"{'scenario':<16}{'baseline':>12}{'current':>12}{'change':>9}")
+    for result in current["results"]:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        change = result["tweets_per_sec"] / before["tweets_per_sec"] - 1
+        print(f"{result['name']:<16}{before['tweets_per_sec']:>12.0f}{result['tweets_per_sec']:>12.0f}{change:>+9.1%}")
+        if change < -threshold:
+            regressions.append(result["name"])
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)}, all of them if omitted")
+    parser.add_argument("--pages", type=int, default=20, help="pages of every search")
+    parser.add_argument("--text-size", type=int, default=140, help="characters in each tweet text")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--rate-limit", type=int, default=None, help="requests per window, sent as headers")
+    parser.add_argument("--decoder", default=None, help='"json", "orjson" or "msgspec", the fastest if omitted')
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every scenario, the best one is kept")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="results JSON of a previous commit to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="tweets/sec drop reported as a regression")
+    parser.add_argument("--import-budget", action="store_true", help="only check the cold import time budgets")
+    args = parser.parse_args(argv)
+    if args.import_budget:
+        over = check_import_budgets()
+        if over:
+            print("over budget:", ", ".join(over))
+            return 1
+        return 0
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios {sorted(unknown)}")
+
+    config = {
+        "pages": args.pages,
+        "text_size": args.text_size,
+        "latency": args.latency,
+        "rate_limit": args.rate_limit,
+        "decoder": args.decoder,
+    }
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": run(args.scenarios or list(SCENARIOS), config, args.repeat),
+    }
+
+    for result in report["results"]:
+        stages = " ".join(f"{k}={v:.3f}s" for k, v in result["stages"].items())
+        print(
+            f"{result['name']:<16}{result['pages_per_sec']:>9.1f} pages/s{result['tweets_per_sec']:>11.0f} tweets/s"
+            f"{result['peak_rss_mb']:>8.1f} MB  {stages}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print("regressions:", ", ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
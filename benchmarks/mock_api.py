@@ -0,0 +1,189 @@
+"""Local mock of the Twitter API, serves the benchmarks and the tests
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeAPI:
+    """Serve canned responses from a local HTTP/1.1 server.
+
+    Routes map a path (e.g. "/2/users/by") to a callable taking the parsed
+    query params and returning `(status, headers, body)`. Every response is
+    delayed by `latency` seconds to emulate the network.
+
+    >>> with FakeAPI({"/2/tweets": lambda params: (200, {}, {"data": []})}) as api:
+    ...     client = SearchClient("token", base_url=api.base_url)
+    """
+
+    def __init__(self, routes: dict | None = None, *, latency: float = 0) -> None:
+        self.routes = routes or {}
+        self.latency = latency
+        self.requests: list[tuple[str, dict, dict]] = []
+        self.connections: set = set()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/2"
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are written separately, avoid the delayed-ACK stall
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                parts = urlsplit(self.path)
+                params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                with api._lock:
+                    api.requests.append((parts.path, params, dict(self.headers)))
+                    api.connections.add(self.client_address)
+
+                if api.latency:
+                    time.sleep(api.latency)
+                route = api.routes.get(parts.path)
+                if route is None:
+                    status, headers, body = 404, {}, {"title": "Not Found Error"}
+                else:
+                    status, headers, body = route(params)
+
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for k, v in headers.items():
+                    self.send_header(k, str(v))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    def __enter__(self) -> FakeAPI:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_tweet(i: int, text_size: int = 140) -> dict:
+    """Tweet with the default fields of `SearchClient.get_tweets`, `text_size` characters long"""
+    return {
+        "id": str(i),
+        "text": (f"tweet {i} #python @TwitterDev " + "lorem ipsum " * (text_size // 12 + 1))[:text_size],
+        "author_id": str(i % 1000),
+        "conversation_id": str(i),
+        "created_at": "2022-01-01T00:00:00.000Z",
+        "in_reply_to_user_id": None,
+        "lang": "en",
+        "public_metrics": {"retweet_count": i % 7, "reply_count": i % 5, "like_count": i % 11, "quote_count": 0},
+        "entities": {"hashtags": [{"start": 10, "end": 17, "tag": "python"}]},
+    }
+
+
+def make_user(i: int) -> dict:
+    return {"id": str(i), "username": f"user{i}", "name": f"User {i}", "created_at": "2010-01-01T00:00:00.000Z"}
+
+
+def twitter_routes(
+    *,
+    pages: int = 10,
+    page_size: int | None = None,
+    text_size: int = 140,
+    rate_limit: int | None = None,
+    window: float = 900,
+) -> dict:
+    """Routes emulating the search, counts and lookup endpoints of the API.
+
+    Args:
+        pages (int, optional): pages of every search before `next_token` runs out. Defaults to 10.
+        page_size (int | None, optional): tweets per page, `max_results` if None. Defaults to None.
+        text_size (int, optional): characters in the text of every tweet. Defaults to 140.
+        rate_limit (int | None, optional):
+            requests per `window` of every endpoint, sent as x-rate-limit-* headers and
+            answered with 429 once used up. No headers if None. Defaults to None.
+        window (float, optional): rate-limit window in seconds. Defaults to 900.
+    """
+    budgets: dict[str, list] = {}
+    lock = threading.Lock()
+
+    def limited(name, route):
+        def wrapped(params):
+            if rate_limit is None:
+                return route(params)
+            with lock:
+                now = time.time()
+                budget = budgets.setdefault(name, [rate_limit, now + window])
+                if budget[1] <= now:
+                    budget[:] = [rate_limit, now + window]
+                budget[0] -= 1
+                remaining, reset = budget[0], budget[1]
+            headers = {
+                "x-rate-limit-limit": rate_limit,
+                "x-rate-limit-remaining": max(remaining, 0),
+                "x-rate-limit-reset": int(reset),
+            }
+            if remaining < 0:
+                return 429, headers, {"title": "Too Many Requests"}
+            status, extra, body = route(params)
+            return status, {**headers, **extra}, body
+
+        return wrapped
+
+    def search(params):
+        page = int(params.get("next_token", 0))
+        size = page_size or int(params.get("max_results", 10))
+        first = (pages - page) * size
+        data = [make_tweet(i, text_size) for i in range(first, first - size, -1)]
+        meta = {"result_count": size, "newest_id": data[0]["id"], "oldest_id": data[-1]["id"]}
+        if page + 1 < pages:
+            meta["next_token"] = str(page + 1)
+        body = {"data": data, "meta": meta}
+        if "author_id" in params.get("expansions", ""):
+            body["includes"] = {"users": [make_user(int(t["author_id"])) for t in data]}
+        return 200, {}, body
+
+    def counts(params):
+        page = int(params.get("next_token", 0))
+        data = [
+            {"start": f"2022-01-{d:02d}T00:00:00.000Z", "end": f"2022-01-{d + 1:02d}T00:00:00.000Z", "tweet_count": d}
+            for d in range(1, 31)
+        ]
+        meta = {"total_tweet_count": sum(b["tweet_count"] for b in data)}
+        if page + 1 < pages:
+            meta["next_token"] = str(page + 1)
+        return 200, {}, {"data": data, "meta": meta}
+
+    def tweets(params):
+        return 200, {}, {"data": [make_tweet(int(i), text_size) for i in params["ids"].split(",")]}
+
+    def users_by(params):
+        ids = itertools.count(1)
+        users = [{**make_user(next(ids)), "username": u} for u in params["usernames"].split(",")]
+        return 200, {}, {"data": users}
+
+    routes = {
+        "/2/tweets/search/recent": search,
+        "/2/tweets/search/all": search,
+        "/2/tweets/counts/all": counts,
+        "/2/tweets": tweets,
+        "/2/users/by": users_by,
+    }
+    return {path: limited(path, route) for path, route in routes.items()}
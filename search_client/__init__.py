@@ -1,3 +1,63 @@
-from search_client.client import SearchClient
+"""Client of the Twitter API v2 search endpoints
+
+`SearchClient` and the submodules are imported on first use, so importing the
+package is cheap and does no I/O: `.env` is only read when `constants.config`
+is first accessed.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from search_client.client import SearchClient
 
 __version__ = '0.1.0'
+__all__ = ["SearchClient"]
+
+# attribute -> submodule defining it
+_LAZY_ATTRS = {"SearchClient": "client"}
+_SUBMODULES = frozenset(
+    [
+        "archive",
+        "async_client",
+        "cache",
+        "client",
+        "coalesce",
+        "constants",
+        "conversation",
+        "counts",
+        "credentials",
+        "database",
+        "decode",
+        "field_enums",
+        "index",
+        "instrumentation",
+        "lookup",
+        "models",
+        "page",
+        "pipeline",
+        "plan",
+        "query",
+        "ratelimit",
+        "save",
+        "transport",
+        "url",
+        "watch",
+    ]
+)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(f"{__name__}.{_LAZY_ATTRS[name]}"), name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_LAZY_ATTRS, *_SUBMODULES])
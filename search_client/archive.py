@@ -0,0 +1,140 @@
+"""Time-sliced parallel crawler for /search/all
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+
+from search_client.client import SearchClient
+
+
+def plan_slices(
+    buckets: list[dict],
+    slices: int,
+    *,
+    start_time: dt.datetime | str | None = None,
+    end_time: dt.datetime | str | None = None,
+) -> list[tuple[str, str]]:
+    """Split a window into contiguous sub-ranges holding roughly equal volume.
+
+    Args:
+        buckets (list[dict]):
+            Count buckets (`start`, `end`, `tweet_count`) covering the window, oldest first.
+
+        slices (int):
+            Maximum number of sub-ranges to return.
+
+        start_time, end_time (dt.datetime | str | None, optional):
+            Replace the outer bounds of the first and last slice, since buckets are
+            aligned to the granularity and may not start exactly at the window bounds.
+
+    Returns:
+        list[tuple[str, str]]: (start, end) pairs, start is inclusive and end exclusive
+    """
+    if not buckets:
+        return []
+
+    total = sum(bucket["tweet_count"] for bucket in buckets)
+    if total == 0:
+        slices = 1
+    target = total / max(slices, 1)
+    ranges = []
+    start = buckets[0]["start"]
+    volume = 0
+    for i, bucket in enumerate(buckets):
+        volume += bucket["tweet_count"]
+        is_last = i == len(buckets) - 1
+        if is_last or (volume >= target * (len(ranges) + 1) and len(ranges) < slices - 1):
+            ranges.append((start, bucket["end"]))
+            start = bucket["end"]
+
+    if start_time is not None:
+        ranges[0] = (_isoformat(start_time), ranges[0][1])
+    if end_time is not None:
+        ranges[-1] = (ranges[-1][0], _isoformat(end_time))
+    return ranges
+
+
+def _isoformat(value: dt.datetime | str) -> str:
+    return value.isoformat() if isinstance(value, dt.datetime) else value
+
+
+class ArchiveCrawler:
+    """Crawl a long /search/all window as concurrent time slices.
+
+    The window is cut into slices of roughly equal volume using daily count
+    buckets, each slice follows its own `next_token` chain on a thread pool,
+    and results are merged and deduplicated by tweet id.
+
+    >>> crawler = ArchiveCrawler(client, slices=16, workers=8)
+    >>> tweets = crawler.crawl(["from:TwitterDev"], start_time="2015-01-01T00:00:00Z", end_time="2022-01-01T00:00:00Z")
+
+    Args:
+        client (SearchClient):
+            Client shared by every worker, its transport should pool at least `workers` connections.
+
+        slices (int, optional):
+            Number of sub-ranges to split the window into. Defaults to 8.
+
+        workers (int, optional):
+            Number of slices crawled at the same time. Defaults to 4.
+
+        granularity (str, optional):
+            Granularity of the count buckets used for planning. Defaults to "day".
+    """
+
+    def __init__(self, client: SearchClient, *, slices: int = 8, workers: int = 4, granularity: str = "day") -> None:
+        self.client = client
+        self.slices = slices
+        self.workers = workers
+        self.granularity = granularity
+
+    def plan(
+        self,
+        query: list[str],
+        start_time: dt.datetime | str,
+        end_time: dt.datetime | str,
+    ) -> list[tuple[str, str]]:
+        """Sub-ranges of the window sized from the count buckets of `query`"""
+        buckets = self.client.get_tweet_count_buckets(
+            query, granularity=self.granularity, start_time=start_time, end_time=end_time
+        )
+        return plan_slices(buckets, self.slices, start_time=start_time, end_time=end_time)
+
+    def _crawl_slice(self, query: list[str], start: str, end: str, kwargs: dict) -> list[dict]:
+        return list(self.client.iter_tweets(query, archive=True, start_time=start, end_time=end, **kwargs))
+
+    def iter_crawl(
+        self,
+        query: list[str],
+        start_time: dt.datetime | str,
+        end_time: dt.datetime | str,
+        **kwargs,
+    ) -> Iterator[dict]:
+        """Yield deduplicated tweets slice by slice as each slice finishes.
+
+        Extra keyword arguments are passed to `SearchClient.iter_tweets`.
+        """
+        kwargs.setdefault("max_results", 500)
+        ranges = self.plan(query, start_time, end_time)
+        seen = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._crawl_slice, query, start, end, kwargs) for start, end in ranges]
+            for future in as_completed(futures):
+                for tweet in future.result():
+                    if tweet["id"] not in seen:
+                        seen.add(tweet["id"])
+                        yield tweet
+
+    def crawl(
+        self,
+        query: list[str],
+        start_time: dt.datetime | str,
+        end_time: dt.datetime | str,
+        **kwargs,
+    ) -> list[dict]:
+        """Crawl the whole window and return deduplicated tweets, newest first"""
+        tweets = list(self.iter_crawl(query, start_time, end_time, **kwargs))
+        return sorted(tweets, key=lambda tweet: int(tweet["id"]), reverse=True)
@@ -0,0 +1,472 @@
+"""Asyncio counterpart of `SearchClient` built on aiohttp
+
+Requires the optional `aiohttp` dependency, `pip install search_client[async]`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as dt
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+from search_client.cache import cache_key
+from search_client.client import RETRY_STATUSES, APIError, SearchClient, as_pool, join_fields, search_params
+from search_client.coalesce import AsyncCoalescer
+from search_client.credentials import Credential, CredentialPool
+from search_client.decode import Decoder, get_decoder
+from search_client.page import Page
+from search_client.ratelimit import RateLimiter, endpoint_key
+from search_client.url import URL
+
+
+def clean_params(params: dict) -> dict:
+    """aiohttp only accepts str/int/float params, unlike requests it does not drop `None`"""
+    cleaned = {}
+    for k, v in params.items():
+        if v is None:
+            continue
+        if isinstance(v, (dt.datetime, dt.date)):
+            v = v.isoformat()
+        cleaned[k] = v if isinstance(v, (str, int, float)) else str(v)
+    return cleaned
+
+
+class AsyncSearchClient:
+    """Asyncio client mirroring the surface of `SearchClient`.
+
+    Many queries can run concurrently with `search_many`, all sharing one
+    `RateLimiter` so that throughput is bounded by the API quota.
+
+    >>> async with AsyncSearchClient("<your_token>") as client:
+    ...     results = await client.search_many([["from:TwitterDev"], ["from:Twitter"]], concurrency=8)
+
+    Args:
+        bearer_token (str | Iterable[str] | CredentialPool):
+            Bearer token used to authenticate every request, or several to load
+            balance them, see `SearchClient`.
+
+        base_url (str | None, optional):
+            Base URL of the API. Defaults to `SearchClient.BASE_URL`.
+
+        rate_limiter (RateLimiter | None, optional):
+            Per-endpoint rate-limit scheduler, may be shared with a `SearchClient`.
+            A new one is created if `None`. Only used with a single token. Defaults to None.
+
+        session (aiohttp.ClientSession | None, optional):
+            Session to send requests with, not closed by the client.
+            One with a pooled connector is created on first use if `None`. Defaults to None.
+
+        pool_maxsize (int, optional):
+            Maximum number of simultaneous connections. Defaults to 100.
+
+        timeout (float, optional):
+            Total timeout of a request in seconds. Defaults to 30.
+
+        sleep (Callable[[float], Awaitable], optional):
+            Used to wait for rate limits. Defaults to asyncio.sleep.
+
+        decoder (Decoder | str | None, optional):
+            JSON decoder of the response bodies, see `SearchClient`. Defaults to None.
+
+        coalescer (AsyncCoalescer | None, optional):
+            Makes concurrent identical requests share one response and overlapping
+            id lookups fetch each id once, see `SearchClient`. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        bearer_token: str | Iterable[str] | CredentialPool,
+        *,
+        base_url: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+        session: Any | None = None,
+        pool_maxsize: int = 100,
+        timeout: float = 30,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+        decoder: Decoder | str | None = None,
+        coalescer: AsyncCoalescer | None = None,
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError("AsyncSearchClient requires aiohttp, install it with `pip install search_client[async]`")
+
+        self.credentials = as_pool(bearer_token, rate_limiter)
+        self.bearer_token = self.credentials.credentials[0].token
+        self.headers = {"Authorization": f"Bearer {self.bearer_token}"}
+        self.base_url = URL(base_url) if base_url else SearchClient.BASE_URL
+        self.rate_limiter = self.credentials.credentials[0].rate_limiter
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.sleep = sleep
+        self.decoder = get_decoder(decoder)
+        self.coalescer = coalescer
+
+        self._owns_session = session is None
+        self.session = session
+
+    def _session(self):
+        # aiohttp sessions must be created inside a running event loop
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_maxsize),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self.session
+
+    async def _acquire(self, endpoint: str) -> Credential:
+        credential, delay = self.credentials.reserve(endpoint)
+        while credential is None:
+            await self.sleep(delay)
+            credential, delay = self.credentials.reserve(endpoint)
+        return credential
+
+    async def _get(self, url: URL, params: dict) -> dict:
+        """Decoded response of a GET request, shared with the identical requests in flight if coalescing"""
+        if self.coalescer is None:
+            return await self._fetch(url, params)
+        return await self.coalescer.do(cache_key(str(url), params), lambda: self._fetch(url, params))
+
+    async def _get_ids(self, url: URL, ids: str | list[str], params: dict) -> dict:
+        """Id lookup, merged with the lookups in flight if coalescing"""
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        if self.coalescer is None or not ids:
+            return await self._get(url, {**join_fields({"ids": ids}), **params})
+        return await self.coalescer.do_ids(
+            cache_key(str(url), params), ids, lambda chunk: self._get(url, {"ids": ",".join(chunk), **params})
+        )
+
+    async def _fetch(self, url: URL, params: dict) -> dict:
+        """Send a GET request to `url` with the token having the most rate-limit budget,
+        retrying 429 and 401 responses like `SearchClient._get`.
+        """
+        endpoint = endpoint_key(str(url))
+        params = clean_params(params)
+        credentials = self.credentials
+        attempt = 0
+        while True:
+            credential = await self._acquire(endpoint)
+            async with self._session().get(str(url), headers=credential.headers, params=params) as response:
+                credentials.update(credential, endpoint, response.headers)
+                delay = None
+                if response.status in RETRY_STATUSES and attempt < credentials.max_retries:
+                    delay = credentials.penalize(credential, endpoint, response.status, response.headers, attempt)
+                if delay is None:
+                    content = await response.read()
+                    if endpoint in SearchClient.SEARCH_ENDPOINTS:
+                        return self.decoder.decode_search(content)
+                    return self.decoder.decode(content)
+
+            if delay:
+                await self.sleep(delay)
+            attempt += 1
+
+    async def close(self) -> None:
+        """Close the session if it was created by this client"""
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self) -> AsyncSearchClient:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def get_users(
+        self,
+        usernames: list[str],
+        expansions: list[str] | None = None,
+        tweet_fields: list[str] | None = None,
+        user_fields: list[str] | None = None,
+    ) -> dict:
+        """Get multiple user information by usernames, see `SearchClient.get_users`"""
+        url = self.base_url / "users" / "by"
+        fields = {
+            "usernames": [usernames] if isinstance(usernames, str) else usernames,
+            "tweet.fields": tweet_fields,
+            "user.fields": user_fields,
+            "expansions": expansions,
+        }
+        return await self._get(url, join_fields(fields))
+
+    async def get_user(
+        self,
+        username: str,
+        expansions: list[str] | None = None,
+        tweet_fields: list[str] | None = None,
+        user_fields: list[str] | None = None,
+    ) -> dict:
+        """Get single user information by username, see `SearchClient.get_user`"""
+        url = self.base_url / "users" / "by" / "username" / username
+        fields = {
+            "tweet.fields": tweet_fields,
+            "user.fields": user_fields,
+            "expansions": expansions,
+        }
+        return await self._get(url, join_fields(fields))
+
+    async def get_tweet_info(
+        self,
+        tweet_id: str | list[str],
+        *,
+        expansions: list[str] | None = None,
+        media_fields: list[str] | None = None,
+        place_fields: list[str] | None = None,
+        poll_fields: list[str] | None = None,
+        tweet_fields: list[str] | None = None,
+        user_fields: list[str] | None = None,
+    ) -> dict:
+        """Get tweets by ids, see `SearchClient.get_tweet_info`"""
+        url = self.base_url / "tweets"
+        fields = {
+            "media.fields": media_fields,
+            "place.fields": place_fields,
+            "poll.fields": poll_fields,
+            "tweet.fields": tweet_fields,
+            "user.fields": user_fields,
+            "expansions": expansions,
+        }
+        return await self._get_ids(url, tweet_id, join_fields(fields))
+
+    async def _get_tweet(self, query: list[str], *, archive: bool = False, **params) -> dict:
+        """Single request to /search/recent or /search/all, see `SearchClient._get_tweet`"""
+        url = self.base_url / "tweets" / "search" / ("all" if archive else "recent")
+        return await self._get(url, search_params(query, **params))
+
+    async def iter_pages(
+        self,
+        query: list[str],
+        *,
+        archive: bool = False,
+        max_page: int | None = None,
+        limit: int | None = None,
+        cooldown: float = 0,
+        max_results: int = 10,
+        next_token: str | None = None,
+        **params,
+    ) -> AsyncIterator[Page]:
+        """Lazily paginate through a search, see `SearchClient.iter_pages`
+
+        >>> async for page in client.iter_pages(["from:TwitterDev"]):
+        ...     process(page.data, page.next_token)
+        """
+        number = 0
+        remaining = limit
+        while max_page is None or number < max_page:
+            if remaining is not None:
+                max_results = min(max_results, max(10, remaining))
+
+            response = await self._get_tweet(
+                query, archive=archive, max_results=max_results, next_token=next_token, **params
+            )
+            page = Page(response, number + 1)
+            if not page.data:
+                break
+
+            number += 1
+            yield page
+
+            if remaining is not None:
+                remaining -= len(page.data)
+
+            next_token = page.next_token
+            if not next_token or (remaining is not None and remaining <= 0):
+                break
+            if max_page is not None and number >= max_page:
+                break
+            if cooldown:
+                await self.sleep(cooldown)
+
+    async def iter_tweets(self, query: list[str], *, limit: int | None = None, **kwargs) -> AsyncIterator[dict]:
+        """Lazily yield tweets one by one, see `SearchClient.iter_tweets`"""
+        count = 0
+        async for page in self.iter_pages(query, limit=limit, **kwargs):
+            for tweet in page.data:
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield tweet
+
+    async def _search(
+        self,
+        query: list[str],
+        *,
+        archive: bool,
+        tweet_only: bool,
+        max_page: int | None,
+        **params,
+    ) -> list:
+        result = []
+        async for page in self.iter_pages(query, archive=archive, max_page=max_page, **params):
+            if tweet_only:
+                result.extend(page.data)
+            else:
+                result.append(page.response)
+        return result
+
+    async def get_all_tweets(
+        self,
+        query: list[str],
+        *,
+        cooldown: float = 0,
+        max_results: int = 10,
+        end_time: dt.datetime | None = None,
+        start_time: dt.datetime | None = None,
+        next_token: str | None = None,
+        since_id: str | None = None,
+        sort_order: str | None = None,
+        until_id: str | None = None,
+        expansions: list[str] | None = None,
+        media_fields: list[str] | None = None,
+        place_fields: list[str] | None = None,
+        poll_fields: list[str] | None = None,
+        tweet_fields: list[str] | None = None,
+        user_fields: list[str] | None = None,
+        tweet_only: bool = False,
+        max_page: int | None = 1,
+    ) -> list:
+        """Search /search/all, see `SearchClient.get_all_tweets`. Checkpoints are not supported."""
+        return await self._search(
+            query,
+            archive=True,
+            tweet_only=tweet_only,
+            max_page=max_page,
+            cooldown=cooldown,
+            max_results=max_results,
+            end_time=end_time,
+            start_time=start_time,
+            next_token=next_token,
+            since_id=since_id,
+            sort_order=sort_order,
+            until_id=until_id,
+            expansions=expansions,
+            media_fields=media_fields,
+            place_fields=place_fields,
+            poll_fields=poll_fields,
+            tweet_fields=tweet_fields,
+            user_fields=user_fields,
+        )
+
+    async def get_recent_tweets(
+        self,
+        query: list[str],
+        *,
+        cooldown: float = 0,
+        max_results: int = 10,
+        end_time: dt.datetime | None = None,
+        start_time: dt.datetime | None = None,
+        next_token: str | None = None,
+        since_id: str | None = None,
+        sort_order: str | None = None,
+        until_id: str | None = None,
+        expansions: list[str] | None = None,
+        media_fields: list[str] | None = None,
+        place_fields: list[str] | None = None,
+        poll_fields: list[str] | None = None,
+        tweet_fields: list[str] | None = None,
+        user_fields: list[str] | None = None,
+        tweet_only: bool = False,
+        max_page: int | None = 1,
+    ) -> list:
+        """Search /search/recent, see `SearchClient.get_recent_tweets`. Checkpoints are not supported."""
+        return await self._search(
+            query,
+            archive=False,
+            tweet_only=tweet_only,
+            max_page=max_page,
+            cooldown=cooldown,
+            max_results=max_results,
+            end_time=end_time,
+            start_time=start_time,
+            next_token=next_token,
+            since_id=since_id,
+            sort_order=sort_order,
+            until_id=until_id,
+            expansions=expansions,
+            media_fields=media_fields,
+            place_fields=place_fields,
+            poll_fields=poll_fields,
+            tweet_fields=tweet_fields,
+            user_fields=user_fields,
+        )
+
+    async def get_tweet_count(
+        self,
+        query: list[str],
+        *,
+        end_time: dt.datetime | None = None,
+        start_time: dt.datetime | None = None,
+        next_token: str | None = None,
+        since_id: str | None = None,
+        until_id: str | None = None,
+    ) -> int:
+        """Total number of tweets matching `query`, raises `APIError` on an error response,
+        see `SearchClient.get_tweet_count`
+        """
+        params = {
+            "query": " ".join(query),
+            "end_time": end_time,
+            "granularity": "day",
+            "next_token": next_token,
+            "since_id": since_id,
+            "start_time": start_time,
+            "until_id": until_id,
+        }
+        url = self.base_url / "tweets" / "counts" / "all"
+
+        total = 0
+        while True:
+            response = await self._get(url, params)
+            meta = response.get("meta")
+            if not meta:
+                raise APIError("counts/all", response.get("status"), response)
+            total += meta.get("total_tweet_count")
+            params["next_token"] = meta.get("next_token")
+            if not params["next_token"]:
+                break
+        return total
+
+    async def search_many(
+        self,
+        queries: list[list[str]],
+        *,
+        concurrency: int = 10,
+        archive: bool = False,
+        tweet_only: bool = True,
+        max_page: int | None = 1,
+        **params,
+    ) -> list[list]:
+        """Run many searches at once under the shared rate-limit budget.
+
+        Args:
+            queries (list[list[str]]):
+                Queries to run, each in the format accepted by `get_recent_tweets`.
+
+            concurrency (int, optional):
+                Maximum number of queries paginating at the same time. Defaults to 10.
+
+            archive (bool, optional):
+                Use /search/all instead of /search/recent. Defaults to False.
+
+            tweet_only (bool, optional):
+                Return tweets instead of raw pages. Defaults to True.
+
+            max_page (int | None, optional):
+                Maximum pages per query, `None` for every page. Defaults to 1.
+
+        Returns:
+            list[list]: Results of each query in the same order as `queries`
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(query: list[str]) -> list:
+            async with semaphore:
+                return await self._search(
+                    query, archive=archive, tweet_only=tweet_only, max_page=max_page, **params
+                )
+
+        return list(await asyncio.gather(*(run(q) for q in queries)))
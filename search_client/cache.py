@@ -0,0 +1,188 @@
+"""Response caches for user and tweet lookups
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+from urllib.parse import urlencode
+
+
+def cache_key(url: str, params: dict) -> str:
+    """Canonical key of a request, params are sorted and `None` values dropped
+
+    >>> cache_key("https://api.twitter.com/2/tweets", {"tweet.fields": "lang", "ids": "1"})
+    'https://api.twitter.com/2/tweets?ids=1&tweet.fields=lang'
+    """
+    items = sorted((k, str(v)) for k, v in params.items() if v is not None)
+    return f"{url}?{urlencode(items)}" if items else str(url)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class LRUCache:
+    """In-memory cache evicting the least recently used entry past `maxsize`
+    and expiring entries older than `ttl` seconds.
+
+    Values are returned as stored, do not mutate them.
+
+    Args:
+        maxsize (int, optional): maximum number of entries. Defaults to 1024.
+        ttl (float | None, optional): seconds an entry stays fresh, `None` to never expire. Defaults to 300.
+        clock (Callable[[], float], optional): Defaults to time.monotonic.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = 300, *, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._data: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= self.clock():
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = self.clock() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def invalidate(self, key: str | None = None, *, where: Callable[[str, Any], bool] | None = None) -> int:
+        """Drop `key`, or every entry for which `where(key, value)` is true, or everything.
+
+        Returns:
+            int: number of entries dropped
+        """
+        with self._lock:
+            if key is not None:
+                return 1 if self._data.pop(key, None) is not None else 0
+            keys = [k for k, (_, v) in self._data.items() if where is None or where(k, v)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """On-disk cache storing JSON responses in SQLite, shared between processes and runs.
+
+    Args:
+        path (str): database file
+        ttl (float | None, optional): seconds an entry stays fresh, `None` to never expire. Defaults to 86400.
+    """
+
+    def __init__(self, path: str, ttl: float | None = 86400) -> None:
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self.conn:
+            self.conn.execute("pragma journal_mode = wal")
+            self.conn.execute(
+                """\
+            create table if not exists Cache (
+                key text primary key,
+                value text not null,
+                expires_at real
+                );
+            """
+            )
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            row = self.conn.execute(
+                "select value from Cache where key = ? and (expires_at is null or expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock, self.conn:
+            self.conn.execute("insert or replace into Cache values (?, ?, ?)", (key, json.dumps(value), expires_at))
+
+    def invalidate(self, key: str | None = None, *, where: Callable[[str, Any], bool] | None = None) -> int:
+        """Drop `key`, or every entry for which `where(key, value)` is true, or everything"""
+        with self._lock, self.conn:
+            if key is not None:
+                return self.conn.execute("delete from Cache where key = ?", (key,)).rowcount
+            if where is None:
+                return self.conn.execute("delete from Cache").rowcount
+            keys = [(k,) for k, v in self.conn.execute("select key, value from Cache") if where(k, json.loads(v))]
+            self.conn.executemany("delete from Cache where key = ?", keys)
+            return len(keys)
+
+    def __len__(self) -> int:
+        return self.conn.execute("select count(*) from Cache").fetchone()[0]
+
+
+class TieredCache:
+    """In-memory tier in front of an on-disk tier, disk hits are promoted to memory
+
+    >>> cache = TieredCache(LRUCache(maxsize=10_000, ttl=600), SQLiteCache("cache.db"))
+    >>> client = SearchClient("<your_token>", cache=cache)
+    """
+
+    def __init__(self, memory: LRUCache, disk: SQLiteCache) -> None:
+        self.memory = memory
+        self.disk = disk
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Any | None:
+        value = self.memory.get(key)
+        if value is None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        self.memory.set(key, value, ttl)
+        self.disk.set(key, value, ttl)
+
+    def invalidate(self, key: str | None = None, *, where: Callable[[str, Any], bool] | None = None) -> int:
+        return max(self.memory.invalidate(key, where=where), self.disk.invalidate(key, where=where))
@@ -1,28 +1,333 @@
 from __future__ import annotations
 
 import datetime as dt
+import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
 
-import requests
-
-from search_client.constants import config
+from search_client.cache import LRUCache, SQLiteCache, TieredCache, cache_key
+from search_client.constants import DEFAULT_BASE_URL
+from search_client.credentials import CredentialPool
+from search_client.decode import Decoder, get_decoder, scan_next_token
 from search_client.field_enums import (
+    Expansions,
     MediaFields,
     PlaceFields,
     PollFields,
     TweetFields,
     UserFields,
 )
+from search_client.instrumentation import Event, Instrumentation
+from search_client.lookup import LookupResult, chunked, dedupe, merge_results
+from search_client.page import Page
+from search_client.plan import page_size
+from search_client.query import MAX_QUERY_LENGTH, Rule, RuleMatcher, pack_rules
+from search_client.ratelimit import RateLimiter, endpoint_key
 from search_client.url import URL
 
+if TYPE_CHECKING:
+    from search_client.coalesce import Coalescer
+    from search_client.counts import CountSeries, CountStore
+    from search_client.database import CheckpointStore
+    from search_client.transport import Transport
+    from search_client.watch import Watcher
+
+
+# responses retried, with another token if one is available
+RETRY_STATUSES = frozenset([401, 429])
+
+
+class APIError(Exception):
+    """Error response of the API, raised where stopping quietly would look like a complete result
+
+    Args:
+        endpoint (str): endpoint of the request, e.g. "search/all"
+        status (int | None): HTTP status of the response, None if only the body is known
+        response (dict): decoded body of the response
+    """
+
+    def __init__(self, endpoint: str, status: int | None, response: dict) -> None:
+        self.endpoint = endpoint
+        self.status = status
+        self.response = response
+        errors = response.get("errors") or [{}]
+        detail = response.get("detail") or response.get("title") or errors[0].get("message") or response
+        super().__init__(f"{endpoint} returned {status if status is not None else 'an error'}: {detail}")
+
+    @classmethod
+    def from_response(cls, endpoint: str, response) -> APIError:
+        try:
+            body = json.loads(response.content)
+        except ValueError:
+            body = {"detail": response.content[:200].decode("utf-8", "replace")}
+        return cls(endpoint, response.status_code, body if isinstance(body, dict) else {"detail": body})
+
+
+def as_pool(
+    bearer_token: str | Iterable[str] | CredentialPool,
+    rate_limiter: RateLimiter | None = None,
+) -> CredentialPool:
+    """Credential pool of one or many bearer tokens, `rate_limiter` paces a single token"""
+    if isinstance(bearer_token, CredentialPool):
+        return bearer_token
+    if isinstance(bearer_token, str):
+        return CredentialPool.from_token(bearer_token, rate_limiter)
+    return CredentialPool(bearer_token)
+
+
+def join_fields(fields: dict) -> dict:
+    """Turn list-valued request fields into comma-separated params, dropping empty ones"""
+    return {k: ",".join(v) for k, v in fields.items() if v}
+
+
+def search_params(
+    query: list[str],
+    *,
+    max_results: int = 10,
+    end_time: dt.datetime | None = None,
+    start_time: dt.datetime | None = None,
+    next_token: str | None = None,
+    since_id: str | None = None,
+    sort_order: str | None = None,
+    until_id: str | None = None,
+    expansions: list[str] | None = None,
+    media_fields: list[str] | None = None,
+    place_fields: list[str] | None = None,
+    poll_fields: list[str] | None = None,
+    tweet_fields: list[str] | None = None,
+    user_fields: list[str] | None = None,
+) -> dict:
+    """Build the query params of a /search/recent or /search/all request"""
+    fields = {
+        "media.fields": media_fields,
+        "place.fields": place_fields,
+        "poll.fields": poll_fields,
+        "tweet.fields": tweet_fields,
+        "user.fields": user_fields,
+        "expansions": expansions,
+    }
+    return {
+        **join_fields(fields),
+        "query": " ".join(query),
+        "max_results": max_results,
+        "end_time": end_time,
+        "next_token": next_token,
+        "since_id": since_id,
+        "sort_order": sort_order,
+        "start_time": start_time,
+        "until_id": until_id,
+    }
+
 
 class SearchClient:
 
-    BASE_URL: URL = URL(config.BASE_URL)
+    BASE_URL: URL = URL(DEFAULT_BASE_URL)
 
-    def __init__(self, bearer_token: str) -> None:
-        self.bearer_token = bearer_token
+    # lookups whose responses rarely change, search and counts are never cached
+    CACHED_ENDPOINTS = frozenset(["users/by", "users", "tweets"])
+    # decoded with `Decoder.decode_search`, possibly into typed structs
+    SEARCH_ENDPOINTS = frozenset(["search/recent", "search/all"])
+
+    def __init__(
+        self,
+        bearer_token: str | Iterable[str] | CredentialPool,
+        *,
+        transport: Transport | None = None,
+        base_url: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+        cache: LRUCache | SQLiteCache | TieredCache | None = None,
+        decoder: Decoder | str | None = None,
+        instrumentation: Instrumentation | None = None,
+        coalescer: Coalescer | None = None,
+    ) -> None:
+        """
+        Args:
+            bearer_token (str | Iterable[str] | CredentialPool):
+                Bearer token used to authenticate every request. With several tokens
+                each request is sent with the one having the most rate-limit budget
+                left, see `CredentialPool`.
+
+            transport (Transport | None, optional):
+                Connection-pooled transport shared by all endpoints. A default one is
+                created (and owned by the client) if `None`. Defaults to None.
+
+            base_url (str | None, optional):
+                Base URL of the API, e.g. a local stub server for tests.
+                Defaults to `SearchClient.BASE_URL`.
+
+            rate_limiter (RateLimiter | None, optional):
+                Per-endpoint rate-limit scheduler, share one between clients using the
+                same token. A new one is created if `None`. Only used with a single
+                token, every token of a pool has its own. Defaults to None.
+
+            cache (LRUCache | SQLiteCache | TieredCache | None, optional):
+                Cache for successful responses of the user and tweet lookup endpoints
+                (`CACHED_ENDPOINTS`), keyed by the canonical URL and params. Defaults to None.
+
+            decoder (Decoder | str | None, optional):
+                JSON decoder of the response bodies, "json", "orjson", "msgspec" or a `Decoder`,
+                e.g. `MsgspecDecoder(typed=True)` to decode search pages into typed structs.
+                The fastest installed one is used if `None`. Defaults to None.
+
+            instrumentation (Instrumentation | None, optional):
+                Receives request, decoding, rate-limit and retry events, and keeps
+                per-endpoint metrics. Disabled if `None`. Defaults to None.
+
+            coalescer (Coalescer | None, optional):
+                Makes concurrent identical requests (same canonical URL and params) share
+                one response, and overlapping tweet and user id lookups fetch each id once.
+                Disabled if `None`. Defaults to None.
+        """
+        self.credentials = as_pool(bearer_token, rate_limiter)
+        # the first token, kept for code written when a client had only one
+        self.bearer_token = self.credentials.credentials[0].token
         self.headers = {"Authorization": f"Bearer {self.bearer_token}"}
+        self.rate_limiter = self.credentials.credentials[0].rate_limiter
+        self.base_url = URL(base_url) if base_url else SearchClient.BASE_URL
+
+        # a transport passed in may be shared with other clients, `close` leaves it open
+        self._owns_transport = transport is None
+        if transport is None:
+            # imported here so that importing the client does not import requests
+            from search_client.transport import Transport
+
+            transport = Transport()
+        self.transport = transport
+        self.cache = cache
+        self.decoder = get_decoder(decoder)
+        self.instrumentation = instrumentation
+        self.coalescer = coalescer
+
+    def _get(self, url: URL, params: dict):
+        """Send a GET request to `url` through the shared transport.
+
+        Sends it with the token having the most budget for the endpoint, waiting
+        only if every token is exhausted. 429 responses are retried once the
+        rate-limit window resets (or right away with another token), 401
+        responses with another token.
+        """
+        endpoint = endpoint_key(str(url))
+        instrumentation = self.instrumentation
+        credentials = self.credentials
+        attempt = 0
+        while True:
+            if instrumentation is None:
+                credential, _ = credentials.acquire(endpoint)
+                response = self.transport.get(str(url), headers=credential.headers, params=params)
+            else:
+                credential, response = self._instrumented_get(instrumentation, endpoint, url, params)
+            credentials.update(credential, endpoint, response.headers)
+
+            status = response.status_code
+            if status not in RETRY_STATUSES or attempt >= credentials.max_retries:
+                return response
+
+            delay = credentials.penalize(credential, endpoint, status, response.headers, attempt)
+            if delay is None:
+                return response
+            attempt += 1
+            if instrumentation is not None:
+                instrumentation.emit(Event("retry", endpoint, seconds=delay, status=status, attempt=attempt))
+            if delay:
+                credentials.sleep(delay)
+
+    def _instrumented_get(self, instrumentation: Instrumentation, endpoint: str, url: URL, params: dict):
+        credential, waited = self.credentials.acquire(endpoint)
+        if waited:
+            instrumentation.emit(Event("rate_limit_wait", endpoint, seconds=waited))
+
+        instrumentation.emit(Event("request_start", endpoint))
+        sent = time.perf_counter()
+        response = self.transport.get(str(url), headers=credential.headers, params=params)
+        instrumentation.emit(
+            Event(
+                "request_end",
+                endpoint,
+                seconds=time.perf_counter() - sent,
+                status=response.status_code,
+                bytes=len(response.content),
+            )
+        )
+        return credential, response
+
+    def _decode(self, endpoint: str, content: bytes) -> dict:
+        if self.instrumentation is not None:
+            start = time.perf_counter()
+            result = self._decode_content(endpoint, content)
+            tweets = len(result.get("data") or []) if endpoint in self.SEARCH_ENDPOINTS else 0
+            self.instrumentation.emit(
+                Event("page_decoded", endpoint, seconds=time.perf_counter() - start, tweets=tweets)
+            )
+            return result
+        return self._decode_content(endpoint, content)
+
+    def _decode_content(self, endpoint: str, content: bytes) -> dict:
+        if endpoint in self.SEARCH_ENDPOINTS:
+            return self.decoder.decode_search(content)
+        return self.decoder.decode(content)
+
+    def _get_json(self, url: URL, params: dict) -> dict:
+        """Decoded response of a GET request, served from `cache` for cached endpoints
+        and shared with the identical requests in flight if coalescing
+        """
+        endpoint = endpoint_key(str(url))
+        cached = self.cache is not None and endpoint in self.CACHED_ENDPOINTS
+        if not cached and self.coalescer is None:
+            return self._decode(endpoint, self._get(url, params).content)
+
+        key = cache_key(str(url), params)
+        if cached:
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+        if self.coalescer is None:
+            return self._fetch_json(endpoint, url, params, key)
+        return self.coalescer.do(key, lambda: self._fetch_json(endpoint, url, params, key if cached else None))
+
+    def _fetch_json(self, endpoint: str, url: URL, params: dict, key: str | None) -> dict:
+        """Send the request and decode its response, saved in `cache` under `key` if given"""
+        response = self._get(url, params)
+        result = self._decode(endpoint, response.content)
+        if key is not None and response.status_code == 200:
+            self.cache.set(key, result)
+        return result
+
+    def _get_content(self, url: URL, params: dict) -> bytes:
+        """Undecoded body of a GET request, raises `APIError` unless the status is 200.
+        Shared with the identical requests in flight if coalescing.
+        """
+        if self.coalescer is None:
+            return self._fetch_content(url, params)
+        # keyed apart from `_get_json`, whose callers share decoded responses
+        key = "raw " + cache_key(str(url), params)
+        return self.coalescer.do(key, lambda: self._fetch_content(url, params))
+
+    def _fetch_content(self, url: URL, params: dict) -> bytes:
+        response = self._get(url, params)
+        if response.status_code != 200:
+            raise APIError.from_response(endpoint_key(str(url)), response)
+        return response.content
+
+    def _get_ids(self, url: URL, ids: str | list[str], params: dict) -> dict:
+        """Id lookup, merged with the lookups in flight if coalescing"""
+        ids = [ids] if isinstance(ids, str) else list(ids)
+        if self.coalescer is None or not ids:
+            return self._get_json(url, {**join_fields({"ids": ids}), **params})
+        return self.coalescer.do_ids(
+            cache_key(str(url), params), ids, lambda chunk: self._get_json(url, {"ids": ",".join(chunk), **params})
+        )
+
+    def close(self) -> None:
+        """Release pooled connections if the transport is owned by this client"""
+        if self._owns_transport:
+            self.transport.close()
+
+    def __enter__(self) -> SearchClient:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def get_users(
         self,
@@ -50,16 +355,15 @@ class SearchClient:
             dict: Raw dictionary containing the result of the query.
             "data" key will have the user info in form of list of dicts (this behaviour may change in the future)
         """
-        url = SearchClient.BASE_URL / "users" / "by"
+        url = self.base_url / "users" / "by"
         fields = {
             "usernames": [usernames] if isinstance(usernames, str) else usernames,
             "tweet.fields": tweet_fields,
             "user.fields": user_fields,
             "expansions": expansions,
         }
-        params = {k: ",".join(v) for k, v in fields.items() if v}
-        response = requests.get(url, headers=self.headers, params=params)
-        return response.json()
+        params = join_fields(fields)
+        return self._get_json(url, params)
 
     def get_user(
         self,
@@ -88,15 +392,14 @@ class SearchClient:
             dict: Raw dictionary containing the result of the query.
                 "data" key will have the user info in form of dict (this behaviour may change in the future)
         """
-        url = SearchClient.BASE_URL / "users" / "by" / "username" / username
+        url = self.base_url / "users" / "by" / "username" / username
         fields = {
             "tweet.fields": tweet_fields,
             "user.fields": user_fields,
             "expansions": expansions,
         }
-        params = {k: ",".join(v) for k, v in fields.items() if v}
-        response = requests.get(url, headers=self.headers, params=params)
-        return response.json()
+        params = join_fields(fields)
+        return self._get_json(url, params)
 
     def get_tweet_info(
         self,
@@ -109,10 +412,9 @@ class SearchClient:
         tweet_fields: list[str] | None = None,
         user_fields: list[str] | None = None,
     ) -> dict:
-        url = SearchClient.BASE_URL / "tweets"
+        url = self.base_url / "tweets"
 
         fields = {
-            "ids": [tweet_id] if isinstance(tweet_id, str) else tweet_id,
             "media.fields": media_fields,
             "place.fields": place_fields,
             "poll.fields": poll_fields,
@@ -120,9 +422,109 @@ class SearchClient:
             "user.fields": user_fields,
             "expansions": expansions,
         }
-        params = {k: ",".join(v) for k, v in fields.items() if v}
-        response = requests.get(url, headers=self.headers, params=params)
-        return response.json()
+        return self._get_ids(url, tweet_id, join_fields(fields))
+
+    def get_users_by_ids(
+        self,
+        user_ids: str | list[str],
+        *,
+        expansions: list[str] | None = None,
+        tweet_fields: list[str] | None = None,
+        user_fields: list[str] | None = None,
+    ) -> dict:
+        """Get multiple user information by user ids (e.g. `author_id` of tweets).
+
+        Returns:
+            dict: Raw dictionary containing the result of the query.
+        """
+        url = self.base_url / "users"
+        fields = {
+            "tweet.fields": tweet_fields,
+            "user.fields": user_fields,
+            "expansions": expansions,
+        }
+        return self._get_ids(url, user_ids, join_fields(fields))
+
+    def _batched_lookup(
+        self,
+        keys: Iterable,
+        fetch: Callable[[list[str]], dict],
+        key_of: Callable[[dict], str],
+        normalize: Callable[[str], str],
+        concurrency: int,
+    ) -> list[LookupResult]:
+        keys, unique = dedupe(keys, normalize)
+        chunks = list(chunked(unique))
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(chunks)))) as pool:
+            responses = list(zip(chunks, pool.map(fetch, chunks)))
+        return merge_results(keys, responses, key_of, normalize)
+
+    def lookup_users(
+        self,
+        keys: Iterable[str],
+        *,
+        by: str = "id",
+        concurrency: int = 4,
+        expansions: list[str] | None = None,
+        tweet_fields: list[str] | None = None,
+        user_fields: list[str] | None = None,
+    ) -> list[LookupResult]:
+        """Look up any number of users, packed into as few requests as possible.
+
+        Keys are deduplicated and sent in chunks of 100 (the API limit) at most
+        `concurrency` at a time, e.g. hydrating the authors of a 1M tweet crawl
+        takes at most 10k requests instead of 1M.
+
+        >>> results = client.lookup_users(t["author_id"] for t in tweets)
+        >>> users = {r.key: r.data for r in results if r.ok}
+
+        Args:
+            keys (Iterable[str]): user ids, or usernames if `by` is "username"
+            by (str, optional): "id" or "username". Defaults to "id".
+            concurrency (int, optional): chunks requested at the same time. Defaults to 4.
+
+        Returns:
+            list[LookupResult]: one result per key in input order, duplicates included
+        """
+        fields = {"expansions": expansions, "tweet_fields": tweet_fields, "user_fields": user_fields}
+        if by == "username":
+            return self._batched_lookup(
+                keys, lambda chunk: self.get_users(chunk, **fields), lambda u: u["username"], str.lower, concurrency
+            )
+        if by == "id":
+            return self._batched_lookup(
+                keys, lambda chunk: self.get_users_by_ids(chunk, **fields), lambda u: u["id"], str, concurrency
+            )
+        raise ValueError(f'by must be "id" or "username", not {by!r}')
+
+    def lookup_tweets(
+        self,
+        tweet_ids: Iterable[str],
+        *,
+        concurrency: int = 4,
+        expansions: list[str] | None = None,
+        media_fields: list[str] | None = None,
+        place_fields: list[str] | None = None,
+        poll_fields: list[str] | None = None,
+        tweet_fields: list[str] | None = None,
+        user_fields: list[str] | None = None,
+    ) -> list[LookupResult]:
+        """Look up any number of tweets in chunks of 100, see `lookup_users`
+
+        Returns:
+            list[LookupResult]: one result per id in input order, duplicates included
+        """
+        fields = {
+            "expansions": expansions,
+            "media_fields": media_fields,
+            "place_fields": place_fields,
+            "poll_fields": poll_fields,
+            "tweet_fields": tweet_fields,
+            "user_fields": user_fields,
+        }
+        return self._batched_lookup(
+            tweet_ids, lambda chunk: self.get_tweet_info(chunk, **fields), lambda t: t["id"], str, concurrency
+        )
 
     def _get_tweet(
         self,
@@ -163,33 +565,199 @@ class SearchClient:
         Make sure to read through the link below for understanding.
         https://developer.twitter.com/en/docs/twitter-api/tweets/search/integrate/build-a-query
         """
-        # preprocess query params
-        query_val = " ".join(query)
+        params = search_params(
+            query,
+            max_results=max_results,
+            end_time=end_time,
+            start_time=start_time,
+            next_token=next_token,
+            since_id=since_id,
+            sort_order=sort_order,
+            until_id=until_id,
+            expansions=expansions,
+            media_fields=media_fields,
+            place_fields=place_fields,
+            poll_fields=poll_fields,
+            tweet_fields=tweet_fields,
+            user_fields=user_fields,
+        )
+        url = self.base_url / "tweets" / "search" / ("all" if archive else "recent")
+        return self._get_json(url, params)
+
+    def _get_search_content(self, query: list[str], *, archive: bool = False, **params) -> bytes:
+        """Undecoded body of one /search/recent or /search/all request, see `_get_content`"""
+        url = self.base_url / "tweets" / "search" / ("all" if archive else "recent")
+        return self._get_content(url, search_params(query, **params))
+
+    def iter_pages(
+        self,
+        query: list[str],
+        *,
+        archive: bool = False,
+        max_page: int | None = None,
+        limit: int | None = None,
+        cooldown: float = 0,
+        max_results: int = 10,
+        end_time: dt.datetime | None = None,
+        start_time: dt.datetime | None = None,
+        next_token: str | None = None,
+        since_id: str | None = None,
+        sort_order: str | None = None,
+        until_id: str | None = None,
+        expansions: list[str] | None = None,
+        media_fields: list[str] | None = None,
+        place_fields: list[str] | None = None,
+        poll_fields: list[str] | None = None,
+        tweet_fields: list[str] | None = None,
+        user_fields: list[str] | None = None,
+        checkpoint: CheckpointStore | None = None,
+        resume: bool = False,
+    ) -> Iterator[Page]:
+        """Lazily paginate through a search, yielding one `Page` at a time.
 
-        fields = {
-            "media.fields": media_fields,
-            "place.fields": place_fields,
-            "poll.fields": poll_fields,
-            "tweet.fields": tweet_fields,
-            "user.fields": user_fields,
-            "expansions": expansions,
-        }
-        field_params = {k: ",".join(v) for k, v in fields.items() if v}
+        Nothing is accumulated between pages so memory stays constant however
+        long the crawl runs. Every page exposes `next_token`; pass it back as
+        `next_token` to resume right after that page.
+
+        >>> for page in client.iter_pages(["from:TwitterDev"], archive=True, max_results=500):
+        ...     process(page.data)
+
+        Args:
+            query (list[str]):
+                Query to Twitter API.
+
+            archive (bool, optional):
+                Use /search/all instead of /search/recent. Defaults to False.
 
+            max_page (int | None, optional):
+                Stop after this many pages, `None` for every page. Defaults to None.
+
+            limit (int | None, optional):
+                Stop once this many tweets have been yielded. The last request asks
+                for only the remaining tweets (10 at least). Defaults to None.
+
+            cooldown (float, optional):
+                Extra seconds to wait between pages. Defaults to 0.
+
+            checkpoint (CheckpointStore | None, optional):
+                Store where the progress of the crawl is saved after each page has been
+                processed by the consumer. Defaults to None.
+
+            resume (bool, optional):
+                Continue from the page after the last one saved in `checkpoint`.
+                A finished crawl yields nothing. Defaults to False.
+
+            Other arguments are passed to the endpoint, see `_get_tweet`.
+
+        Yields:
+            Page: each non-empty page of the result
+        """
         params = {
-            **field_params,
-            "query": query_val,
             "max_results": max_results,
             "end_time": end_time,
+            "start_time": start_time,
             "next_token": next_token,
             "since_id": since_id,
             "sort_order": sort_order,
-            "start_time": start_time,
             "until_id": until_id,
+            "expansions": expansions,
+            "media_fields": media_fields,
+            "place_fields": place_fields,
+            "poll_fields": poll_fields,
+            "tweet_fields": tweet_fields,
+            "user_fields": user_fields,
         }
-        url = SearchClient.BASE_URL / "tweets" / "search" / ("all" if archive else "recent")
-        response = requests.get(url, params=params, headers=self.headers)
-        return response.json()
+
+        state = None
+        if checkpoint is not None:
+            endpoint = "search/all" if archive else "search/recent"
+            state = checkpoint.start(endpoint, {**params, "query": " ".join(query)}, resume=resume)
+            if state.done:
+                return
+            if state.next_token:
+                params["next_token"] = state.next_token
+
+        number = 0
+        remaining = limit
+        while max_page is None or number < max_page:
+            if remaining is not None:
+                params["max_results"] = min(max_results, max(10, remaining))
+
+            page = Page(self._get_tweet(query, **params, archive=archive), number + 1)
+            if not page.data:
+                # an error body has no `meta`, the crawl is only over if the search came back empty
+                if state is not None and page.meta.get("result_count") == 0:
+                    state.done = True
+                    checkpoint.save(state)
+                break
+
+            number += 1
+            yield page
+
+            if state is not None:
+                checkpoint.record(state, page.response)
+
+            if remaining is not None:
+                remaining -= len(page.data)
+
+            params["next_token"] = page.next_token
+
+            # check for remaining pages to eliminate waiting after the last one
+            if not params["next_token"] or (remaining is not None and remaining <= 0):
+                break
+            if max_page is not None and number >= max_page:
+                break
+
+            if cooldown:
+                time.sleep(cooldown)
+
+    def iter_tweets(self, query: list[str], *, limit: int | None = None, **kwargs) -> Iterator[dict]:
+        """Lazily yield tweets one by one, accepts the same arguments as `iter_pages`.
+
+        Use `iter_pages` instead when the cursor of each page is needed to resume.
+        """
+        count = 0
+        for page in self.iter_pages(query, limit=limit, **kwargs):
+            for tweet in page.data:
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                yield tweet
+
+    def iter_raw_pages(
+        self,
+        query: list[str],
+        *,
+        archive: bool = False,
+        max_page: int | None = None,
+        cooldown: float = 0,
+        next_token: str | None = None,
+        **kwargs,
+    ) -> Iterator[bytes]:
+        """Lazily paginate through a search like `iter_pages`, yielding the undecoded body of each page.
+
+        Only `next_token` is read from the bodies, decoding them is left to the
+        consumer, e.g. the worker processes of a `ParsePipeline`. An error response
+        raises `APIError` instead of being yielded as a page.
+
+        Args:
+            query (list[str]): Query to Twitter API.
+            archive (bool, optional): Use /search/all instead of /search/recent. Defaults to False.
+            max_page (int | None, optional): Stop after this many pages, `None` for every page. Defaults to None.
+            cooldown (float, optional): Extra seconds to wait between pages. Defaults to 0.
+            Other arguments are passed to the endpoint, see `_get_tweet`.
+        """
+        number = 0
+        while max_page is None or number < max_page:
+            content = self._get_search_content(query, archive=archive, next_token=next_token, **kwargs)
+            number += 1
+            yield content
+
+            next_token = scan_next_token(content)
+            if not next_token or (max_page is not None and number >= max_page):
+                break
+            if cooldown:
+                time.sleep(cooldown)
 
     def get_tweets(
         self,
@@ -199,6 +767,7 @@ class SearchClient:
         start_time=None,
         end_time=None,
         archive=False,
+        tweet_fields: list[str] | None = None,
     ) -> list[dict]:
         """Higher level method for fetching tweets using only query, number of tweets
 
@@ -225,6 +794,14 @@ class SearchClient:
                 will be returned by default. If not specified, end_time will
                 default to [now - 30 seconds]. Defaults to None.
 
+            archive (bool, optional):
+                Search /search/all, 500 tweets per request, instead of /search/recent (100).
+                Defaults to False.
+
+            tweet_fields (list[str] | None, optional):
+                Fields to request, e.g. `Projection.tweet_fields` of the sinks
+                the tweets go to. Defaults to the fields listed below.
+
         Returns:
             list[dict]:
                 Resulting list of tweets (dict). Each tweet dict will have:
@@ -237,54 +814,32 @@ class SearchClient:
         >>> client.get_tweets(query=["from:TwitterDev", "-is:retweet"])
         [{}, {...}]
         """
-        assert number_of_tweets >= 10, "Number of tweets must be more than or equal to 10"
-        params = {
-            "max_results": 100,
-            "end_time": end_time,
-            "start_time": start_time,
-            "next_token": None,
-            # "media_fields": list(MediaFields),
-            # "place_fields": list(PlaceFields),
-            # "poll_fields": list(PollFields),
-            "tweet_fields": [
+        assert number_of_tweets is None or number_of_tweets >= 10, "Number of tweets must be more than or equal to 10"
+        if tweet_fields is None:
+            tweet_fields = [
                 TweetFields.AUTHOR_ID,
                 TweetFields.CONVERSATION_ID,
                 TweetFields.PUBLIC_METRICS,
                 TweetFields.IN_REPLY_TO_USER_ID,
                 TweetFields.CREATED_AT,
-            ],
-            # "user_fields": list(UserFields),
-        }
-
-        if number_of_tweets is None:
-            params["max_results"] = 100
-        elif number_of_tweets < 100:
-            params["max_results"] = max(10, number_of_tweets)
-
-        tweets = []
-        tweets_to_fetch = number_of_tweets
-        while tweets_to_fetch is not None or tweets_to_fetch > 0:
-            response = self._get_tweet(query, **params, archive=archive)
-            meta = response.get("meta")
-
-            if meta.get("result_count", 0) > 0:
-                tweets_to_fetch -= meta.get("result_count")
-                tweets.extend(response["data"])
-
-            if tweets_to_fetch <= 0 or not meta.get("next_token"):
-                break
-
-            time.sleep(3.1)
-            params["max_results"] = min(100, max(10, tweets_to_fetch))
-            params["next_token"] = meta.get("next_token")
-
-        return tweets
+            ]
+        return list(
+            self.iter_tweets(
+                query,
+                limit=number_of_tweets,
+                archive=archive,
+                max_results=page_size(archive),
+                end_time=end_time,
+                start_time=start_time,
+                tweet_fields=tweet_fields,
+            )
+        )
 
     def get_all_tweets(
         self,
         query: list[str],
         *,
-        cooldown: float = 3,
+        cooldown: float = 0,
         max_results: int = 10,
         end_time: dt.datetime | None = None,
         start_time: dt.datetime | None = None,
@@ -300,54 +855,47 @@ class SearchClient:
         user_fields: list[str] | None = None,
         tweet_only: bool = False,
         max_page: int | None = 1,
+        checkpoint: CheckpointStore | None = None,
+        resume: bool = False,
     ) -> dict | list:
-        result = []
-        params = {
-            "max_results": max_results,
-            "end_time": end_time,
-            "start_time": start_time,
-            "next_token": next_token,
-            "since_id": since_id,
-            "sort_order": sort_order,
-            "until_id": until_id,
-            "expansions": expansions,
-            "media_fields": media_fields,
-            "place_fields": place_fields,
-            "poll_fields": poll_fields,
-            "tweet_fields": tweet_fields,
-            "user_fields": user_fields,
-        }
-
-        while max_page is None or max_page > 0:
-            tweets = self._get_tweet(query, **params, archive=True)
-
-            if not tweets.get("data"):
-                break
-
-            if tweet_only:
-                result.extend(tweets["data"])
-            else:
-                result.append(tweets)
-
-            if max_page is not None:
-                max_page -= 1
-
-            params["next_token"] = tweets.get("meta").get("next_token")
-
-            # check for max_page to eliminate waiting
-            # when remaining page is 0 (max_page <= 0)
-            if not params["next_token"] or (max_page is not None and max_page <= 0):
-                break
+        """Search /search/all and collect the pages in a list.
 
-            time.sleep(cooldown)
+        Prefer `iter_pages`/`iter_tweets` for long crawls, this keeps every page in memory.
+        With a `checkpoint` and `resume=True` only the pages after the last saved one are fetched.
 
-        return result
+        Returns:
+            dict | list: raw pages, or only their tweets if `tweet_only` is True
+        """
+        pages = self.iter_pages(
+            query,
+            archive=True,
+            max_page=max_page,
+            cooldown=cooldown,
+            max_results=max_results,
+            end_time=end_time,
+            start_time=start_time,
+            next_token=next_token,
+            since_id=since_id,
+            sort_order=sort_order,
+            until_id=until_id,
+            expansions=expansions,
+            media_fields=media_fields,
+            place_fields=place_fields,
+            poll_fields=poll_fields,
+            tweet_fields=tweet_fields,
+            user_fields=user_fields,
+            checkpoint=checkpoint,
+            resume=resume,
+        )
+        if tweet_only:
+            return [tweet for page in pages for tweet in page.data]
+        return [page.response for page in pages]
 
     def get_recent_tweets(
         self,
         query: list[str],
         *,
-        cooldown: float = 3,
+        cooldown: float = 0,
         max_results: int = 10,
         end_time: dt.datetime | None = None,
         start_time: dt.datetime | None = None,
@@ -363,82 +911,234 @@ class SearchClient:
         user_fields: list[str] | None = None,
         tweet_only: bool = False,
         max_page: int | None = 1,
+        checkpoint: CheckpointStore | None = None,
+        resume: bool = False,
     ) -> dict | list:
-        result = []
+        """Search /search/recent and collect the pages in a list.
+
+        Prefer `iter_pages`/`iter_tweets` for long crawls, this keeps every page in memory.
+        With a `checkpoint` and `resume=True` only the pages after the last saved one are fetched.
+
+        Returns:
+            dict | list: raw pages, or only their tweets if `tweet_only` is True
+        """
+        pages = self.iter_pages(
+            query,
+            archive=False,
+            max_page=max_page,
+            cooldown=cooldown,
+            max_results=max_results,
+            end_time=end_time,
+            start_time=start_time,
+            next_token=next_token,
+            since_id=since_id,
+            sort_order=sort_order,
+            until_id=until_id,
+            expansions=expansions,
+            media_fields=media_fields,
+            place_fields=place_fields,
+            poll_fields=poll_fields,
+            tweet_fields=tweet_fields,
+            user_fields=user_fields,
+            checkpoint=checkpoint,
+            resume=resume,
+        )
+        if tweet_only:
+            return [tweet for page in pages for tweet in page.data]
+        return [page.response for page in pages]
+
+    def iter_rule_matches(
+        self,
+        rules: Iterable[Rule],
+        *,
+        archive: bool = False,
+        common: list[str] | None = None,
+        **kwargs,
+    ) -> Iterator[tuple[dict, list[str]]]:
+        """Search many rules with as few requests as possible, yielding each tweet with the tags it matched.
+
+        Rules are packed into OR-joined queries up to the query length limit of the
+        endpoint, and every returned tweet is routed back to its rules locally.
+
+        >>> rules = [Rule(tag, keywords=[tag]) for tag in keywords]
+        >>> for tweet, tags in client.iter_rule_matches(rules, common=["-is:retweet"], max_page=None):
+        ...     save(tweet, tags)
+
+        Args:
+            rules (Iterable[Rule]): rules to search
+            archive (bool, optional): use /search/all. Defaults to False.
+            common (list[str] | None, optional): operators added to every query. Defaults to None.
+            Other arguments are passed to `iter_pages`.
+        """
+        rules = list(rules)
+        max_length = MAX_QUERY_LENGTH["all" if archive else "recent"]
+        matcher = RuleMatcher(rules)
+        if any(rule.authors for rule in rules):
+            # usernames are needed to route rules with authors
+            expansions = list(kwargs.pop("expansions", None) or [])
+            if Expansions.AUTHOR_ID not in expansions:
+                expansions.append(Expansions.AUTHOR_ID)
+            kwargs["expansions"] = expansions
+
+        seen = set()
+        for batch in pack_rules(rules, max_length=max_length, common=common):
+            for page in self.iter_pages([batch.query], archive=archive, **kwargs):
+                users = {u["id"]: u.get("username") for u in page.includes.get("users") or []}
+                for tweet in page.data:
+                    # a tweet matching rules of several batches is returned by each of them
+                    if tweet["id"] in seen:
+                        continue
+                    seen.add(tweet["id"])
+                    yield tweet, matcher.match(tweet, users.get(tweet.get("author_id")))
+
+    def watch(self, query: list[str], interval: float = 60, **kwargs) -> Watcher:
+        """Create a `Watcher` polling `query` for new tweets, more queries can be added to it
+
+        >>> watcher = client.watch(["#python"], interval=30)
+        >>> watcher.run(lambda query, tweets: save(tweets))
+
+        Args:
+            query (list[str]): Query to Twitter API.
+            interval (float, optional): initial seconds between polls. Defaults to 60.
+            Other arguments are passed to `Watcher`.
+        """
+        from search_client.watch import Watcher
+
+        watcher = Watcher(self, **kwargs)
+        watcher.add(query, interval)
+        return watcher
+
+    def iter_count_pages(
+        self,
+        query: list[str] | str,
+        *,
+        granularity: str = "day",
+        end_time: dt.datetime | str | None = None,
+        start_time: dt.datetime | str | None = None,
+        next_token: str | None = None,
+        since_id: str | None = None,
+        until_id: str | None = None,
+        cooldown: float = 0,
+        checkpoint: CheckpointStore | None = None,
+        resume: bool = False,
+    ) -> Iterator[Page]:
+        """Lazily paginate through /tweets/counts/all.
+
+        Each page's `data` holds the count buckets (`start`, `end`, `tweet_count`)
+        and its `meta` the `total_tweet_count` of the page. An error response raises
+        `APIError`, the pages before it are saved in `checkpoint` so the count can be resumed.
+
+        Args:
+            query (list[str] | str):
+                Query to Twitter API.
+
+            granularity (str, optional):
+                Size of a bucket, one of "minute", "hour" or "day". Defaults to "day".
+
+            cooldown (float, optional):
+                Extra seconds to wait between pages. Defaults to 0.
+
+            checkpoint (CheckpointStore | None, optional):
+                Store where the progress is saved after each page. Defaults to None.
+
+            resume (bool, optional):
+                Continue after the last page saved in `checkpoint`. Defaults to False.
+
+        Yields:
+            Page: each page of buckets
+        """
         params = {
-            "max_results": max_results,
+            "query": query if isinstance(query, str) else " ".join(query),
             "end_time": end_time,
-            "start_time": start_time,
+            "granularity": granularity,
             "next_token": next_token,
             "since_id": since_id,
-            "sort_order": sort_order,
+            "start_time": start_time,
             "until_id": until_id,
-            "expansions": expansions,
-            "media_fields": media_fields,
-            "place_fields": place_fields,
-            "poll_fields": poll_fields,
-            "tweet_fields": tweet_fields,
-            "user_fields": user_fields,
         }
-        # tweets = self._get_tweet(query, **params, archive=False)
+        url = self.base_url / "tweets" / "counts" / "all"
 
-        while max_page is None or max_page > 0:
-            tweets = self._get_tweet(query, **params, archive=False)
-
-            if tweet_only:
-                result.extend(tweets["data"])
-            else:
-                result.append(tweets)
+        state = None
+        if checkpoint is not None:
+            state = checkpoint.start("counts/all", params, resume=resume)
+            if state.done:
+                return
+            if state.next_token:
+                params["next_token"] = state.next_token
 
-            if max_page is not None:
-                max_page -= 1
+        number = 0
+        while True:
+            number += 1
+            page = Page(self._get_json(url, params), number)
+            if not page.meta:
+                raise APIError("counts/all", page.response.get("status"), page.response)
+            yield page
 
-            params["next_token"] = tweets.get("meta").get("next_token")
+            if state is not None:
+                checkpoint.record(state, page.response)
 
-            # check for max_page to eliminate waiting
-            # when remaining page is 0 (max_page <= 0)
-            if not params["next_token"] or (max_page is not None and max_page <= 0):
+            params["next_token"] = page.next_token
+            if not params["next_token"]:
                 break
+            if cooldown:
+                time.sleep(cooldown)
 
-            time.sleep(cooldown)
+    def get_tweet_count_buckets(self, query: list[str] | str, **kwargs) -> list[dict]:
+        """Return every count bucket of `query`, accepts the same arguments as `iter_count_pages`
 
-        return result
+        Returns:
+            list[dict]: buckets with `start`, `end` and `tweet_count`, oldest first
+        """
+        buckets = [bucket for page in self.iter_count_pages(query, **kwargs) for bucket in page.data]
+        return sorted(buckets, key=lambda bucket: bucket["start"])
+
+    def count_series(
+        self,
+        query: list[str] | str,
+        start_time: dt.datetime | dt.date | str,
+        end_time: dt.datetime | dt.date | str | None = None,
+        *,
+        granularity: str = "day",
+        workers: int = 4,
+        store: CountStore | None = None,
+    ) -> CountSeries:
+        """Return the counts of `query` in every minute, hour or day bucket of a window
 
-    def get_tweet_count_user(self, username: str, *, cooldown: float = 3) -> int:
+        >>> series = client.count_series(["#python"], "2022-01-01", "2022-02-01", granularity="hour")
+        >>> series.total, series.resample("day").to_buckets()
+
+        Args:
+            query (list[str] | str): Query to Twitter API.
+            start_time, end_time: window, widened to whole buckets. `end_time` defaults to now.
+            granularity (str, optional): "minute", "hour" or "day". Defaults to "day".
+            workers (int, optional): number of ranges counted at the same time. Defaults to 4.
+            store (CountStore | None, optional): keeps finished buckets so they are only fetched once. Defaults to None.
+        """
+        from search_client.counts import CountsEngine
+
+        engine = CountsEngine(self, workers=workers, store=store)
+        return engine.series(query, start_time, end_time, granularity=granularity)
+
+    def get_tweet_count_user(self, username: str, *, cooldown: float = 0) -> int:
         """Return total number of tweets from a user using username (twitter handle)
 
         Args:
             username (str): Twitter handle of the user ie username
+            cooldown (float, optional):
+                Extra seconds to wait between pages. Pages are already paced by
+                `SearchClient.rate_limiter`. Defaults to 0.
 
         Returns:
             int: number of tweets they have tweeted since the creation of their account
         """
-        url = SearchClient.BASE_URL / "tweets" / "counts" / "all"
         user = self.get_user(username, user_fields=[UserFields.CREATED_AT])
-        query = f"from:{username}"
         start_time = user["data"]["created_at"]
 
         # we're subtracting 1 minute because end time must be less than 10 seconds
         # prior to the time the request was made according to Twitter API
         end_time = (dt.datetime.now(dt.timezone.utc) - dt.timedelta(minutes=1)).isoformat()
-        params = {
-            "query": query,
-            "start_time": start_time,
-            "end_time": end_time,
-            "granularity": "day",
-        }
-        total = 0
-        while True:
-            response = requests.get(url, headers=self.headers, params=params)
-            meta = response.json().get("meta")
-            total += meta.get("total_tweet_count")
-            next_token = meta.get("next_token")
-            if next_token:
-                params["next_token"] = next_token
-                time.sleep(cooldown)
-            else:
-                break
-        return total
+        pages = self.iter_count_pages(f"from:{username}", start_time=start_time, end_time=end_time, cooldown=cooldown)
+        return sum(page.meta.get("total_tweet_count", 0) for page in pages)
 
     def get_tweet_count(
         self,
@@ -449,29 +1149,29 @@ class SearchClient:
         next_token: str | None = None,
         since_id: str | None = None,
         until_id: str | None = None,
-        cooldown: float = 3,
+        cooldown: float = 0,
+        checkpoint: CheckpointStore | None = None,
+        resume: bool = False,
     ) -> int:
+        """Total number of tweets matching `query`, counted by day.
+
+        Raises `APIError` on an error response rather than returning a partial total.
+        With a `checkpoint`, the count continues from the last page counted when `resume` is True.
+        """
         params = {
-            "query": " ".join(query),
             "end_time": end_time,
-            "granularity": "day",
+            "start_time": start_time,
             "next_token": next_token,
             "since_id": since_id,
-            "start_time": start_time,
             "until_id": until_id,
         }
 
-        url = SearchClient.BASE_URL / "tweets" / "counts" / "all"
-
         total = 0
-        while True:
-            response = requests.get(url, headers=self.headers, params=params)
-            meta = response.json().get("meta")
-            total += meta.get("total_tweet_count")
-            next_token = meta.get("next_token")
-            if next_token:
-                params["next_token"] = next_token
-                time.sleep(cooldown)
-            else:
-                break
-        return total
+        if checkpoint is not None and resume:
+            # pages counted before the crawl was interrupted
+            key = checkpoint.make_key("counts/all", {"query": " ".join(query), "granularity": "day", **params})
+            previous = checkpoint.load(key)
+            total = previous.count if previous is not None else 0
+
+        pages = self.iter_count_pages(query, cooldown=cooldown, checkpoint=checkpoint, resume=resume, **params)
+        return total + sum(page.meta.get("total_tweet_count", 0) for page in pages)
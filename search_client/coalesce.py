@@ -0,0 +1,225 @@
+"""Request coalescing: concurrent identical requests share one response
+
+Workers asking for the same user, tweets or first page of a query at the same
+time wait for the request already in flight instead of sending their own.
+Id lookups are merged per id, so overlapping id sets only fetch each id once.
+
+>>> client = SearchClient("<your_token>", coalescer=Coalescer())
+>>> with ThreadPoolExecutor(8) as pool:
+...     responses = list(pool.map(client.get_user, ["TwitterDev"] * 8))  # one request
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable
+
+# keys of the objects of each kind of `includes`
+INCLUDE_KEYS = {"media": "media_key"}
+
+
+@dataclass
+class CoalesceStats:
+    # requests sent, and calls that shared the response of another one
+    requests: int = 0
+    shared: int = 0
+    # ids fetched, and ids taken from a lookup already in flight
+    ids: int = 0
+    shared_ids: int = 0
+
+
+def split_ids(ids: Iterable[str], response: dict) -> dict[str, tuple[str, Any, dict]]:
+    """Result of each id of an id lookup response: ("data", object), ("error", error)
+    or ("failed", response) if the whole request failed, along with the response
+    """
+    if "data" not in response and "errors" not in response:
+        return {i: ("failed", response, response) for i in ids}
+
+    results = {}
+    for error in response.get("errors") or []:
+        value = error.get("value") or error.get("resource_id")
+        if value is not None:
+            results[str(value)] = ("error", error, response)
+    for obj in response.get("data") or []:
+        results[str(obj["id"])] = ("data", obj, response)
+    return results
+
+
+def merge_ids(results: list[tuple[str, Any, dict]]) -> dict:
+    """Response of an id lookup assembled from the results of each id, in order"""
+    data, errors, includes, responses = [], [], {}, []
+    for kind, value, response in results:
+        if kind == "failed":
+            return value
+        (data if kind == "data" else errors).append(value)
+        if not any(response is r for r in responses):
+            responses.append(response)
+
+    for response in responses:
+        for name, objects in (response.get("includes") or {}).items():
+            key = INCLUDE_KEYS.get(name, "id")
+            merged = includes.setdefault(name, {})
+            for obj in objects:
+                merged.setdefault(obj.get(key), obj)
+
+    merged_response: dict = {}
+    if data:
+        merged_response["data"] = data
+    if includes:
+        merged_response["includes"] = {name: list(objects.values()) for name, objects in includes.items()}
+    if errors:
+        merged_response["errors"] = errors
+    return merged_response
+
+
+class Coalescer:
+    """Thread-safe single-flight of requests, see the module docstring.
+
+    Callers sharing a response get the same object, do not mutate it. A failed
+    request raises in every caller waiting for it.
+    """
+
+    def __init__(self) -> None:
+        self.stats = CoalesceStats()
+        self._calls: dict[str, Future] = {}
+        self._ids: dict[tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Result of `fn()`, called only if no call with the same `key` is in flight"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.stats.requests += 1
+            else:
+                self.stats.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def do_ids(self, key: str, ids: Iterable[str], fetch: Callable[[list[str]], dict]) -> dict:
+        """Look up `ids`, only fetching those not already being fetched under `key`
+
+        Args:
+            key (str): identifies everything but the ids, e.g. the URL and the field params
+            ids (Iterable[str]): ids to look up
+            fetch (Callable[[list[str]], dict]): sends the lookup of some ids
+
+        Returns:
+            dict: response holding the objects and errors of `ids`, in order
+        """
+        ids = list(dict.fromkeys(str(i) for i in ids))
+        futures, missing = {}, []
+        with self._lock:
+            for i in ids:
+                future = self._ids.get((key, i))
+                if future is None:
+                    future = self._ids[(key, i)] = Future()
+                    missing.append(i)
+                futures[i] = future
+            self.stats.ids += len(missing)
+            self.stats.shared_ids += len(ids) - len(missing)
+
+        if missing:
+            try:
+                results = split_ids(missing, fetch(missing))
+            except BaseException as err:
+                for i in missing:
+                    futures[i].set_exception(err)
+                raise
+            else:
+                for i in missing:
+                    futures[i].set_result(results.get(i))
+            finally:
+                with self._lock:
+                    for i in missing:
+                        del self._ids[(key, i)]
+
+        return merge_ids([r for r in (futures[i].result() for i in ids) if r is not None])
+
+
+class AsyncCoalescer:
+    """Single-flight of the requests of one event loop, the asyncio counterpart of `Coalescer`"""
+
+    def __init__(self) -> None:
+        self.stats = CoalesceStats()
+        self._calls: dict[str, asyncio.Future] = {}
+        self._ids: dict[tuple[str, str], asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]) -> Any:
+        """Result of `await fn()`, only awaited if no call with the same `key` is in flight"""
+        future = self._calls.get(key)
+        if future is not None:
+            self.stats.shared += 1
+            # shield so that a cancelled follower does not cancel the others
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.stats.requests += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as err:
+            future.set_exception(err)
+            # mark it retrieved, nobody may be waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    async def do_ids(self, key: str, ids: Iterable[str], fetch: Callable[[list[str]], Awaitable[dict]]) -> dict:
+        """Look up `ids`, only fetching those not already being fetched, see `Coalescer.do_ids`"""
+        ids = list(dict.fromkeys(str(i) for i in ids))
+        loop = asyncio.get_running_loop()
+        futures, missing = {}, []
+        for i in ids:
+            future = self._ids.get((key, i))
+            if future is None:
+                future = self._ids[(key, i)] = loop.create_future()
+                missing.append(i)
+            futures[i] = future
+        self.stats.ids += len(missing)
+        self.stats.shared_ids += len(ids) - len(missing)
+
+        if missing:
+            try:
+                results = split_ids(missing, await fetch(missing))
+            except asyncio.CancelledError:
+                for i in missing:
+                    futures[i].cancel()
+                raise
+            except BaseException as err:
+                for i in missing:
+                    futures[i].set_exception(err)
+                    futures[i].exception()
+                raise
+            else:
+                for i in missing:
+                    futures[i].set_result(results.get(i))
+            finally:
+                for i in missing:
+                    del self._ids[(key, i)]
+
+        results = [await asyncio.shield(futures[i]) for i in ids]
+        return merge_ids([r for r in results if r is not None])
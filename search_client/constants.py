@@ -1,17 +1,35 @@
 from __future__ import annotations
 
+import functools
 from dataclasses import dataclass
 
-from dotenv import dotenv_values
+DEFAULT_BASE_URL = "https://api.twitter.com/2"
 
 
 @dataclass(frozen=True)
 class Config:
-    BASE_URL: str
+    BASE_URL: str = DEFAULT_BASE_URL
     BEARER_TOKEN: str | None = None
+    # comma-separated tokens of several projects, see `CredentialPool`
+    BEARER_TOKENS: str | None = None
 
+    @property
+    def bearer_tokens(self) -> list[str]:
+        """Every token of `BEARER_TOKENS` and `BEARER_TOKEN`, without duplicates"""
+        tokens = [t.strip() for t in (self.BEARER_TOKENS or "").split(",")]
+        return list(dict.fromkeys(t for t in [self.BEARER_TOKEN, *tokens] if t))
 
-config = Config(
-    BASE_URL="https://api.twitter.com/2",
-    **dotenv_values("./.env"),
-)
+
+@functools.lru_cache(maxsize=None)
+def get_config(path: str = "./.env") -> Config:
+    """Configuration read from the dotenv file at `path`, on first use rather than at import"""
+    from dotenv import dotenv_values
+
+    return Config(BASE_URL=DEFAULT_BASE_URL, **dotenv_values(path))
+
+
+def __getattr__(name: str):
+    # `from search_client.constants import config` reads .env here instead of at import
+    if name == "config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
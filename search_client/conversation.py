@@ -0,0 +1,237 @@
+"""Reconstruction of conversation reply trees with batched requests
+
+Conversation ids are packed into OR-joined `conversation_id:` queries, and the
+parents missing from the search results (tweets older than the search window,
+or roots) are fetched with batched tweet lookups.
+
+>>> builder = ConversationBuilder(client, archive=True)
+>>> threads = builder.build(tweet["conversation_id"] for tweet in tweets)
+>>> for depth, tweet in threads["1445880548472328192"].walk():
+...     print("  " * depth + tweet["text"])
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from search_client.client import SearchClient
+from search_client.field_enums import TweetFields
+from search_client.plan import page_size
+from search_client.query import MAX_QUERY_LENGTH, pack_terms
+
+# fields needed to place a tweet in its tree
+CONVERSATION_FIELDS = [
+    TweetFields.AUTHOR_ID,
+    TweetFields.CONVERSATION_ID,
+    TweetFields.CREATED_AT,
+    TweetFields.IN_REPLY_TO_USER_ID,
+    TweetFields.REFERENCED_TWEETS,
+]
+
+
+def parent_id(tweet: dict) -> str | None:
+    """Id of the tweet `tweet` replies to"""
+    for ref in tweet.get("referenced_tweets") or []:
+        if ref.get("type") == "replied_to":
+            return ref["id"]
+    return None
+
+
+class Conversation:
+    """Reply tree of one conversation, indexed by tweet id.
+
+    Tweets can be added in any order, a reply is linked to its parent by id
+    whether or not the parent has arrived yet.
+    """
+
+    def __init__(self, conversation_id: str) -> None:
+        self.id = conversation_id
+        self.tweets: dict[str, dict] = {}
+        # parent id -> ids of its replies
+        self.children: dict[str, list[str]] = defaultdict(list)
+
+    def add(self, tweet: dict) -> bool:
+        """Add `tweet` to the tree, returns False if it was already there"""
+        if tweet["id"] in self.tweets:
+            return False
+        self.tweets[tweet["id"]] = tweet
+        parent = parent_id(tweet)
+        if parent is not None:
+            self.children[parent].append(tweet["id"])
+        return True
+
+    @property
+    def root(self) -> dict | None:
+        """First tweet of the conversation, its id is the conversation id"""
+        return self.tweets.get(self.id)
+
+    @property
+    def missing(self) -> set[str]:
+        """Ids of tweets replied to that are not in the tree, the root included"""
+        missing = {parent for parent in self.children if parent not in self.tweets}
+        if self.id not in self.tweets:
+            missing.add(self.id)
+        return missing
+
+    def replies(self, tweet_id: str) -> list[dict]:
+        """Direct replies to `tweet_id`, oldest first"""
+        return [self.tweets[i] for i in sorted(self.children.get(tweet_id, ()), key=int)]
+
+    def walk(self) -> Iterator[tuple[int, dict]]:
+        """Yield (depth, tweet) depth first from the root, then from every tweet whose parent is missing"""
+        tops = [t for t in self.tweets.values() if t["id"] == self.id or parent_id(t) not in self.tweets]
+        stack = [(0, t) for t in sorted(tops, key=lambda t: int(t["id"]), reverse=True)]
+        while stack:
+            depth, tweet = stack.pop()
+            yield depth, tweet
+            stack.extend((depth + 1, reply) for reply in reversed(self.replies(tweet["id"])))
+
+    def __len__(self) -> int:
+        return len(self.tweets)
+
+    def __repr__(self) -> str:
+        return f"Conversation(id={self.id!r}, tweets={len(self.tweets)})"
+
+
+@dataclass
+class ConversationStats:
+    queries: int = 0
+    pages: int = 0
+    lookups: int = 0
+    tweets: int = 0
+
+
+class ConversationBuilder:
+    """Rebuild many conversations with as few requests as possible.
+
+    Conversation ids are packed into OR-joined queries up to the query length
+    limit and searched concurrently, with the largest page size of the
+    endpoint. Each batch is added to the trees as soon as it arrives. Missing
+    parents are then looked up by id 100 at a time, round after round, until
+    every chain reaches its root or a tweet that cannot be fetched.
+
+    Args:
+        client (SearchClient):
+            Client shared by every worker.
+
+        archive (bool, optional):
+            Search /search/all instead of /search/recent. Defaults to False.
+
+        workers (int, optional):
+            Number of queries searched at the same time. Defaults to 4.
+
+        fetch_parents (bool, optional):
+            Look up the tweets replied to that the search did not return. Defaults to True.
+
+        max_rounds (int, optional):
+            Maximum rounds of parent lookups, each one climbs one level of the trees. Defaults to 50.
+    """
+
+    def __init__(
+        self,
+        client: SearchClient,
+        *,
+        archive: bool = False,
+        workers: int = 4,
+        fetch_parents: bool = True,
+        max_rounds: int = 50,
+    ) -> None:
+        self.client = client
+        self.archive = archive
+        self.workers = workers
+        self.fetch_parents = fetch_parents
+        self.max_rounds = max_rounds
+        self.conversations: dict[str, Conversation] = {}
+        self.stats = ConversationStats()
+        # parents that were looked up but could not be fetched
+        self._unavailable: set[str] = set()
+
+    def add(self, tweets: Iterable[dict]) -> None:
+        """Add tweets to the trees of their conversations"""
+        for tweet in tweets:
+            conversation_id = tweet.get("conversation_id")
+            if conversation_id is None:
+                continue
+            if conversation_id not in self.conversations:
+                self.conversations[conversation_id] = Conversation(conversation_id)
+            if self.conversations[conversation_id].add(tweet):
+                self.stats.tweets += 1
+
+    def plan(self, conversation_ids: Iterable[str], common: list[str] | None = None) -> list[str]:
+        """Queries covering `conversation_ids`"""
+        max_length = MAX_QUERY_LENGTH["all" if self.archive else "recent"]
+        terms = [f"conversation_id:{i}" for i in dict.fromkeys(str(i) for i in conversation_ids)]
+        return pack_terms(terms, max_length=max_length, common=common)
+
+    def _search(self, query: str, kwargs: dict) -> tuple[int, list[dict]]:
+        pages = list(self.client.iter_pages([query], archive=self.archive, **kwargs))
+        return len(pages), [tweet for page in pages for tweet in page.data]
+
+    def build(
+        self,
+        conversation_ids: Iterable[str],
+        *,
+        common: list[str] | None = None,
+        **kwargs,
+    ) -> dict[str, Conversation]:
+        """Fetch every tweet of the conversations and assemble their trees.
+
+        Args:
+            conversation_ids (Iterable[str]): conversations to rebuild
+            common (list[str] | None, optional): operators added to every query. Defaults to None.
+            Other arguments are passed to `SearchClient.iter_pages`, e.g. `start_time`.
+
+        Returns:
+            dict[str, Conversation]: tree of each conversation id
+        """
+        ids = list(dict.fromkeys(str(i) for i in conversation_ids))
+        for conversation_id in ids:
+            if conversation_id not in self.conversations:
+                self.conversations[conversation_id] = Conversation(conversation_id)
+
+        kwargs.setdefault("max_results", page_size(self.archive))
+        kwargs.setdefault("tweet_fields", CONVERSATION_FIELDS)
+        kwargs.setdefault("max_page", None)
+        queries = self.plan(ids, common)
+        self.stats.queries += len(queries)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(queries)))) as pool:
+            futures = [pool.submit(self._search, query, kwargs) for query in queries]
+            for future in as_completed(futures):
+                pages, tweets = future.result()
+                self.stats.pages += pages
+                self.add(tweets)
+
+        if self.fetch_parents:
+            self.fetch_missing(ids)
+        return {i: self.conversations[i] for i in ids}
+
+    def fetch_missing(self, conversation_ids: Iterable[str] | None = None) -> None:
+        """Look up the parents missing from the trees, in batches of 100 ids"""
+        ids = list(self.conversations) if conversation_ids is None else [str(i) for i in conversation_ids]
+        unknown = [i for i in ids if i not in self.conversations]
+        if unknown:
+            raise ValueError(f"unknown conversation ids {unknown}, add their tweets or build them first")
+        rebuilt = set(ids)
+        for _ in range(self.max_rounds):
+            missing = set()
+            for conversation_id in ids:
+                missing.update(self.conversations[conversation_id].missing)
+            missing -= self._unavailable
+            if not missing:
+                return
+
+            results = self.client.lookup_tweets(
+                sorted(missing, key=int), concurrency=self.workers, tweet_fields=CONVERSATION_FIELDS
+            )
+            self.stats.lookups += -(-len(missing) // 100)
+            found = []
+            for result in results:
+                # a parent of another conversation, e.g. a quoted thread, is not added to this one
+                if result.ok and result.data.get("conversation_id") in rebuilt:
+                    found.append(result.data)
+                else:
+                    self._unavailable.add(result.key)
+            self.add(found)
@@ -0,0 +1,283 @@
+"""Tweet count time series from /tweets/counts/all
+
+Long windows are split into ranges counted concurrently, and buckets that
+are over can be kept in a `CountStore` so that counting the same or an
+extended window again only requests the buckets that are not known yet.
+
+>>> engine = CountsEngine(client, store=CountStore("counts.db"))
+>>> series = engine.series(["#python"], "2022-01-01", "2022-02-01", granularity="hour")
+>>> series.total, series.resample("day").to_buckets()[0]
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import sqlite3
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from search_client.client import SearchClient
+
+# seconds in a bucket of each granularity
+GRANULARITIES = {"minute": 60, "hour": 3600, "day": 86400}
+
+# end_time must be at least 10 seconds before the request
+END_TIME_MARGIN = 30
+
+
+def to_epoch(value: dt.datetime | dt.date | str | int | float) -> int:
+    """Seconds since the epoch of a datetime, date or ISO 8601 string, naive times are UTC"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    elif not isinstance(value, dt.datetime):
+        value = dt.datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dt.timezone.utc)
+    return int(value.timestamp())
+
+
+def to_iso(epoch: int) -> str:
+    """ISO 8601 string in the format of the API, e.g. 2022-01-01T00:00:00.000Z"""
+    return dt.datetime.fromtimestamp(epoch, dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class CountSeries:
+    """Contiguous tweet counts of equal buckets, stored as one start time and an array of counts
+
+    Args:
+        granularity (str): "minute", "hour" or "day"
+        start (int): start of the first bucket in seconds since the epoch
+        counts (Iterable[int]): count of each bucket, oldest first
+    """
+
+    __slots__ = ("granularity", "start", "counts")
+
+    def __init__(self, granularity: str, start: int, counts: Iterable[int]) -> None:
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {list(GRANULARITIES)}, got {granularity!r}")
+        self.granularity = granularity
+        self.start = start
+        self.counts = counts if isinstance(counts, array) else array("q", counts)
+
+    @property
+    def step(self) -> int:
+        return GRANULARITIES[self.granularity]
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.counts) * self.step
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __getitem__(self, i: int) -> int:
+        return self.counts[i]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CountSeries):
+            return NotImplemented
+        return (self.granularity, self.start, self.counts) == (other.granularity, other.start, other.counts)
+
+    def __repr__(self) -> str:
+        return f"CountSeries({self.granularity!r}, {to_iso(self.start)!r}, buckets={len(self)}, total={self.total})"
+
+    def items(self) -> Iterator[tuple[dt.datetime, int]]:
+        """Start datetime and count of every bucket"""
+        for i, count in enumerate(self.counts):
+            yield dt.datetime.fromtimestamp(self.start + i * self.step, dt.timezone.utc), count
+
+    def to_buckets(self) -> list[dict]:
+        """Buckets in the shape returned by the API, e.g. for `archive.plan_slices`"""
+        step = self.step
+        return [
+            {"start": to_iso(self.start + i * step), "end": to_iso(self.start + (i + 1) * step), "tweet_count": c}
+            for i, c in enumerate(self.counts)
+        ]
+
+    def resample(self, granularity: str) -> CountSeries:
+        """Sum the buckets into coarser ones, e.g. minutes into hours"""
+        step = GRANULARITIES[granularity]
+        if step < self.step:
+            raise ValueError(f"cannot resample {self.granularity} buckets into {granularity} buckets")
+
+        start = self.start - self.start % step
+        counts = array("q", [0]) * ((self.end - start + step - 1) // step)
+        for i, count in enumerate(self.counts):
+            counts[(self.start + i * self.step - start) // step] += count
+        return CountSeries(granularity, start, counts)
+
+
+class CountStore:
+    """Buckets that are over, they never change so they are fetched once.
+
+    Args:
+        conn (sqlite3.Connection | str, optional):
+            Connection or path of the database to store the buckets in. Defaults to ":memory:".
+    """
+
+    def __init__(self, conn: sqlite3.Connection | str = ":memory:") -> None:
+        self.conn = sqlite3.connect(conn, check_same_thread=False) if isinstance(conn, str) else conn
+        self.conn.execute(
+            """\
+        create table if not exists CountBucket (
+            query text not null,
+            granularity text not null,
+            start integer not null,
+            tweet_count integer not null,
+            primary key (query, granularity, start)
+            ) without rowid;
+        """
+        )
+        self.conn.commit()
+
+    def load(self, query: str, granularity: str, start: int, end: int) -> dict[int, int]:
+        """Known counts of the buckets starting in [start, end) by start"""
+        rows = self.conn.execute(
+            "select start, tweet_count from CountBucket"
+            " where query = ? and granularity = ? and start >= ? and start < ?",
+            (query, granularity, start, end),
+        )
+        return dict(rows)
+
+    def save(self, query: str, granularity: str, counts: dict[int, int]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "insert or replace into CountBucket values (?, ?, ?, ?)",
+                [(query, granularity, start, count) for start, count in counts.items()],
+            )
+
+
+def missing_ranges(starts: Iterable[int], known: dict[int, int], step: int) -> list[tuple[int, int]]:
+    """Contiguous [start, end) ranges of the bucket `starts` that are not `known`"""
+    ranges: list[list[int]] = []
+    for start in starts:
+        if start in known:
+            continue
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = start + step
+        else:
+            ranges.append([start, start + step])
+    return [(start, end) for start, end in ranges]
+
+
+def split_ranges(ranges: list[tuple[int, int]], parts: int, step: int) -> list[tuple[int, int]]:
+    """Split `ranges` into about `parts` pieces of whole buckets so they can be counted concurrently"""
+    buckets = sum((end - start) // step for start, end in ranges)
+    size = max(-(-buckets // max(parts, 1)), 1) * step
+    pieces = []
+    for start, end in ranges:
+        for piece_start in range(start, end, size):
+            pieces.append((piece_start, min(piece_start + size, end)))
+    return pieces
+
+
+class CountsEngine:
+    """Count tweets over a window as a `CountSeries`, fetching ranges concurrently.
+
+    The window is widened to whole buckets and cut at the current time.
+    Buckets that ended before the request are saved in `store` and never
+    requested again, only the missing ones (e.g. the new tail of a window
+    that was counted before) are fetched.
+
+    Args:
+        client (SearchClient): client used to request /tweets/counts/all
+        workers (int, optional): number of ranges counted at the same time. Defaults to 4.
+        store (CountStore | None, optional): where finished buckets are kept. Defaults to None.
+        clock (Callable[[], float], optional): Defaults to time.time.
+    """
+
+    def __init__(
+        self,
+        client: SearchClient,
+        *,
+        workers: int = 4,
+        store: CountStore | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.client = client
+        self.workers = workers
+        self.store = store
+        self.clock = clock
+
+    def _fetch(self, query: str, granularity: str, start: int, end: int) -> dict[int, int]:
+        counts = {}
+        pages = self.client.iter_count_pages(
+            query, granularity=granularity, start_time=to_iso(start), end_time=to_iso(end)
+        )
+        for page in pages:
+            for bucket in page.data:
+                counts[to_epoch(bucket["start"])] = bucket["tweet_count"]
+        return counts
+
+    def series(
+        self,
+        query: list[str] | str,
+        start_time: dt.datetime | dt.date | str,
+        end_time: dt.datetime | dt.date | str | None = None,
+        *,
+        granularity: str = "day",
+    ) -> CountSeries:
+        """Counts of `query` in every bucket between `start_time` and `end_time`
+
+        Args:
+            query (list[str] | str): Query to Twitter API.
+            start_time (dt.datetime | dt.date | str): start of the window, rounded down to a bucket
+            end_time (dt.datetime | dt.date | str | None, optional):
+                end of the window, rounded up to a bucket. Defaults to now.
+            granularity (str, optional): "minute", "hour" or "day". Defaults to "day".
+
+        Raises:
+            APIError: a range could not be counted, the buckets of the other ranges are still stored
+            RuntimeError: the API returned no count for some buckets of the window
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {list(GRANULARITIES)}, got {granularity!r}")
+        query = query if isinstance(query, str) else " ".join(query)
+        step = GRANULARITIES[granularity]
+        latest = int(self.clock()) - END_TIME_MARGIN
+
+        start = to_epoch(start_time)
+        start -= start % step
+        end = min(to_epoch(end_time) if end_time is not None else latest, latest)
+        end += -end % step
+        starts = range(start, end, step)
+
+        known = self.store.load(query, granularity, start, end) if self.store is not None else {}
+        pieces = split_ranges(missing_ranges(starts, known, step), self.workers, step)
+
+        fetched: dict[int, int] = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=max(self.workers, 1)) as pool:
+            # the last bucket is still running, it is only counted up to now
+            futures = [pool.submit(self._fetch, query, granularity, s, min(e, latest)) for s, e in pieces]
+            for future in futures:
+                try:
+                    fetched.update(future.result())
+                except Exception as err:
+                    error = error or err
+
+        if self.store is not None:
+            finished = {s: c for s, c in fetched.items() if s + step <= latest}
+            if finished:
+                self.store.save(query, granularity, finished)
+        if error is not None:
+            raise error
+
+        known.update(fetched)
+        missing = [s for s in starts if s not in known]
+        if missing:
+            # never fill them with 0, it would pass for a real count
+            raise RuntimeError(
+                f"no count returned for {len(missing)} {granularity} buckets of {query!r},"
+                f" the first one starting at {to_iso(missing[0])}"
+            )
+        return CountSeries(granularity, start, (known[s] for s in starts))
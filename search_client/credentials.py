@@ -0,0 +1,200 @@
+"""Pool of bearer tokens, each with its own rate-limit budget
+
+Every token of a project has its own quota, so a crawl holding several tokens
+can send each request with the token that has the most budget left on the
+endpoint and multiply its throughput by the number of tokens.
+
+>>> pool = CredentialPool(["token-a", "token-b", "token-c"])
+>>> client = SearchClient(pool)
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Mapping
+
+from search_client.constants import Config, get_config
+from search_client.ratelimit import RateLimiter, _int_header
+
+# responses after which a token is set aside and the request retried
+UNAUTHORIZED = 401
+TOO_MANY_REQUESTS = 429
+
+
+@dataclass(eq=False)
+class Credential:
+    """A bearer token with the rate-limit buckets of its own quota"""
+
+    token: str
+    rate_limiter: RateLimiter = field(default_factory=RateLimiter)
+    # epoch seconds until which the token is not used on any endpoint, e.g. after a 401
+    quarantined_until: float = 0.0
+
+    @property
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def __repr__(self) -> str:
+        # never show the token itself
+        return f"Credential(token='...{self.token[-4:]}', quarantined_until={self.quarantined_until})"
+
+
+class CredentialPool:
+    """Load balance requests across bearer tokens.
+
+    Each request goes to the token with the most remaining budget on its
+    endpoint, tokens whose budget is unknown yet being tried first. A token
+    answered with 429 is left out of that endpoint until its window resets, one
+    answered with 401 is left out of every endpoint for `quarantine` seconds.
+    The pool only waits when every token is exhausted or quarantined.
+
+    Like `RateLimiter`, `reserve` never sleeps so the pool can be shared by the
+    sync and async clients.
+
+    Args:
+        credentials (Iterable[str | Credential]):
+            Bearer tokens, or `Credential` objects to give a token its own `RateLimiter`.
+
+        quarantine (float, optional):
+            Seconds a token is set aside after a 401 response that carries no reset header.
+            Defaults to 900.
+
+        max_retries (int | None, optional):
+            How many times a 401 or 429 response is retried. Defaults to the
+            `max_retries` of the first token's rate limiter.
+
+        clock (Callable[[], float], optional):
+            Returns the current epoch time in seconds. Defaults to time.time.
+
+        sleep (Callable[[float], None], optional):
+            Used by `acquire` to block. Defaults to time.sleep.
+
+        Other arguments are passed to the `RateLimiter` of every token given as a string.
+    """
+
+    def __init__(
+        self,
+        credentials: Iterable[str | Credential],
+        *,
+        quarantine: float = 900,
+        max_retries: int | None = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        **limiter_kwargs,
+    ) -> None:
+        self.credentials = [
+            c if isinstance(c, Credential) else Credential(c, RateLimiter(clock=clock, sleep=sleep, **limiter_kwargs))
+            for c in credentials
+        ]
+        if not self.credentials:
+            raise ValueError("CredentialPool needs at least one bearer token")
+        self.quarantine = quarantine
+        self.max_retries = max_retries if max_retries is not None else self.credentials[0].rate_limiter.max_retries
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_token(cls, token: str, rate_limiter: RateLimiter | None = None) -> CredentialPool:
+        """Pool of a single token, pacing requests exactly like its `rate_limiter` alone"""
+        rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        return cls(
+            [Credential(token, rate_limiter)],
+            max_retries=rate_limiter.max_retries,
+            clock=rate_limiter.clock,
+            sleep=rate_limiter.sleep,
+        )
+
+    @classmethod
+    def from_config(cls, config: Config | None = None, **kwargs) -> CredentialPool:
+        """Pool of `config.bearer_tokens`, the `BEARER_TOKEN` and `BEARER_TOKENS` of `.env` by default.
+        Other arguments are passed to `CredentialPool`.
+        """
+        config = config if config is not None else get_config()
+        return cls(config.bearer_tokens, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    def _budget(self, credential: Credential, endpoint: str, now: float) -> float:
+        bucket = credential.rate_limiter.bucket(endpoint)
+        if bucket.remaining is None:
+            return math.inf
+        if bucket.remaining <= 0 and bucket.reset <= now:
+            # the window is over, the bucket is refilled on the next reserve
+            return math.inf if bucket.limit is None else bucket.limit
+        return bucket.remaining
+
+    def _delay(self, credential: Credential, endpoint: str, now: float) -> float:
+        """Seconds until `credential` can be used on `endpoint`"""
+        if credential.quarantined_until > now:
+            return credential.quarantined_until - now
+        if self._budget(credential, endpoint, now) > 0:
+            return 0.0
+        bucket = credential.rate_limiter.bucket(endpoint)
+        return max(bucket.reset - now, 0.0) + credential.rate_limiter.margin
+
+    def reserve(self, endpoint: str) -> tuple[Credential | None, float]:
+        """Take a token of the credential with the most budget for `endpoint`.
+
+        Returns:
+            tuple[Credential | None, float]: the credential and 0, or `None` and the seconds
+            to wait before calling again if every credential is exhausted or quarantined
+        """
+        with self._lock:
+            now = self.clock()
+            usable = [c for c in self.credentials if c.quarantined_until <= now]
+            usable.sort(key=lambda c: self._budget(c, endpoint, now), reverse=True)
+            delays = [c.quarantined_until - now for c in self.credentials if c.quarantined_until > now]
+            for credential in usable:
+                delay = credential.rate_limiter.reserve(endpoint)
+                if delay <= 0:
+                    return credential, 0.0
+                delays.append(delay)
+            return None, min(delays)
+
+    def acquire(self, endpoint: str) -> tuple[Credential, float]:
+        """Block until a credential has budget for `endpoint`, returns it and the seconds waited"""
+        waited = 0.0
+        credential, delay = self.reserve(endpoint)
+        while credential is None:
+            self.sleep(delay)
+            waited += delay
+            credential, delay = self.reserve(endpoint)
+        return credential, waited
+
+    def update(self, credential: Credential, endpoint: str, headers: Mapping[str, str]) -> None:
+        """Sync the bucket of `credential` with the headers of a response"""
+        credential.rate_limiter.update(endpoint, headers)
+
+    def penalize(
+        self,
+        credential: Credential,
+        endpoint: str,
+        status: int,
+        headers: Mapping[str, str],
+        attempt: int,
+    ) -> float | None:
+        """Set `credential` aside after a 401 or 429 response.
+
+        Returns:
+            float | None: seconds to wait before retrying with the best credential,
+            0 if another one is ready, `None` if the request should not be retried
+        """
+        now = self.clock()
+        if status == TOO_MANY_REQUESTS:
+            delay = credential.rate_limiter.penalize(endpoint, headers, attempt)
+        else:
+            if all(c is credential or c.quarantined_until > now for c in self.credentials):
+                # the last working token was rejected, waiting will not fix it
+                return None
+            reset = _int_header(headers, "x-rate-limit-reset")
+            with self._lock:
+                credential.quarantined_until = reset if reset is not None and reset > now else now + self.quarantine
+            delay = math.inf
+
+        others = [self._delay(c, endpoint, now) for c in self.credentials if c is not credential]
+        return min([delay, *others])
@@ -1,38 +1,623 @@
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
 import sqlite3
-from typing import final
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from search_client.field_enums import Expansions, MediaFields, PlaceFields, PollFields, TweetFields, UserFields
+from search_client.plan import Projection
+
+DEFAULT_DB = "tweets.db"
+
+# column name -> declaration, new columns are added to existing tables on connect
+TWEET_COLUMNS = {
+    "tweet_id": "integer primary key",
+    "text": "text not null",
+    "author_id": "integer",
+    "conversation_id": "integer",
+    "created_at": "text",
+    "lang": "text",
+    "in_reply_to_user_id": "integer",
+    "possibly_sensitive": "integer",
+    "reply_settings": "text",
+    "source": "text",
+    "geo_place_id": "text",
+    "referenced_tweets": "text",
+    "attachments": "text",
+    "entities": "text",
+    "context_annotations": "text",
+}
+
+SCHEMA = """\
+create table if not exists TweetMetrics (
+    tweet_id integer primary key references Tweet (tweet_id),
+    retweet_count integer,
+    reply_count integer,
+    like_count integer,
+    quote_count integer,
+    impression_count integer
+    );
+
+create table if not exists User (
+    user_id integer primary key,
+    username text,
+    name text,
+    created_at text,
+    description text,
+    location text,
+    profile_image_url text,
+    url text,
+    pinned_tweet_id integer,
+    protected integer,
+    verified integer
+    );
+
+create table if not exists UserMetrics (
+    user_id integer primary key references User (user_id),
+    followers_count integer,
+    following_count integer,
+    tweet_count integer,
+    listed_count integer
+    );
+
+create table if not exists Media (
+    media_key text primary key,
+    type text,
+    url text,
+    preview_image_url text,
+    width integer,
+    height integer,
+    duration_ms integer,
+    alt_text text
+    );
+
+create table if not exists Place (
+    place_id text primary key,
+    full_name text,
+    name text,
+    country text,
+    country_code text,
+    place_type text
+    );
+
+create table if not exists Poll (
+    poll_id text primary key,
+    voting_status text,
+    end_datetime text,
+    duration_minutes integer,
+    options text
+    );
+
+create index if not exists idx_tweet_author_id on Tweet (author_id);
+create index if not exists idx_tweet_created_at on Tweet (created_at);
+create index if not exists idx_tweet_conversation_id on Tweet (conversation_id);
+create index if not exists idx_tweet_lang on Tweet (lang);
+create index if not exists idx_user_username on User (username);
+"""
+
+# fields and expansions stored by `TweetStore`, nothing else needs to be requested
+STORE_PROJECTION = Projection(
+    tweet_fields=tuple(
+        f.value
+        for f in TweetFields
+        if (f.value in TWEET_COLUMNS and f != TweetFields.TEXT) or f in (TweetFields.GEO, TweetFields.PUBLIC_METRICS)
+    ),
+    expansions=tuple(
+        e.value
+        for e in (
+            Expansions.AUTHOR_ID,
+            Expansions.ATTACHMENT_MEDIA_KEYS,
+            Expansions.GEO_PLACE_ID,
+            Expansions.ATTACHMENT_POLL_IDS,
+        )
+    ),
+    user_fields=tuple(f.value for f in UserFields if f not in (UserFields.ID, UserFields.ENTITIES, UserFields.WITHHELD)),
+    media_fields=tuple(
+        f.value
+        for f in (
+            MediaFields.TYPE,
+            MediaFields.URL,
+            MediaFields.PREVIEW_IMAGE_URL,
+            MediaFields.WIDTH,
+            MediaFields.HEIGHT,
+            MediaFields.DURATION_MS,
+            MediaFields.ALT_TEXT,
+        )
+    ),
+    place_fields=tuple(
+        f.value
+        for f in (
+            PlaceFields.FULL_NAME,
+            PlaceFields.NAME,
+            PlaceFields.COUNTRY,
+            PlaceFields.COUNTRY_CODE,
+            PlaceFields.PLACE_TYPE,
+        )
+    ),
+    poll_fields=tuple(
+        f.value
+        for f in (PollFields.VOTING_STATUS, PollFields.END_DATETIME, PollFields.DURATION_MINUTES, PollFields.OPTIONS)
+    ),
+)
+
+_default_conn: sqlite3.Connection | None = None
+
+
+def connect(database: str = DEFAULT_DB) -> sqlite3.Connection:
+    """Open `database` in WAL mode with the tweet schema created or migrated"""
+    conn = sqlite3.connect(database, check_same_thread=False)
+    enable_wal(conn)
+    conn.execute("pragma synchronous = normal")
+    create_schema(conn)
+    return conn
+
+
+def enable_wal(conn: sqlite3.Connection) -> None:
+    """Switch the database of `conn` to WAL mode, left as is while a transaction is open"""
+    if not conn.in_transaction:
+        conn.execute("pragma journal_mode = wal")
+
+
+def create_schema(conn: sqlite3.Connection) -> None:
+    """Create the tables and indexes, adding columns missing from an older `Tweet` table"""
+    columns = ",\n    ".join(f"{name} {decl}" for name, decl in TWEET_COLUMNS.items())
+    with conn:
+        conn.execute(f"create table if not exists Tweet (\n    {columns}\n    )")
+        existing = {row[1] for row in conn.execute("pragma table_info(Tweet)")}
+        for name, decl in TWEET_COLUMNS.items():
+            if name not in existing:
+                conn.execute(f"alter table Tweet add column {name} {decl}")
+        # handles are freed and reused by other accounts, older databases indexed them as unique
+        if any(row[1] == "idx_user_username" and row[2] for row in conn.execute("pragma index_list(User)")):
+            conn.execute("drop index idx_user_username")
+        conn.executescript(SCHEMA)
+
+
+def get_default_conn() -> sqlite3.Connection:
+    """Connection to `DEFAULT_DB`, only opened on first use"""
+    global _default_conn
+    if _default_conn is None:
+        _default_conn = connect(DEFAULT_DB)
+    return _default_conn
+
+
+def __getattr__(name: str):
+    if name == "default_conn":
+        return get_default_conn()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-default_conn = sqlite3.connect("tweets.db")
+def _json(value) -> str | None:
+    return json.dumps(value) if value is not None else None
+
+
+def _bool(value) -> int | None:
+    return int(value) if value is not None else None
+
+
+def tweet_row(tweet: dict) -> tuple:
+    return (
+        tweet["id"],
+        tweet["text"],
+        tweet.get("author_id"),
+        tweet.get("conversation_id"),
+        tweet.get("created_at"),
+        tweet.get("lang"),
+        tweet.get("in_reply_to_user_id"),
+        _bool(tweet.get("possibly_sensitive")),
+        tweet.get("reply_settings"),
+        tweet.get("source"),
+        (tweet.get("geo") or {}).get("place_id"),
+        _json(tweet.get("referenced_tweets")),
+        _json(tweet.get("attachments")),
+        _json(tweet.get("entities")),
+        _json(tweet.get("context_annotations")),
+    )
+
+
+def tweet_metrics_row(tweet: dict) -> tuple:
+    metrics = tweet["public_metrics"]
+    return (
+        tweet["id"],
+        metrics.get("retweet_count"),
+        metrics.get("reply_count"),
+        metrics.get("like_count"),
+        metrics.get("quote_count"),
+        metrics.get("impression_count"),
+    )
+
+
+def user_row(user: dict) -> tuple:
+    return (
+        user["id"],
+        user.get("username"),
+        user.get("name"),
+        user.get("created_at"),
+        user.get("description"),
+        user.get("location"),
+        user.get("profile_image_url"),
+        user.get("url"),
+        user.get("pinned_tweet_id"),
+        _bool(user.get("protected")),
+        _bool(user.get("verified")),
+    )
+
+
+def user_metrics_row(user: dict) -> tuple:
+    metrics = user["public_metrics"]
+    return (
+        user["id"],
+        metrics.get("followers_count"),
+        metrics.get("following_count"),
+        metrics.get("tweet_count"),
+        metrics.get("listed_count"),
+    )
+
+
+def media_row(media: dict) -> tuple:
+    return (
+        media["media_key"],
+        media.get("type"),
+        media.get("url"),
+        media.get("preview_image_url"),
+        media.get("width"),
+        media.get("height"),
+        media.get("duration_ms"),
+        media.get("alt_text"),
+    )
+
+
+def place_row(place: dict) -> tuple:
+    return (
+        place["id"],
+        place.get("full_name"),
+        place.get("name"),
+        place.get("country"),
+        place.get("country_code"),
+        place.get("place_type"),
+    )
+
+
+def poll_row(poll: dict) -> tuple:
+    return (
+        poll["id"],
+        poll.get("voting_status"),
+        poll.get("end_datetime"),
+        poll.get("duration_minutes"),
+        _json(poll.get("options")),
+    )
+
+
+# a tweet first stored from the `includes` of a page may lack fields, the ones a later row has are filled in
+# (`text` is never null, so it is left alone)
+_FILLED_TWEET_COLUMNS = [name for name in TWEET_COLUMNS if name not in ("tweet_id", "text")]
+UPSERT_TWEET = (
+    f"insert into Tweet ({', '.join(TWEET_COLUMNS)}) values ({', '.join('?' * len(TWEET_COLUMNS))})\n"
+    "on conflict (tweet_id) do update set\n    "
+    + ",\n    ".join(f"{name} = coalesce(excluded.{name}, {name})" for name in _FILLED_TWEET_COLUMNS)
+    + "\nwhere "
+    + " or ".join(f"({name} is null and excluded.{name} is not null)" for name in _FILLED_TWEET_COLUMNS)
+)
+# media never change once posted, metrics and profiles do so they are upserted
+UPSERT_TWEET_METRICS = """\
+insert into TweetMetrics (tweet_id, retweet_count, reply_count, like_count, quote_count, impression_count)
+values (?, ?, ?, ?, ?, ?)
+on conflict (tweet_id) do update set
+    retweet_count = excluded.retweet_count,
+    reply_count = excluded.reply_count,
+    like_count = excluded.like_count,
+    quote_count = excluded.quote_count,
+    impression_count = excluded.impression_count
+"""
+UPSERT_USER = """\
+insert into User (
+    user_id, username, name, created_at, description, location,
+    profile_image_url, url, pinned_tweet_id, protected, verified
+    )
+values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+on conflict (user_id) do update set
+    username = coalesce(excluded.username, username),
+    name = coalesce(excluded.name, name),
+    created_at = coalesce(excluded.created_at, created_at),
+    description = coalesce(excluded.description, description),
+    location = coalesce(excluded.location, location),
+    profile_image_url = coalesce(excluded.profile_image_url, profile_image_url),
+    url = coalesce(excluded.url, url),
+    pinned_tweet_id = coalesce(excluded.pinned_tweet_id, pinned_tweet_id),
+    protected = coalesce(excluded.protected, protected),
+    verified = coalesce(excluded.verified, verified)
+"""
+UPSERT_USER_METRICS = """\
+insert into UserMetrics (user_id, followers_count, following_count, tweet_count, listed_count)
+values (?, ?, ?, ?, ?)
+on conflict (user_id) do update set
+    followers_count = excluded.followers_count,
+    following_count = excluded.following_count,
+    tweet_count = excluded.tweet_count,
+    listed_count = excluded.listed_count
+"""
+INSERT_MEDIA = "insert or ignore into Media values (?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_PLACE = "insert or ignore into Place values (?, ?, ?, ?, ?, ?)"
+UPSERT_POLL = """\
+insert into Poll values (?, ?, ?, ?, ?)
+on conflict (poll_id) do update set
+    voting_status = excluded.voting_status,
+    options = excluded.options
+"""
+
+
+@dataclass
+class PageRows:
+    """Rows of every table for a batch of pages, as built by `page_rows`"""
+
+    tweets: list[tuple] = field(default_factory=list)
+    tweet_metrics: list[tuple] = field(default_factory=list)
+    users: list[tuple] = field(default_factory=list)
+    user_metrics: list[tuple] = field(default_factory=list)
+    media: list[tuple] = field(default_factory=list)
+    places: list[tuple] = field(default_factory=list)
+    polls: list[tuple] = field(default_factory=list)
+
+
+def page_rows(pages: Iterable[dict]) -> PageRows:
+    """Turn raw response pages (or `Page` objects) into the rows written by `TweetStore`"""
+    rows = PageRows()
+    for page in pages:
+        page = getattr(page, "response", page)
+        includes = page.get("includes") or {}
+        for tweets in (page.get("data") or [], includes.get("tweets") or []):
+            rows.tweets.extend(map(tweet_row, tweets))
+            rows.tweet_metrics.extend(tweet_metrics_row(t) for t in tweets if t.get("public_metrics"))
+        users = includes.get("users") or []
+        rows.users.extend(map(user_row, users))
+        rows.user_metrics.extend(user_metrics_row(u) for u in users if u.get("public_metrics"))
+        rows.media.extend(map(media_row, includes.get("media") or []))
+        rows.places.extend(map(place_row, includes.get("places") or []))
+        rows.polls.extend(map(poll_row, includes.get("polls") or []))
+    return rows
+
+
+def rows_of_page(response: dict) -> PageRows:
+    """Rows of a single raw response page"""
+    return page_rows([response])
+
+
+class TweetStore:
+    """Bulk, transactional writer of tweets and their includes into SQLite.
+
+    Rows are written with `executemany` inside one transaction per batch,
+    duplicates only fill in missing fields (metrics and user profiles are upserted), and
+    tweets, users, metrics, media, places and polls go to their own tables.
+
+    >>> store = TweetStore("tweets.db")
+    >>> for page in client.iter_pages(["from:TwitterDev"], expansions=["author_id"]):
+    ...     store.save_page(page.response)
+
+    Args:
+        conn (sqlite3.Connection | str, optional):
+            Connection or path of the database. Defaults to `DEFAULT_DB`.
+    """
+
+    def __init__(self, conn: sqlite3.Connection | str = DEFAULT_DB) -> None:
+        self._owns_conn = isinstance(conn, str)
+        if isinstance(conn, str):
+            conn = connect(conn)
+        else:
+            enable_wal(conn)
+            create_schema(conn)
+        self.conn = conn
+
+    projection = STORE_PROJECTION
+
+    def save_tweets(self, tweets: Iterable[dict]) -> int:
+        """Write tweets and their public metrics in one transaction, returns the number of new or completed tweets"""
+        return self.save_pages([{"data": list(tweets)}])
+
+    def save_users(self, users: Iterable[dict]) -> None:
+        """Upsert users and their public metrics in one transaction"""
+        self.save_pages([{"includes": {"users": list(users)}}])
+
+    def save_page(self, response: dict) -> int:
+        """Write the tweets of a raw response page along with its `includes`"""
+        return self.save_pages([response])
+
+    def save_pages(self, pages: Iterable[dict]) -> int:
+        """Write many raw response pages in a single transaction, returns the number of new or completed tweets"""
+        return self.write_rows(page_rows(pages))
+
+    # rows of one page, see `Sink.transform`
+    transform = staticmethod(rows_of_page)
+
+    def write_rows(self, rows: PageRows) -> int:
+        """Write rows built by `page_rows` in a single transaction, returns the number of new or completed tweets"""
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(UPSERT_TWEET, rows.tweets)
+            inserted = self.conn.total_changes - before
+            self.conn.executemany(UPSERT_TWEET_METRICS, rows.tweet_metrics)
+            self.conn.executemany(UPSERT_USER, rows.users)
+            self.conn.executemany(UPSERT_USER_METRICS, rows.user_metrics)
+            self.conn.executemany(INSERT_MEDIA, rows.media)
+            self.conn.executemany(INSERT_PLACE, rows.places)
+            self.conn.executemany(UPSERT_POLL, rows.polls)
+        return inserted
+
+    def close(self) -> None:
+        if self._owns_conn:
+            self.conn.close()
+
+    def __enter__(self) -> TweetStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
 
 def save_to_db(
     tweets: list[dict],
     conn: sqlite3.Connection | str,
-) -> None:
+) -> int:
+    """Write tweets to the database in one transaction, ignoring the ones already stored
 
+    Args:
+        tweets (list[dict]): list of tweets
+        conn (sqlite3.Connection | str): connection or path of the database
+
+    Returns:
+        int: number of tweets that were not stored yet
+    """
     assert len(tweets) != 0, "tweets should not be empty"
 
-    if isinstance(conn, str):
-        conn = sqlite3.connect(conn)
+    with TweetStore(conn) as store:
+        return store.save_tweets(tweets)
+
+
+@dataclass
+class Checkpoint:
+    """Progress of one crawl, saved after every page by `CheckpointStore`"""
+
+    key: str
+    endpoint: str
+    query: str
+    start_time: str | None = None
+    end_time: str | None = None
+    next_token: str | None = None
+    newest_id: str | None = None
+    oldest_id: str | None = None
+    pages: int = 0
+    count: int = 0
+    done: bool = False
+
+
+class CheckpointStore:
+    """Persist crawl progress to SQLite so that long crawls can be resumed.
+
+    A crawl is identified by its endpoint, query, time window and id bounds.
+    After every page the last `next_token`, newest/oldest ids, pages done and
+    tweets counted are written, so `resume=True` continues from the page after
+    the last one processed instead of starting from zero.
+
+    >>> store = CheckpointStore("crawl.db")
+    >>> for page in client.iter_pages(["from:TwitterDev"], archive=True, checkpoint=store, resume=True):
+    ...     save_to_db(page.data, conn)
 
-    cur = conn.cursor()
-    cur.execute(
-        """\
-    create table if not exists Tweet (
-        tweet_id integer primary key,
-        text text not null
-        );
+    Args:
+        conn (sqlite3.Connection | str):
+            Connection or path of the database to store the checkpoints in.
     """
-    )
 
-    try:
+    def __init__(self, conn: sqlite3.Connection | str) -> None:
+        self.conn = sqlite3.connect(conn, check_same_thread=False) if isinstance(conn, str) else conn
+        self.conn.execute(
+            """\
+        create table if not exists Checkpoint (
+            key text primary key,
+            endpoint text not null,
+            query text not null,
+            start_time text,
+            end_time text,
+            next_token text,
+            newest_id text,
+            oldest_id text,
+            pages integer not null default 0,
+            count integer not null default 0,
+            done integer not null default 0,
+            updated_at text not null
+            );
+        """
+        )
+        self.conn.commit()
 
-        for t in tweets:
-            cur.execute("INSERT INTO Tweet (tweet_id, text) values (?, ?)", (t["id"], t["text"]))
-        conn.commit()
-    except (sqlite3.IntegrityError, sqlite3.OperationalError) as err:
-        print(err)
-    finally:
-        cur.close()
+    @staticmethod
+    def make_key(endpoint: str, params: dict) -> str:
+        """Identify a crawl by everything but its cursor and page size"""
+        ignored = {"next_token", "max_results", "pagination_token"}
+        identity = {k: str(v) for k, v in params.items() if v is not None and k not in ignored}
+        payload = json.dumps([endpoint, identity], sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
 
-        if isinstance(conn, str):
-            conn.close()
+    def start(self, endpoint: str, params: dict, *, resume: bool = False) -> Checkpoint:
+        """Return the stored checkpoint of the crawl if resuming, a fresh one otherwise"""
+        key = self.make_key(endpoint, params)
+        if resume:
+            checkpoint = self.load(key)
+            if checkpoint is not None:
+                return checkpoint
+
+        return Checkpoint(
+            key=key,
+            endpoint=endpoint,
+            query=str(params.get("query", "")),
+            start_time=_str_or_none(params.get("start_time")),
+            end_time=_str_or_none(params.get("end_time")),
+        )
+
+    def load(self, key: str) -> Checkpoint | None:
+        row = self.conn.execute(
+            """\
+        select key, endpoint, query, start_time, end_time, next_token,
+            newest_id, oldest_id, pages, count, done
+        from Checkpoint where key = ?
+        """,
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        return Checkpoint(*row[:-1], done=bool(row[-1]))
+
+    def save(self, checkpoint: Checkpoint) -> None:
+        with self.conn:
+            self.conn.execute(
+                """\
+            insert or replace into Checkpoint (
+                key, endpoint, query, start_time, end_time, next_token,
+                newest_id, oldest_id, pages, count, done, updated_at
+                ) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    checkpoint.key,
+                    checkpoint.endpoint,
+                    checkpoint.query,
+                    checkpoint.start_time,
+                    checkpoint.end_time,
+                    checkpoint.next_token,
+                    checkpoint.newest_id,
+                    checkpoint.oldest_id,
+                    checkpoint.pages,
+                    checkpoint.count,
+                    int(checkpoint.done),
+                    dt.datetime.now(dt.timezone.utc).isoformat(),
+                ),
+            )
+
+    def record(self, checkpoint: Checkpoint, response: dict) -> None:
+        """Advance `checkpoint` past a processed page and save it"""
+        meta = response.get("meta") or {}
+        data = response.get("data") or []
+        ids = [int(item["id"]) for item in data if "id" in item]
+
+        newest = meta.get("newest_id") or (str(max(ids)) if ids else None)
+        oldest = meta.get("oldest_id") or (str(min(ids)) if ids else None)
+        if newest is not None and (checkpoint.newest_id is None or int(newest) > int(checkpoint.newest_id)):
+            checkpoint.newest_id = newest
+        if oldest is not None and (checkpoint.oldest_id is None or int(oldest) < int(checkpoint.oldest_id)):
+            checkpoint.oldest_id = oldest
+
+        checkpoint.pages += 1
+        checkpoint.count += meta.get("total_tweet_count", meta.get("result_count", len(data)))
+        checkpoint.next_token = meta.get("next_token")
+        checkpoint.done = checkpoint.next_token is None
+        self.save(checkpoint)
+
+    def clear(self, key: str) -> None:
+        with self.conn:
+            self.conn.execute("delete from Checkpoint where key = ?", (key,))
+
+
+def _str_or_none(value) -> str | None:
+    if value is None:
+        return None
+    return value.isoformat() if isinstance(value, dt.datetime) else str(value)
@@ -0,0 +1,202 @@
+"""Pluggable JSON decoding of response bodies
+
+`orjson` or `msgspec` are used when installed (`pip install search_client[fast]`),
+otherwise the stdlib `json` module. Decoders work on the raw bytes of a response,
+skipping the text decoding step of `requests.Response.json`.
+
+>>> decoder = get_decoder("msgspec", typed=True)
+>>> client = SearchClient("<your_token>", decoder=decoder)
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+def _to_builtins(obj: Any) -> Any:
+    # typed search structs are mapping-like, encoders only know dicts
+    if hasattr(obj, "items"):
+        return dict(obj.items())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class Decoder:
+    """Stdlib decoder, the base of the faster ones.
+
+    `decode_search` is used for /search/recent and /search/all bodies, decoders
+    able to decode straight into typed objects override it.
+    """
+
+    name = "json"
+
+    def decode(self, content: bytes) -> Any:
+        return json.loads(content)
+
+    def decode_search(self, content: bytes) -> Any:
+        return self.decode(content)
+
+    def encode(self, obj: Any) -> str:
+        """One-line JSON text of `obj`, non-ASCII characters are kept as is"""
+        return json.dumps(obj, ensure_ascii=False, default=_to_builtins)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class OrjsonDecoder(Decoder):
+    name = "orjson"
+
+    def __init__(self) -> None:
+        if orjson is None:
+            raise ImportError("OrjsonDecoder requires orjson, `pip install orjson`")
+
+    def decode(self, content: bytes) -> Any:
+        return orjson.loads(content)
+
+    def encode(self, obj: Any) -> str:
+        return orjson.dumps(obj, default=_to_builtins).decode()
+
+
+class MsgspecDecoder(Decoder):
+    """Decoder built on msgspec.
+
+    With `typed=True` search responses are decoded into `SearchResponse` structs
+    whose tweets are `SearchTweet` structs. Both behave like read-only dicts
+    (`get`, `[]`, `in`, `items`) so pages, models, sinks and the database work
+    unchanged, but they are smaller and faster to build than dicts. Tweet fields
+    not declared on `SearchTweet` are dropped.
+
+    Args:
+        typed (bool, optional): decode search responses into structs. Defaults to False.
+    """
+
+    name = "msgspec"
+
+    def __init__(self, typed: bool = False) -> None:
+        if msgspec is None:
+            raise ImportError("MsgspecDecoder requires msgspec, `pip install msgspec`")
+        self.typed = typed
+        self._decoder = msgspec.json.Decoder()
+        self._search_decoder = msgspec.json.Decoder(search_types()[0]) if typed else self._decoder
+        self._encoder = msgspec.json.Encoder(enc_hook=_to_builtins)
+
+    def decode(self, content: bytes) -> Any:
+        return self._decoder.decode(content)
+
+    def decode_search(self, content: bytes) -> Any:
+        return self._search_decoder.decode(content)
+
+    def encode(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode()
+
+    def __repr__(self) -> str:
+        return f"MsgspecDecoder(typed={self.typed})"
+
+
+DECODERS = {"json": Decoder, "orjson": OrjsonDecoder, "msgspec": MsgspecDecoder}
+
+
+def get_decoder(name: str | Decoder | None = None, **kwargs) -> Decoder:
+    """Decoder called `name` ("json", "orjson" or "msgspec"), the fastest installed one if `None`
+
+    Args:
+        name (str | Decoder | None, optional): returned as is if already a `Decoder`. Defaults to None.
+        Other arguments are passed to the decoder, e.g. `typed=True` for msgspec.
+    """
+    if isinstance(name, Decoder):
+        return name
+    if name is None:
+        if kwargs.get("typed") and msgspec is not None:
+            name = "msgspec"
+        else:
+            name = "orjson" if orjson is not None else "msgspec" if msgspec is not None else "json"
+    try:
+        return DECODERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"unknown decoder {name!r}, expected one of {sorted(DECODERS)}") from None
+
+
+# quotes inside JSON strings are escaped, so this only matches the key of `meta`
+_NEXT_TOKEN = re.compile(rb'"next_token"\s*:\s*"([^"\\]*)"')
+
+
+def scan_next_token(content: bytes) -> str | None:
+    """`meta.next_token` of a raw response body, found without decoding the body"""
+    match = _NEXT_TOKEN.search(content)
+    return match.group(1).decode() if match else None
+
+
+@functools.lru_cache(maxsize=None)
+def default_decoder() -> Decoder:
+    """Shared fastest installed decoder"""
+    return get_decoder()
+
+
+if msgspec is not None:
+
+    class MappingStruct(msgspec.Struct, omit_defaults=True):
+        # absent fields are `None` and hidden, like missing keys of a dict
+        def get(self, key: str, default: Any = None) -> Any:
+            value = getattr(self, key, None) if key in self.__struct_fields__ else None
+            return default if value is None else value
+
+        def __getitem__(self, key: str) -> Any:
+            value = self.get(key)
+            if value is None:
+                raise KeyError(key)
+            return value
+
+        def __contains__(self, key: str) -> bool:
+            return self.get(key) is not None
+
+        def keys(self) -> list[str]:
+            return [k for k in self.__struct_fields__ if getattr(self, k) is not None]
+
+        def items(self) -> list[tuple[str, Any]]:
+            return [(k, getattr(self, k)) for k in self.keys()]
+
+    class SearchTweet(MappingStruct):
+        id: str
+        text: str
+        edit_history_tweet_ids: Optional[List[str]] = None
+        attachments: Optional[Dict[str, Any]] = None
+        author_id: Optional[str] = None
+        context_annotations: Optional[List[Dict[str, Any]]] = None
+        conversation_id: Optional[str] = None
+        created_at: Optional[str] = None
+        entities: Optional[Dict[str, Any]] = None
+        geo: Optional[Dict[str, Any]] = None
+        in_reply_to_user_id: Optional[str] = None
+        lang: Optional[str] = None
+        public_metrics: Optional[Dict[str, int]] = None
+        possibly_sensitive: Optional[bool] = None
+        referenced_tweets: Optional[List[Dict[str, str]]] = None
+        reply_settings: Optional[str] = None
+        source: Optional[str] = None
+        withheld: Optional[Dict[str, Any]] = None
+
+    class SearchResponse(MappingStruct):
+        data: Optional[List[SearchTweet]] = None
+        includes: Optional[Dict[str, Any]] = None
+        meta: Optional[Dict[str, Any]] = None
+        errors: Optional[List[Dict[str, Any]]] = None
+
+
+def search_types() -> tuple[type, type]:
+    """`SearchResponse` and `SearchTweet` structs used by typed decoding"""
+    if msgspec is None:
+        raise ImportError("typed decoding requires msgspec, `pip install msgspec`")
+    return SearchResponse, SearchTweet
@@ -10,8 +10,8 @@ class SortOrder(str, Enum):
 
 
 class Expansions(str, Enum):
-    ATTACHMENT_POLL_IDS = "attachment.poll_ids"
-    ATTACHMENT_MEDIA_KEYS = "attachment.media_keys"
+    ATTACHMENT_POLL_IDS = "attachments.poll_ids"
+    ATTACHMENT_MEDIA_KEYS = "attachments.media_keys"
     AUTHOR_ID = "author_id"
     ENTITIES_MENTIONS_USERNAME = "entities.mentions.username"
     GEO_PLACE_ID = "geo.place_id"
@@ -51,7 +51,7 @@ class PollFields(str, Enum):
     END_DATETIME = "end_datetime"
     ID = "id"
     OPTIONS = "options"
-    VOTING_STATUS = "voting status"
+    VOTING_STATUS = "voting_status"
 
 
 class TweetFields(str, Enum):
@@ -0,0 +1,250 @@
+"""Local full-text and metadata index over the tweets stored by `TweetStore`
+
+Queries are written with the search operators of the API, so a subset of an
+already crawled corpus can be selected in milliseconds without spending quota.
+
+>>> index = TweetIndex("tweets.db")
+>>> tweets = index.search("python -is:retweet lang:en", min_followers=10_000)
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import functools
+import re
+import sqlite3
+from typing import Iterator
+
+from search_client.database import DEFAULT_DB, connect, create_schema
+from search_client.query import Rule
+
+# text of `Tweet` indexed with FTS5, kept in sync by triggers
+FTS_SCHEMA = """\
+create virtual table if not exists TweetText using fts5 (
+    text,
+    content = 'Tweet',
+    content_rowid = 'tweet_id'
+    );
+
+create trigger if not exists tweet_text_insert after insert on Tweet begin
+    insert into TweetText (rowid, text) values (new.tweet_id, new.text);
+end;
+
+create trigger if not exists tweet_text_delete after delete on Tweet begin
+    insert into TweetText (TweetText, rowid, text) values ('delete', old.tweet_id, old.text);
+end;
+"""
+
+SELECT_TWEETS = """\
+select
+    Tweet.tweet_id, text, author_id, conversation_id, created_at, lang, in_reply_to_user_id,
+    retweet_count, reply_count, like_count, quote_count, impression_count
+from Tweet left join TweetMetrics using (tweet_id)
+"""
+METRICS = ("retweet_count", "reply_count", "like_count", "quote_count", "impression_count")
+
+
+def _fts_phrase(term: str) -> str:
+    # a quoted FTS5 string matches the tokens of `term` as a phrase, whatever the punctuation
+    return '"' + term.replace('"', '""') + '"'
+
+
+@functools.lru_cache(maxsize=256)
+def _hashtag_pattern(tag: str) -> re.Pattern:
+    return re.compile(rf"#{re.escape(tag)}(?!\w)", re.IGNORECASE)
+
+
+def _has_hashtag(text: str | None, tag: str) -> bool:
+    """Whether `text` uses `tag` as a whole hashtag, e.g. not as the start of `#tagged`"""
+    return text is not None and _hashtag_pattern(tag).search(text) is not None
+
+
+def _timestamp(value: dt.datetime | str) -> str:
+    """`created_at` format of the API, so that timestamps compare as strings"""
+    if isinstance(value, dt.datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(dt.timezone.utc)
+        return value.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return value
+
+
+def _tweet(row: tuple) -> dict:
+    """API-shaped tweet of a row of `SELECT_TWEETS`"""
+    tweet = {
+        "id": str(row[0]),
+        "text": row[1],
+        "author_id": None if row[2] is None else str(row[2]),
+        "conversation_id": None if row[3] is None else str(row[3]),
+        "created_at": row[4],
+        "lang": row[5],
+        "in_reply_to_user_id": None if row[6] is None else str(row[6]),
+    }
+    tweet = {k: v for k, v in tweet.items() if v is not None}
+    if any(v is not None for v in row[7:]):
+        tweet["public_metrics"] = {k: v for k, v in zip(METRICS, row[7:]) if v is not None}
+    return tweet
+
+
+class TweetIndex:
+    """Query the tweets stored by `TweetStore` with the search operators.
+
+    Keywords, phrases, hashtags and exclusions go through an FTS5 index of the
+    tweet text, `from:`, `lang:` and `is:retweet` and the keyword arguments of
+    `search` use the indexes on author, language, `created_at` and
+    `conversation_id`. Tweets saved after the index is created are indexed as
+    they are inserted.
+
+    >>> with TweetIndex("tweets.db") as index:
+    ...     index.search('"machine learning" from:TwitterDev -is:retweet', start_time="2022-01-01")
+
+    Args:
+        conn (sqlite3.Connection | str, optional):
+            Connection or path of the database. Defaults to `DEFAULT_DB`.
+    """
+
+    def __init__(self, conn: sqlite3.Connection | str = DEFAULT_DB) -> None:
+        self._owns_conn = isinstance(conn, str)
+        if isinstance(conn, str):
+            conn = connect(conn)
+        else:
+            enable_wal(conn)
+            create_schema(conn)
+        self.conn = conn
+        conn.create_function("has_hashtag", 2, _has_hashtag)
+
+        exists = conn.execute("select 1 from sqlite_master where name = 'TweetText'").fetchone()
+        with conn:
+            conn.executescript(FTS_SCHEMA)
+            if not exists:
+                # index the tweets stored before the index existed
+                conn.execute("insert into TweetText (TweetText) values ('rebuild')")
+
+    def rebuild(self) -> None:
+        """Rebuild the full-text index from the `Tweet` table"""
+        with self.conn:
+            self.conn.execute("insert into TweetText (TweetText) values ('rebuild')")
+
+    def _where(
+        self,
+        query: str | list[str] | Rule,
+        *,
+        min_followers: int | None = None,
+        start_time: dt.datetime | str | None = None,
+        end_time: dt.datetime | str | None = None,
+        conversation_id: str | None = None,
+    ) -> tuple[str, list]:
+        """`where` clause and params selecting the tweets matching `query` and the filters"""
+        rule = query if isinstance(query, Rule) else Rule.parse(query)
+        clauses, params = [], []
+
+        match = [_fts_phrase(k) for k in rule.keywords + rule.hashtags]
+        if rule.any_of:
+            match.append("(" + " OR ".join(_fts_phrase(k) for k in rule.any_of) + ")")
+        if match:
+            clauses.append("Tweet.tweet_id in (select rowid from TweetText where TweetText match ?)")
+            params.append(" AND ".join(match))
+        if rule.exclude:
+            clauses.append("Tweet.tweet_id not in (select rowid from TweetText where TweetText match ?)")
+            params.append(" OR ".join(_fts_phrase(k) for k in rule.exclude))
+        for hashtag in rule.hashtags:
+            # the tokenizer drops "#", check that the word is used as a whole hashtag
+            clauses.append("has_hashtag(text, ?)")
+            params.append(hashtag)
+
+        if rule.authors:
+            usernames = [a for a in rule.authors if not a.isdigit()]
+            ids = [int(a) for a in rule.authors if a.isdigit()]
+            clauses.append(
+                "(author_id in (select user_id from User where username collate nocase in "
+                f"({', '.join('?' * len(usernames))}))"
+                f" or author_id in ({', '.join('?' * len(ids))}))"
+            )
+            params.extend(usernames + ids)
+        if rule.lang:
+            clauses.append("lang = ?")
+            params.append(rule.lang)
+        if rule.retweets is not None:
+            is_retweet = "coalesce(referenced_tweets, '') like '%\"retweeted\"%'"
+            clauses.append(is_retweet if rule.retweets else f"not {is_retweet}")
+
+        if min_followers is not None:
+            clauses.append("author_id in (select user_id from UserMetrics where followers_count >= ?)")
+            params.append(min_followers)
+        if start_time is not None:
+            clauses.append("created_at >= ?")
+            params.append(_timestamp(start_time))
+        if end_time is not None:
+            clauses.append("created_at < ?")
+            params.append(_timestamp(end_time))
+        if conversation_id is not None:
+            clauses.append("conversation_id = ?")
+            params.append(int(conversation_id))
+
+        return (" where " + " and ".join(clauses)) if clauses else "", params
+
+    def iter_search(
+        self,
+        query: str | list[str] | Rule = "",
+        *,
+        min_followers: int | None = None,
+        start_time: dt.datetime | str | None = None,
+        end_time: dt.datetime | str | None = None,
+        conversation_id: str | None = None,
+        limit: int | None = None,
+    ) -> Iterator[dict]:
+        """Lazily yield the stored tweets matching `query`, newest first.
+
+        Args:
+            query (str | list[str] | Rule, optional):
+                Search operators, see `Rule.parse`, or a `Rule`. Defaults to every tweet.
+
+            min_followers (int | None, optional):
+                Only tweets whose author has at least this many followers. Defaults to None.
+
+            start_time (dt.datetime | str | None, optional):
+                Oldest `created_at`, inclusive. Defaults to None.
+
+            end_time (dt.datetime | str | None, optional):
+                Newest `created_at`, exclusive. Defaults to None.
+
+            conversation_id (str | None, optional):
+                Only tweets of this conversation. Defaults to None.
+
+            limit (int | None, optional):
+                Maximum number of tweets. Defaults to None.
+
+        Yields:
+            dict: tweets shaped like the API's, with their stored `public_metrics`
+        """
+        where, params = self._where(
+            query,
+            min_followers=min_followers,
+            start_time=start_time,
+            end_time=end_time,
+            conversation_id=conversation_id,
+        )
+        sql = SELECT_TWEETS + where + " order by Tweet.tweet_id desc"
+        if limit is not None:
+            sql += " limit ?"
+            params.append(limit)
+        for row in self.conn.execute(sql, params):
+            yield _tweet(row)
+
+    def search(self, query: str | list[str] | Rule = "", **kwargs) -> list[dict]:
+        """Stored tweets matching `query`, newest first, accepts the same arguments as `iter_search`"""
+        return list(self.iter_search(query, **kwargs))
+
+    def count(self, query: str | list[str] | Rule = "", **kwargs) -> int:
+        """Number of stored tweets matching `query`, accepts the filters of `iter_search`"""
+        where, params = self._where(query, **kwargs)
+        return self.conn.execute("select count(*) from Tweet" + where, params).fetchone()[0]
+
+    def close(self) -> None:
+        if self._owns_conn:
+            self.conn.close()
+
+    def __enter__(self) -> TweetIndex:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,247 @@
+"""Event hooks and metrics of the requests sent by `SearchClient`
+
+Instrumentation is off unless an `Instrumentation` is given to the client,
+in which case the hot path only pays for a few `perf_counter` calls and the
+hooks that are registered.
+
+>>> instrumentation = Instrumentation()
+>>> instrumentation.on("retry", lambda event: print("retrying", event.endpoint))
+>>> client = SearchClient("<your_token>", instrumentation=instrumentation)
+>>> with instrumentation.measure() as crawl:
+...     client.get_all_tweets(["from:TwitterDev"], max_page=None)
+>>> crawl.summary()["latency_p99"]
+>>> print(instrumentation.metrics.to_prometheus())
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import threading
+from array import array
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterator
+
+# request_start: before a request is sent
+# request_end: response received, with `seconds`, `status` and `bytes`
+# page_decoded: body decoded, with `seconds` spent decoding and the `tweets` it holds
+# rate_limit_wait: waited `seconds` for the rate-limit budget of the endpoint
+# retry: a 429 response will be retried after `seconds`, `attempt` counts from 1
+EVENTS = ("request_start", "request_end", "page_decoded", "rate_limit_wait", "retry")
+
+# upper bounds in seconds of the request latency histogram, latencies are only kept as bucket counts
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass(frozen=True)
+class Event:
+    name: str
+    endpoint: str
+    seconds: float = 0.0
+    status: int | None = None
+    bytes: int = 0
+    attempt: int = 0
+    tweets: int = 0
+
+
+def histogram_quantile(counts: array | list[int], q: float, max_value: float) -> float:
+    """Percentile `q` (0 to 100) estimated from the counts of each `LATENCY_BUCKETS` bucket and "+Inf",
+    interpolated linearly inside the bucket holding it, 0.0 if there are no values
+    """
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q / 100 * total
+    below = 0
+    for i, count in enumerate(counts):
+        if count and below + count >= rank:
+            lower = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+            upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else max_value
+            return min(lower + (upper - lower) * (rank - below) / count, max_value)
+        below += count
+    return max_value
+
+
+class EndpointMetrics:
+    """Counters and latency histogram of one endpoint, of constant size however many requests are seen"""
+
+    __slots__ = (
+        "requests",
+        "statuses",
+        "bytes",
+        "retries",
+        "pages",
+        "tweets",
+        "fetch",
+        "sleep",
+        "decode",
+        "latency_counts",
+        "max_latency",
+    )
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.statuses: dict[int, int] = defaultdict(int)
+        self.bytes = 0
+        self.retries = 0
+        self.pages = 0
+        self.tweets = 0
+        self.fetch = 0.0
+        self.sleep = 0.0
+        self.decode = 0.0
+        # requests per bucket of `LATENCY_BUCKETS`, the last one is "+Inf"
+        self.latency_counts = array("q", [0] * (len(LATENCY_BUCKETS) + 1))
+        self.max_latency = 0.0
+
+
+class Metrics:
+    """Built-in subscriber counting the events of every endpoint"""
+
+    def __init__(self) -> None:
+        self.endpoints: dict[str, EndpointMetrics] = defaultdict(EndpointMetrics)
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            metrics = self.endpoints[event.endpoint]
+            if event.name == "request_end":
+                metrics.requests += 1
+                metrics.statuses[event.status] += 1
+                metrics.bytes += event.bytes
+                metrics.fetch += event.seconds
+                metrics.latency_counts[bisect.bisect_left(LATENCY_BUCKETS, event.seconds)] += 1
+                metrics.max_latency = max(metrics.max_latency, event.seconds)
+            elif event.name == "page_decoded":
+                metrics.pages += 1
+                metrics.tweets += event.tweets
+                metrics.decode += event.seconds
+            elif event.name == "rate_limit_wait":
+                metrics.sleep += event.seconds
+            elif event.name == "retry":
+                metrics.retries += 1
+                metrics.sleep += event.seconds
+
+    def summary(self, endpoint: str | None = None) -> dict:
+        """Totals of `endpoint` (of all of them if `None`) with the p50/p99 request latency in seconds,
+        estimated from the latency histogram
+        """
+        with self._lock:
+            if endpoint is None:
+                selected = list(self.endpoints.values())
+            else:
+                selected = [self.endpoints.get(endpoint) or EndpointMetrics()]
+            counts = [sum(column) for column in zip(*(m.latency_counts for m in selected))]
+            max_latency = max((m.max_latency for m in selected), default=0.0)
+            return {
+                "requests": sum(m.requests for m in selected),
+                "errors": sum(n for m in selected for status, n in m.statuses.items() if status >= 400),
+                "retries": sum(m.retries for m in selected),
+                "pages": sum(m.pages for m in selected),
+                "tweets": sum(m.tweets for m in selected),
+                "bytes": sum(m.bytes for m in selected),
+                "fetch_seconds": sum(m.fetch for m in selected),
+                "sleep_seconds": sum(m.sleep for m in selected),
+                "decode_seconds": sum(m.decode for m in selected),
+                "latency_p50": histogram_quantile(counts, 50, max_latency),
+                "latency_p99": histogram_quantile(counts, 99, max_latency),
+            }
+
+    def to_prometheus(self, prefix: str = "search_client") -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name: str, kind: str, help: str, samples: list[tuple[str, float]]) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.extend(f"{prefix}_{sample} {value}" for sample, value in samples)
+
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            metric(
+                "requests_total",
+                "counter",
+                "Responses received by endpoint and status.",
+                [
+                    (f'requests_total{{endpoint="{e}",status="{s}"}}', n)
+                    for e, m in items
+                    for s, n in sorted(m.statuses.items())
+                ],
+            )
+            for name, attr, help in (
+                ("response_bytes_total", "bytes", "Bytes of the response bodies."),
+                ("retries_total", "retries", "Requests retried after a 429 response."),
+                ("pages_total", "pages", "Response bodies decoded."),
+                ("tweets_total", "tweets", "Tweets in the decoded responses."),
+                ("sleep_seconds_total", "sleep", "Seconds spent waiting for rate limits."),
+                ("decode_seconds_total", "decode", "Seconds spent decoding response bodies."),
+            ):
+                metric(name, "counter", help, [(f'{name}{{endpoint="{e}"}}', getattr(m, attr)) for e, m in items])
+
+            samples = []
+            for e, m in items:
+                cumulative = 0
+                for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), m.latency_counts):
+                    cumulative += count
+                    samples.append((f'request_duration_seconds_bucket{{endpoint="{e}",le="{bound}"}}', cumulative))
+                samples.append((f'request_duration_seconds_sum{{endpoint="{e}"}}', m.fetch))
+                samples.append((f'request_duration_seconds_count{{endpoint="{e}"}}', cumulative))
+            metric("request_duration_seconds", "histogram", "Latency of the requests.", samples)
+        return "\n".join(lines) + "\n"
+
+
+class LogHook:
+    """Subscriber writing every event as one JSON line to a logger
+
+    >>> instrumentation.on("*", LogHook())
+    """
+
+    def __init__(self, logger: logging.Logger | None = None, level: int = logging.DEBUG) -> None:
+        self.logger = logger or logging.getLogger("search_client")
+        self.level = level
+
+    def __call__(self, event: Event) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, json.dumps(asdict(event)))
+
+
+class Instrumentation:
+    """Dispatch client events to hooks, `metrics` always receives all of them
+
+    Hooks are called synchronously in the thread that sent the request, keep
+    them cheap.
+    """
+
+    def __init__(self) -> None:
+        self.metrics = Metrics()
+        self._hooks: dict[str, list[Callable[[Event], None]]] = {name: [self.metrics] for name in EVENTS}
+
+    def on(self, event: str, hook: Callable[[Event], None]) -> Callable[[Event], None]:
+        """Call `hook` with every `event` ("*" for all of them), returns `hook`"""
+        names = EVENTS if event == "*" else (event,)
+        for name in names:
+            if name not in self._hooks:
+                raise ValueError(f"unknown event {name!r}, expected one of {EVENTS}")
+            self._hooks[name].append(hook)
+        return hook
+
+    def off(self, event: str, hook: Callable[[Event], None]) -> None:
+        for name in EVENTS if event == "*" else (event,):
+            if hook in self._hooks[name]:
+                self._hooks[name].remove(hook)
+
+    def emit(self, event: Event) -> None:
+        for hook in self._hooks[event.name]:
+            hook(event)
+
+    @contextmanager
+    def measure(self) -> Iterator[Metrics]:
+        """Metrics of the events emitted inside the block, e.g. a summary of one crawl"""
+        metrics = Metrics()
+        self.on("*", metrics)
+        try:
+            yield metrics
+        finally:
+            self.off("*", metrics)
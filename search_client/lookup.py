@@ -0,0 +1,71 @@
+"""Batching of user and tweet lookups up to the API limits
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+# maximum number of ids/usernames per request of the lookup endpoints
+MAX_LOOKUP_IDS = 100
+
+
+@dataclass(frozen=True)
+class LookupResult:
+    """Result of looking up one id or username, exactly one of `data` and `error` is set"""
+
+    key: str
+    data: dict | None = None
+    error: dict | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+
+def dedupe(keys: Iterable, normalize: Callable[[str], str] = str) -> tuple[list[str], list[str]]:
+    """Return the keys as strings in input order and their unique normalized values"""
+    keys = [str(k) for k in keys]
+    return keys, list(dict.fromkeys(normalize(k) for k in keys))
+
+
+def chunked(keys: list[str], size: int = MAX_LOOKUP_IDS) -> Iterator[list[str]]:
+    for i in range(0, len(keys), size):
+        yield keys[i : i + size]
+
+
+def merge_results(
+    keys: list[str],
+    responses: Iterable[tuple[list[str], dict]],
+    key_of: Callable[[dict], str],
+    normalize: Callable[[str], str] = str,
+) -> list[LookupResult]:
+    """Reassemble chunked responses in the order of `keys`, with an error for each missing key
+
+    Args:
+        keys (list[str]): keys in input order, duplicates allowed
+        responses (Iterable[tuple[list[str], dict]]): each chunk of normalized keys with its response
+        key_of (Callable[[dict], str]): key of a returned object
+        normalize (Callable[[str], str], optional): e.g. `str.lower` for usernames. Defaults to str.
+    """
+    found, errors = {}, {}
+    for chunk, response in responses:
+        for obj in response.get("data") or []:
+            found[normalize(key_of(obj))] = obj
+        for error in response.get("errors") or []:
+            value = error.get("value") or error.get("resource_id")
+            if value is not None:
+                errors[normalize(str(value))] = error
+        if "data" not in response and "errors" not in response:
+            # the whole request failed, e.g. 401, the body describes why
+            errors.update(dict.fromkeys(chunk, response))
+
+    results = []
+    for key in keys:
+        norm = normalize(key)
+        if norm in found:
+            results.append(LookupResult(key, data=found[norm]))
+        else:
+            error = errors.get(norm) or {"value": key, "detail": "not found in response"}
+            results.append(LookupResult(key, error=error))
+    return results
@@ -0,0 +1,220 @@
+"""Compact models for tweets and the objects they include
+
+Models use `__slots__` instead of per-object dicts, flatten `public_metrics`
+into plain attributes and keep ids as given by the API. Rarely used fields
+(`entities`, `context_annotations`) are only turned into models on first
+access, and related objects (author, media, place, poll, referenced tweets)
+are resolved by id through the `Includes` of the page they came from.
+
+>>> includes = Includes.from_response(response)
+>>> tweets = [Tweet.from_dict(t, includes) for t in response["data"]]
+>>> tweets[0].author.username
+'TwitterDev'
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from search_client.field_enums import MediaFields, PlaceFields, PollFields, TweetFields, UserFields
+
+
+class Model:
+    """Base of the models, `FIELDS` maps API field names to slots"""
+
+    __slots__ = ()
+    FIELDS: tuple[str, ...] = ()
+
+    def __init__(self, **kwargs: Any) -> None:
+        for name in self.__slots__:
+            setattr(self, name, kwargs.get(name))
+
+    @classmethod
+    def from_dict(cls, obj: dict):
+        return cls(**{name: obj.get(name) for name in cls.FIELDS})
+
+    def to_dict(self) -> dict:
+        """Back to the shape returned by the API, fields that are `None` are dropped"""
+        return {name: getattr(self, name) for name in self.FIELDS if getattr(self, name) is not None}
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        key = getattr(self, "id", None) or getattr(self, "media_key", None)
+        return f"{type(self).__name__}({key!r})"
+
+
+class Metrics(Model):
+    """Mixin for models whose `public_metrics` are stored as flat slots"""
+
+    __slots__ = ()
+    METRICS: tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, obj: dict, **extra: Any):
+        metrics = obj.get("public_metrics") or {}
+        values = {name: obj.get(name) for name in cls.FIELDS}
+        values.update({name: metrics.get(name) for name in cls.METRICS})
+        return cls(**values, **extra)
+
+    @property
+    def public_metrics(self) -> dict | None:
+        metrics = {name: getattr(self, name) for name in self.METRICS if getattr(self, name) is not None}
+        return metrics or None
+
+    def to_dict(self) -> dict:
+        obj = super().to_dict()
+        if self.public_metrics is not None:
+            obj["public_metrics"] = self.public_metrics
+        return obj
+
+
+class User(Metrics):
+    FIELDS = tuple(f.value for f in UserFields if f is not UserFields.PUBLIC_METRICS)
+    METRICS = ("followers_count", "following_count", "tweet_count", "listed_count")
+    __slots__ = FIELDS + METRICS
+
+
+class Media(Metrics):
+    FIELDS = tuple(f.value for f in MediaFields if f is not MediaFields.PUBLIC_METRICS)
+    METRICS = ("view_count",)
+    __slots__ = FIELDS + METRICS
+
+
+class Place(Model):
+    FIELDS = tuple(f.value for f in PlaceFields)
+    __slots__ = FIELDS
+
+
+class Poll(Model):
+    FIELDS = tuple(f.value for f in PollFields)
+    __slots__ = FIELDS
+
+
+class Entities(Model):
+    FIELDS = ("annotations", "cashtags", "hashtags", "mentions", "urls")
+    __slots__ = FIELDS
+
+    @property
+    def tags(self) -> list[str]:
+        """Hashtags without the leading #"""
+        return [h["tag"] for h in self.hashtags or []]
+
+    @property
+    def usernames(self) -> list[str]:
+        """Usernames of the mentioned users"""
+        return [m["username"] for m in self.mentions or []]
+
+
+class ContextAnnotation(Model):
+    FIELDS = ("domain", "entity")
+    __slots__ = FIELDS
+
+
+class Includes:
+    """Per-page lookup tables of included objects by id"""
+
+    __slots__ = ("users", "tweets", "media", "places", "polls")
+
+    def __init__(self) -> None:
+        self.users: dict[str, User] = {}
+        self.tweets: dict[str, Tweet] = {}
+        self.media: dict[str, Media] = {}
+        self.places: dict[str, Place] = {}
+        self.polls: dict[str, Poll] = {}
+
+    @classmethod
+    def from_response(cls, response: dict) -> Includes:
+        includes = cls()
+        raw = response.get("includes") or {}
+        includes.users = {u["id"]: User.from_dict(u) for u in raw.get("users") or []}
+        includes.media = {m["media_key"]: Media.from_dict(m) for m in raw.get("media") or []}
+        includes.places = {p["id"]: Place.from_dict(p) for p in raw.get("places") or []}
+        includes.polls = {p["id"]: Poll.from_dict(p) for p in raw.get("polls") or []}
+        includes.tweets = {t["id"]: Tweet.from_dict(t, includes) for t in raw.get("tweets") or []}
+        return includes
+
+
+# kept raw until first accessed
+_UNPARSED = ("entities", "context_annotations")
+
+
+class Tweet(Metrics):
+    FIELDS = tuple(
+        f.value for f in TweetFields if f is not TweetFields.PUBLIC_METRICS and f.value not in _UNPARSED
+    )
+    METRICS = ("retweet_count", "reply_count", "like_count", "quote_count", "impression_count")
+    __slots__ = FIELDS + METRICS + ("_entities", "_context_annotations", "_includes")
+
+    @classmethod
+    def from_dict(cls, obj: dict, includes: Includes | None = None) -> Tweet:
+        return super().from_dict(
+            obj,
+            _entities=obj.get("entities"),
+            _context_annotations=obj.get("context_annotations"),
+            _includes=includes,
+        )
+
+    @property
+    def entities(self) -> Entities | None:
+        if isinstance(self._entities, dict):
+            self._entities = Entities.from_dict(self._entities)
+        return self._entities
+
+    @property
+    def context_annotations(self) -> list[ContextAnnotation] | None:
+        if self._context_annotations and isinstance(self._context_annotations[0], dict):
+            self._context_annotations = [ContextAnnotation.from_dict(c) for c in self._context_annotations]
+        return self._context_annotations
+
+    @property
+    def author(self) -> User | None:
+        if self._includes is None:
+            return None
+        return self._includes.users.get(self.author_id)
+
+    @property
+    def media(self) -> list[Media]:
+        if self._includes is None or not self.attachments:
+            return []
+        keys = self.attachments.get("media_keys") or []
+        return [self._includes.media[k] for k in keys if k in self._includes.media]
+
+    @property
+    def poll(self) -> Poll | None:
+        if self._includes is None or not self.attachments:
+            return None
+        ids = self.attachments.get("poll_ids") or []
+        return self._includes.polls.get(ids[0]) if ids else None
+
+    @property
+    def place(self) -> Place | None:
+        if self._includes is None or not self.geo:
+            return None
+        return self._includes.places.get(self.geo.get("place_id"))
+
+    @property
+    def referenced(self) -> list[Tweet]:
+        """Quoted, replied to or retweeted tweets that are in the includes of the page"""
+        if self._includes is None or not self.referenced_tweets:
+            return []
+        refs = (self._includes.tweets.get(r["id"]) for r in self.referenced_tweets)
+        return [r for r in refs if r is not None]
+
+    def to_dict(self) -> dict:
+        obj = super().to_dict()
+        if self._entities is not None:
+            entities = self._entities
+            obj["entities"] = entities if isinstance(entities, dict) else entities.to_dict()
+        if self._context_annotations is not None:
+            obj["context_annotations"] = [
+                c if isinstance(c, dict) else c.to_dict() for c in self._context_annotations
+            ]
+        return obj
+
+
+def parse_page(response: dict) -> list[Tweet]:
+    """Turn a raw search or lookup response into `Tweet` models sharing one `Includes`"""
+    includes = Includes.from_response(response)
+    return [Tweet.from_dict(t, includes) for t in response.get("data") or []]
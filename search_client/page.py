@@ -0,0 +1,59 @@
+"""A single page of a paginated search response
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from search_client.models import Tweet
+
+
+@dataclass(frozen=True)
+class Page:
+    """Page yielded by `SearchClient.iter_pages`.
+
+    Holds the raw response of one request along with the cursor needed to
+    resume the crawl from the page after it.
+
+    >>> for page in client.iter_pages(["from:TwitterDev"], max_page=None):
+    ...     save(page.data)
+    ...     checkpoint(page.next_token)
+    """
+
+    response: dict
+    number: int = 1
+
+    @property
+    def data(self) -> list[dict]:
+        """Tweets of the page"""
+        return self.response.get("data") or []
+
+    @property
+    def includes(self) -> dict:
+        """Expanded objects (users, media, places, polls, tweets) of the page"""
+        return self.response.get("includes") or {}
+
+    @property
+    def meta(self) -> dict:
+        return self.response.get("meta") or {}
+
+    @property
+    def errors(self) -> list[dict]:
+        return self.response.get("errors") or []
+
+    @property
+    def next_token(self) -> str | None:
+        """Cursor of the next page, pass it as `next_token` to resume after this page"""
+        return self.meta.get("next_token")
+
+    @property
+    def result_count(self) -> int:
+        return self.meta.get("result_count", len(self.data))
+
+    def tweets(self) -> list[Tweet]:
+        """Tweets of the page as `Tweet` models, with includes resolved by id"""
+        from search_client.models import parse_page
+
+        return parse_page(self.response)
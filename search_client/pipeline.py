@@ -0,0 +1,117 @@
+"""Process-pool parse/transform stage for high-volume crawls
+
+Pages are fetched in the calling thread as raw bytes, decoded and turned into
+sink rows by worker processes, and written back to the sinks in page order.
+The number of pages fetched but not yet written is bounded, so a slow sink
+slows the crawl down instead of letting pages pile up in memory.
+
+>>> with TweetStore("tweets.db") as store, CSVSink("tweets.csv") as sink, ParsePipeline([store, sink]) as pipeline:
+...     stats = pipeline.crawl(client, ["from:TwitterDev"], archive=True, max_results=500)
+"""
+
+from __future__ import annotations
+
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
+
+from search_client.decode import default_decoder
+
+if TYPE_CHECKING:
+    from search_client.client import SearchClient
+
+
+def transform_page(content: bytes, transforms: tuple) -> tuple[int, list]:
+    """Decode a raw page and build the rows of every sink, runs in the worker processes
+
+    Returns:
+        tuple[int, list]: number of tweets of the page and the rows of each transform
+    """
+    response = default_decoder().decode(content)
+    return len(response.get("data") or []), [transform(response) for transform in transforms]
+
+
+@dataclass
+class PipelineStats:
+    pages: int = 0
+    tweets: int = 0
+
+
+class ParsePipeline:
+    """Decode pages and build sink rows on a process pool.
+
+    Sinks are `TweetStore`, `CSVSink`, `JSONLinesSink`, `ParquetSink` or any
+    object with a picklable `transform` (decoded page -> rows) and a
+    `write_rows` method. Rows are always written in the order the pages were
+    fetched, from the calling thread, so sinks need not be thread-safe.
+
+    Args:
+        sinks (Iterable):
+            Sinks every page is written to.
+
+        workers (int | None, optional):
+            Number of worker processes. Defaults to the number of CPUs.
+
+        max_in_flight (int | None, optional):
+            Maximum number of pages fetched but not yet written. Defaults to twice `workers`.
+
+        executor (Executor | None, optional):
+            Pool to submit the pages to instead of creating a process pool, it is
+            not shut down by the pipeline. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        sinks: Iterable,
+        *,
+        workers: int | None = None,
+        max_in_flight: int | None = None,
+        executor: Executor | None = None,
+    ) -> None:
+        self.sinks = list(sinks)
+        self.transforms = tuple(sink.transform for sink in self.sinks)
+        workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max(1, max_in_flight or 2 * workers)
+
+        self._owns_executor = executor is None
+        self.executor = executor if executor is not None else ProcessPoolExecutor(max_workers=workers)
+
+    def run(self, contents: Iterable[bytes]) -> PipelineStats:
+        """Transform and write raw page bodies, e.g. from `SearchClient.iter_raw_pages`"""
+        stats = PipelineStats()
+        in_flight: deque[Future] = deque()
+        try:
+            for content in contents:
+                in_flight.append(self.executor.submit(transform_page, content, self.transforms))
+                # wait for the oldest page before fetching another one
+                if len(in_flight) >= self.max_in_flight:
+                    self._write(in_flight.popleft().result(), stats)
+            while in_flight:
+                self._write(in_flight.popleft().result(), stats)
+        finally:
+            for future in in_flight:
+                future.cancel()
+        return stats
+
+    def crawl(self, client: SearchClient, query: list[str], **kwargs) -> PipelineStats:
+        """Crawl a search through the pipeline, arguments are passed to `SearchClient.iter_raw_pages`"""
+        return self.run(client.iter_raw_pages(query, **kwargs))
+
+    def _write(self, result: tuple[int, list], stats: PipelineStats) -> None:
+        tweets, rows = result
+        for sink, sink_rows in zip(self.sinks, rows):
+            sink.write_rows(sink_rows)
+        stats.pages += 1
+        stats.tweets += tweets
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self.executor.shutdown()
+
+    def __enter__(self) -> ParsePipeline:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,232 @@
+"""Crawl planning: page sizes and field projections that minimize requests and bytes
+
+A plan uses the largest page size the endpoint allows, trims the last page to
+the number of tweets still needed, and only asks for the fields the sinks
+actually store.
+
+>>> with CSVSink("tweets.csv", fields=["id", "text", "created_at"]) as sink:
+...     plan = plan_crawl(5_000, archive=True, sinks=[sink])
+...     stats = plan.run(client, ["from:TwitterDev"], sinks=[sink])
+>>> stats.bytes_per_tweet, stats.requests_saved
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, fields
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+from search_client.field_enums import TweetFields
+from search_client.page import Page
+
+if TYPE_CHECKING:
+    from search_client.client import SearchClient
+
+# page sizes allowed by each search endpoint
+MIN_RESULTS = 10
+MAX_RESULTS = {"recent": 100, "all": 500}
+
+# returned whether asked for or not
+DEFAULT_TWEET_FIELDS = frozenset(["id", "text", "edit_history_tweet_ids"])
+
+
+def page_size(archive: bool = False, remaining: int | None = None) -> int:
+    """Largest legal `max_results` for the endpoint, trimmed to the `remaining` tweets needed"""
+    largest = MAX_RESULTS["all" if archive else "recent"]
+    if remaining is None:
+        return largest
+    return min(largest, max(MIN_RESULTS, remaining))
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Fields and expansions to request, e.g. only those a sink stores
+
+    >>> Projection.of_columns(["id", "text", "public_metrics.like_count"])
+    Projection(tweet_fields=('public_metrics',), expansions=(), ...)
+    """
+
+    tweet_fields: tuple[str, ...] = ()
+    expansions: tuple[str, ...] = ()
+    user_fields: tuple[str, ...] = ()
+    media_fields: tuple[str, ...] = ()
+    place_fields: tuple[str, ...] = ()
+    poll_fields: tuple[str, ...] = ()
+
+    @classmethod
+    def of_columns(cls, columns: Iterable[str]) -> Projection:
+        """Tweet fields holding dotted `columns`, such as those of `CSVSink`"""
+        known = {f.value for f in TweetFields}
+        names = dict.fromkeys(c.split(".", 1)[0] for c in columns)
+        return cls(tweet_fields=tuple(n for n in names if n in known and n not in DEFAULT_TWEET_FIELDS))
+
+    def __or__(self, other: Projection) -> Projection:
+        return Projection(
+            **{
+                f.name: tuple(dict.fromkeys(getattr(self, f.name) + getattr(other, f.name)))
+                for f in fields(self)
+            }
+        )
+
+    def params(self) -> dict:
+        """Keyword arguments of the search methods, e.g. `SearchClient.iter_pages`"""
+        return {f.name: [getattr(v, "value", v) for v in getattr(self, f.name)] or None for f in fields(self)}
+
+
+def projection_of(sinks: Iterable) -> Projection | None:
+    """Union of the `projection` of every sink, None if one of them stores every field it gets"""
+    projection = Projection()
+    for sink in sinks:
+        sink_projection = getattr(sink, "projection", None)
+        if sink_projection is None:
+            return None
+        projection |= sink_projection
+    return projection
+
+
+@dataclass
+class CrawlStats:
+    requests: int = 0
+    tweets: int = 0
+    bytes: int = 0
+
+    @property
+    def bytes_per_tweet(self) -> float:
+        return self.bytes / self.tweets if self.tweets else 0.0
+
+    @property
+    def requests_saved(self) -> int:
+        """Requests saved compared to pages of `MIN_RESULTS` tweets, the default of the search methods"""
+        return max(0, math.ceil(self.tweets / MIN_RESULTS) - self.requests)
+
+
+@dataclass
+class CrawlPlan:
+    """Page sizes and fields of a search crawl, see `plan_crawl`.
+
+    Args:
+        archive (bool, optional): Search /search/all instead of /search/recent. Defaults to False.
+        limit (int | None, optional): Number of tweets needed, None for every tweet. Defaults to None.
+        projection (Projection | None, optional): Fields to request, None to leave them to the caller. Defaults to None.
+    """
+
+    archive: bool = False
+    limit: int | None = None
+    projection: Projection | None = None
+
+    def __post_init__(self) -> None:
+        self.stats = CrawlStats()
+
+    @property
+    def max_results(self) -> int:
+        return page_size(self.archive)
+
+    @property
+    def page_sizes(self) -> list[int] | None:
+        """`max_results` of each page if the limit is known, the last one trimmed"""
+        if self.limit is None:
+            return None
+        full, rest = divmod(self.limit, self.max_results)
+        return [self.max_results] * full + ([page_size(self.archive, rest)] if rest else [])
+
+    @property
+    def requests(self) -> int | None:
+        """Requests needed to get `limit` tweets, if there are that many"""
+        sizes = self.page_sizes
+        return None if sizes is None else len(sizes)
+
+    @property
+    def requests_saved(self) -> int | None:
+        """Requests saved compared to pages of `MIN_RESULTS` tweets"""
+        if self.limit is None:
+            return None
+        return math.ceil(self.limit / MIN_RESULTS) - self.requests
+
+    def params(self) -> dict:
+        """Keyword arguments of `SearchClient.iter_pages` following the plan"""
+        params = {"archive": self.archive, "max_results": self.max_results, "limit": self.limit}
+        if self.projection is not None:
+            params.update(self.projection.params())
+        return params
+
+    def iter_pages(self, client: SearchClient, query: list[str], **kwargs) -> Iterator[Page]:
+        """Lazily yield the pages of the crawl, counting requests, tweets and bytes in `stats`.
+
+        Requests go through the client, with its instrumentation and coalescer.
+        An error response raises `APIError` instead of ending the crawl early.
+
+        Args:
+            client (SearchClient): sends the requests
+            query (list[str]): Query to Twitter API.
+            Other arguments are passed to the endpoint, e.g. `start_time`, they override the projection.
+        """
+        params = {**(self.projection.params() if self.projection is not None else {}), **kwargs}
+        next_token = params.pop("next_token", None)
+        endpoint = "search/all" if self.archive else "search/recent"
+        remaining = self.limit
+        number = 0
+        while remaining is None or remaining > 0:
+            size = page_size(self.archive, remaining)
+            content = client._get_search_content(
+                query, archive=self.archive, next_token=next_token, max_results=size, **params
+            )
+            page = Page(client._decode(endpoint, content), number + 1)
+            self.stats.requests += 1
+            self.stats.bytes += len(content)
+            if not page.data:
+                return
+
+            data = page.data if remaining is None else page.data[:remaining]
+            if len(data) < len(page.data):
+                page = Page({**page.response, "data": data}, page.number)
+            number += 1
+            self.stats.tweets += len(data)
+            yield page
+
+            if remaining is not None:
+                remaining -= len(data)
+            next_token = page.next_token
+            if not next_token:
+                return
+
+    def run(self, client: SearchClient, query: list[str], sinks: Iterable = (), **kwargs) -> CrawlStats:
+        """Crawl and write every page to `sinks` (`TweetStore` or `Sink`), returns `stats`"""
+        sinks = list(sinks)
+        for page in self.iter_pages(client, query, **kwargs):
+            for sink in sinks:
+                sink.write_rows(sink.transform(page.response))
+        return self.stats
+
+
+def plan_crawl(
+    limit: int | None = None,
+    *,
+    archive: bool = False,
+    sinks: Iterable = (),
+    projection: Projection | None = None,
+) -> CrawlPlan:
+    """Plan a search crawl with the largest pages and only the fields the sinks store.
+
+    Args:
+        limit (int | None, optional):
+            Number of tweets needed, the last page is trimmed to it. Defaults to every tweet.
+
+        archive (bool, optional):
+            Search /search/all, whose pages hold up to 500 tweets, instead of /search/recent (100).
+            Defaults to False.
+
+        sinks (Iterable, optional):
+            Sinks the tweets are written to, their `projection` decides the fields requested.
+            Defaults to no sink.
+
+        projection (Projection | None, optional):
+            Extra fields to request, e.g. those read by the caller. Defaults to None.
+
+    Returns:
+        CrawlPlan: page sizes and fields of the crawl
+    """
+    sinks = list(sinks)
+    sink_projection = projection_of(sinks) if sinks else None
+    if sink_projection is not None:
+        projection = sink_projection if projection is None else sink_projection | projection
+    return CrawlPlan(archive=archive, limit=limit, projection=projection)
@@ -0,0 +1,335 @@
+"""Query building: compile keyword rules into few OR-packed requests and route the results back
+
+>>> rules = [Rule("py", keywords=["python"]), Rule("rs", keywords=["rust"], exclude=["game"])]
+>>> [batch.query for batch in pack_rules(rules, common=["-is:retweet"])]
+['((rust -game) OR python) -is:retweet']
+>>> RuleMatcher(rules).match({"text": "Rust and Python"})
+['py', 'rs']
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Iterable
+
+# maximum query length of each search endpoint (academic access for /search/all)
+MAX_QUERY_LENGTH = {"recent": 512, "all": 1024}
+
+
+def _quote(term: str) -> str:
+    return f'"{term}"' if " " in term else term
+
+
+# quoted phrases (possibly negated), parentheses, and anything else up to a space or parenthesis
+_TOKEN = re.compile(r'-?"[^"]*"|[()]|[^\s()]+')
+
+
+def _unquote(term: str) -> str:
+    return term[1:-1] if len(term) > 1 and term.startswith('"') and term.endswith('"') else term
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A tracking rule, all of its conditions must hold for a tweet to match.
+
+    Args:
+        tag (str): name the matching tweets are routed to
+        keywords (list[str]): words (or phrases if they contain spaces) that must all appear
+        any_of (list[str]): at least one of these must appear
+        hashtags (list[str]): hashtags, with or without the leading #, that must all appear
+        exclude (list[str]): words that must not appear
+        authors (list[str]): usernames, the tweet must be from one of them
+        lang (str | None): language code of the tweet
+        retweets (bool | None): False to drop retweets, True to keep only retweets
+    """
+
+    tag: str
+    keywords: list[str] = field(default_factory=list)
+    any_of: list[str] = field(default_factory=list)
+    hashtags: list[str] = field(default_factory=list)
+    exclude: list[str] = field(default_factory=list)
+    authors: list[str] = field(default_factory=list)
+    lang: str | None = None
+    retweets: bool | None = None
+
+    @classmethod
+    def parse(cls, query: str | list[str], tag: str = "") -> Rule:
+        """Rule of a query written with the search operators, the inverse of `compile`
+
+        Supports keywords, "phrases", #hashtags, -exclusions, `from:`, `lang:`,
+        `is:retweet`/`-is:retweet` and parenthesized OR groups of keywords or of `from:`.
+
+        >>> rule = Rule.parse('python "web app" -django from:TwitterDev -is:retweet')
+        >>> rule.keywords, rule.exclude, rule.authors, rule.retweets
+        (['python', 'web app'], ['django'], ['TwitterDev'], False)
+
+        Raises:
+            ValueError: the query uses an operator or grouping a `Rule` cannot express
+        """
+        tokens = _TOKEN.findall(query if isinstance(query, str) else " ".join(query))
+        fields: dict = {"keywords": [], "any_of": [], "hashtags": [], "exclude": [], "authors": []}
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            i += 1
+            if token == "(":
+                group = []
+                while i < len(tokens) and tokens[i] != ")":
+                    if tokens[i] == "(":
+                        raise ValueError(f"cannot parse nested groups of {query!r}")
+                    if tokens[i] != "OR":
+                        group.append(tokens[i])
+                    i += 1
+                i += 1
+                if group and all(t.startswith("from:") for t in group):
+                    fields["authors"].extend(t[len("from:") :] for t in group)
+                elif any(t.startswith("-") or ":" in t for t in group) or fields["any_of"]:
+                    raise ValueError(f"cannot parse the group {' OR '.join(group)!r} of {query!r}")
+                else:
+                    fields["any_of"] = [_unquote(t) for t in group]
+            elif token in ("is:retweet", "-is:retweet"):
+                fields["retweets"] = token == "is:retweet"
+            elif token.startswith("from:"):
+                fields["authors"].append(token[len("from:") :])
+            elif token.startswith("lang:"):
+                fields["lang"] = token[len("lang:") :]
+            elif token.startswith("#"):
+                fields["hashtags"].append(token[1:])
+            elif token.startswith("-") and len(token) > 1 and ":" not in token:
+                fields["exclude"].append(_unquote(token[1:]))
+            elif token in (")", "OR") or (":" in token and not token.startswith('"')):
+                raise ValueError(f"unsupported operator {token!r} in {query!r}")
+            else:
+                fields["keywords"].append(_unquote(token))
+        return cls(tag, **fields)
+
+    def compile(self) -> str:
+        """Operator string of the rule, parenthesized if it has more than one term"""
+        terms = [_quote(k) for k in self.keywords]
+        terms += ["#" + h.lstrip("#") for h in self.hashtags]
+        if self.any_of:
+            terms.append(_group([_quote(k) for k in self.any_of], " OR "))
+        if self.authors:
+            terms.append(_group([f"from:{a}" for a in self.authors], " OR "))
+        terms += [f"-{_quote(k)}" for k in self.exclude]
+        if self.lang:
+            terms.append(f"lang:{self.lang}")
+        if self.retweets is not None:
+            terms.append("is:retweet" if self.retweets else "-is:retweet")
+
+        if not terms:
+            raise ValueError(f"rule {self.tag!r} has no conditions")
+        return _group(terms, " ")
+
+
+def _group(terms: list[str], sep: str) -> str:
+    return terms[0] if len(terms) == 1 else "(" + sep.join(terms) + ")"
+
+
+@dataclass(frozen=True)
+class QueryBatch:
+    """One request worth of rules"""
+
+    query: str
+    rules: list[Rule]
+
+
+def pack_rules(
+    rules: Iterable[Rule],
+    *,
+    max_length: int = MAX_QUERY_LENGTH["recent"],
+    common: list[str] | None = None,
+) -> list[QueryBatch]:
+    """Pack rules into as few OR-joined queries as the length limit allows.
+
+    Rules are placed first-fit in decreasing order of length, which keeps
+    the number of requests close to the minimum.
+
+    Args:
+        rules (Iterable[Rule]): rules to pack
+        max_length (int, optional): maximum query length. Defaults to 512.
+        common (list[str] | None, optional): operators applied to every query, e.g. ["-is:retweet"]. Defaults to None.
+
+    Returns:
+        list[QueryBatch]: queries with the rules each one covers
+    """
+    suffix = " ".join(common or [])
+    # "(" + ")" around the OR group and the space before the suffix
+    budget = max_length - (len(suffix) + 3 if suffix else 0)
+
+    compiled = sorted(((rule.compile(), rule) for rule in rules), key=lambda pair: len(pair[0]), reverse=True)
+    bins: list[list] = []  # [clauses, rules, length]
+    for clause, rule in compiled:
+        if len(clause) > budget:
+            raise ValueError(f"rule {rule.tag!r} is longer than the maximum query length")
+        for bin_ in bins:
+            if bin_[2] + len(" OR ") + len(clause) <= budget:
+                bin_[0].append(clause)
+                bin_[1].append(rule)
+                bin_[2] += len(" OR ") + len(clause)
+                break
+        else:
+            bins.append([[clause], [rule], len(clause)])
+
+    batches = []
+    for clauses, packed, _ in bins:
+        query = " OR ".join(clauses)
+        if suffix:
+            query = f"({query}) {suffix}" if len(clauses) > 1 else f"{query} {suffix}"
+        batches.append(QueryBatch(query, packed))
+    return batches
+
+
+def pack_terms(
+    terms: Iterable[str],
+    *,
+    max_length: int = MAX_QUERY_LENGTH["recent"],
+    common: list[str] | None = None,
+) -> list[str]:
+    """OR-join terms of similar length, e.g. `conversation_id:` operators, into as few queries as possible
+
+    >>> pack_terms(["conversation_id:1", "conversation_id:2"], common=["-is:retweet"])
+    ['(conversation_id:1 OR conversation_id:2) -is:retweet']
+    """
+    suffix = " ".join(common or [])
+    budget = max_length - (len(suffix) + 3 if suffix else 0)
+
+    groups: list[list[str]] = []
+    length = 0
+    for term in terms:
+        if len(term) > budget:
+            raise ValueError(f"{term!r} is longer than the maximum query length")
+        if groups and length + len(" OR ") + len(term) <= budget:
+            groups[-1].append(term)
+            length += len(" OR ") + len(term)
+        else:
+            groups.append([term])
+            length = len(term)
+
+    queries = []
+    for group in groups:
+        query = " OR ".join(group)
+        if suffix:
+            query = f"({query}) {suffix}" if len(group) > 1 else f"{query} {suffix}"
+        queries.append(query)
+    return queries
+
+
+class AhoCorasick:
+    """Multi-pattern matcher finding every pattern in one pass over the text"""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[list[str]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str) -> None:
+        node = 0
+        for char in pattern:
+            if char not in self.goto[node]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[node][char] = len(self.goto) - 1
+            node = self.goto[node][char]
+        self.output[node].append(pattern)
+
+    def _build(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                # children of the root fail back to the root
+                target = self.goto[fail].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text: str) -> Iterable[tuple[int, str]]:
+        """Yield (end index, pattern) of every occurrence"""
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for pattern in self.output[node]:
+                yield i, pattern
+
+
+def _is_boundary(text: str, i: int) -> bool:
+    return i < 0 or i >= len(text) or not (text[i].isalnum() or text[i] == "_")
+
+
+class RuleMatcher:
+    """Route returned tweets to the rules they match, scanning each text once.
+
+    Matching follows the search semantics closely enough for routing:
+    case-insensitive whole words and phrases, hashtags, exclusions,
+    authors (from the `includes` usernames), language and retweets.
+    """
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self.rules = list(rules)
+        patterns = set()
+        for rule in self.rules:
+            patterns.update(k.lower() for k in rule.keywords + rule.any_of + rule.exclude)
+            patterns.update("#" + h.lstrip("#").lower() for h in rule.hashtags)
+        self.automaton = AhoCorasick(patterns)
+
+    def terms(self, text: str) -> set[str]:
+        """Patterns found in `text` as whole words"""
+        text = text.lower()
+        found = set()
+        for end, pattern in self.automaton.find(text):
+            start = end - len(pattern) + 1
+            # a hashtag starts with "#" which is already a boundary
+            if (pattern[0] == "#" or _is_boundary(text, start - 1)) and _is_boundary(text, end + 1):
+                found.add(pattern)
+        return found
+
+    def match(self, tweet: dict, author: str | None = None) -> list[str]:
+        """Tags of the rules `tweet` matches
+
+        Args:
+            tweet (dict): tweet with at least `text`
+            author (str | None, optional): username of the author, e.g. from `includes.users`. Defaults to None.
+        """
+        found = self.terms(tweet.get("text", ""))
+        is_retweet = any(r.get("type") == "retweeted" for r in tweet.get("referenced_tweets") or [])
+        author = author.lower() if author else None
+
+        tags = []
+        for rule in self.rules:
+            if not all(k.lower() in found for k in rule.keywords):
+                continue
+            if not all("#" + h.lstrip("#").lower() in found for h in rule.hashtags):
+                continue
+            if rule.any_of and not any(k.lower() in found for k in rule.any_of):
+                continue
+            if any(k.lower() in found for k in rule.exclude):
+                continue
+            if rule.authors and author not in {a.lower() for a in rule.authors}:
+                continue
+            if rule.lang and tweet.get("lang") not in (None, rule.lang):
+                continue
+            if rule.retweets is not None and rule.retweets != is_retweet:
+                continue
+            tags.append(rule.tag)
+        return tags
+
+    def route(self, response: dict) -> dict[str, list[dict]]:
+        """Group the tweets of a raw response page by the tags of the rules they match"""
+        users = {u["id"]: u.get("username") for u in (response.get("includes") or {}).get("users") or []}
+        routed: dict[str, list[dict]] = {rule.tag: [] for rule in self.rules}
+        for tweet in response.get("data") or []:
+            for tag in self.match(tweet, users.get(tweet.get("author_id"))):
+                routed[tag].append(tweet)
+        return routed
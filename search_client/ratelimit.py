@@ -0,0 +1,181 @@
+"""Rate-limit-aware scheduling driven by the `x-rate-limit-*` response headers
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Mapping
+
+# endpoints have separate quotas, longest prefixes first so that
+# e.g. "users/by/username/x" is charged to "users/by"
+ENDPOINTS = (
+    "tweets/search/recent",
+    "tweets/search/all",
+    "tweets/counts/all",
+    "tweets/counts/recent",
+    "users/by",
+    "users",
+    "tweets",
+)
+
+
+def endpoint_key(path: str) -> str:
+    """Map a request path to the endpoint whose quota it consumes
+
+    >>> endpoint_key("https://api.twitter.com/2/tweets/search/recent")
+    'search/recent'
+    >>> endpoint_key("users/by/username/TwitterDev")
+    'users/by'
+    """
+    path = path.split("?", 1)[0].rstrip("/")
+    if "/2/" in path:
+        path = path.split("/2/", 1)[1]
+
+    for endpoint in ENDPOINTS:
+        if path == endpoint or path.startswith(endpoint + "/"):
+            return endpoint[len("tweets/") :] if endpoint.startswith("tweets/") else endpoint
+    return path
+
+
+@dataclass
+class Bucket:
+    """Token bucket for one endpoint.
+
+    `remaining` is `None` until the first response tells us the quota,
+    requests are let through optimistically until then.
+    """
+
+    limit: int | None = None
+    remaining: int | None = None
+    reset: float = 0.0
+
+
+class RateLimiter:
+    """Per-endpoint token buckets refilled from the API's rate-limit headers.
+
+    Requests only block when an endpoint's budget is actually exhausted, in
+    which case they wait until the window resets. A 429 response empties the
+    bucket and returns a reset-aware backoff.
+
+    The limiter is thread-safe and never sleeps by itself in `reserve`, so it
+    can be shared by the sync and async clients.
+
+    Args:
+        clock (Callable[[], float], optional):
+            Returns the current epoch time in seconds. Defaults to time.time.
+
+        sleep (Callable[[float], None], optional):
+            Used by `acquire` to block. Defaults to time.sleep.
+
+        margin (float, optional):
+            Seconds added after a reset to absorb clock skew. Defaults to 1.
+
+        max_retries (int, optional):
+            How many times a 429 response is retried. Defaults to 5.
+
+        backoff (float, optional):
+            Base of the exponential backoff used when a 429 carries no reset header.
+            Defaults to 1.
+    """
+
+    def __init__(
+        self,
+        *,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        margin: float = 1.0,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+    ) -> None:
+        self.clock = clock
+        self.sleep = sleep
+        self.margin = margin
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.buckets: dict[str, Bucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint: str) -> Bucket:
+        with self._lock:
+            return self.buckets.setdefault(endpoint, Bucket())
+
+    def reserve(self, endpoint: str) -> float:
+        """Take a token for `endpoint`.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds to wait before calling again.
+        """
+        with self._lock:
+            bucket = self.buckets.setdefault(endpoint, Bucket())
+            now = self.clock()
+            if bucket.remaining is not None and bucket.remaining <= 0 and bucket.reset <= now:
+                # window is over, refill from the last known limit
+                bucket.remaining = bucket.limit
+
+            if bucket.remaining is None:
+                return 0.0
+            if bucket.remaining > 0:
+                bucket.remaining -= 1
+                return 0.0
+            return max(bucket.reset - now, 0.0) + self.margin
+
+    def acquire(self, endpoint: str) -> float:
+        """Block until a token for `endpoint` is available, returns the seconds waited"""
+        waited = 0.0
+        delay = self.reserve(endpoint)
+        while delay > 0:
+            self.sleep(delay)
+            waited += delay
+            delay = self.reserve(endpoint)
+        return waited
+
+    def update(self, endpoint: str, headers: Mapping[str, str]) -> None:
+        """Sync the bucket of `endpoint` with the headers of a response"""
+        limit = _int_header(headers, "x-rate-limit-limit")
+        remaining = _int_header(headers, "x-rate-limit-remaining")
+        reset = _int_header(headers, "x-rate-limit-reset")
+        if remaining is None:
+            return
+
+        with self._lock:
+            bucket = self.buckets.setdefault(endpoint, Bucket())
+            if limit is not None:
+                bucket.limit = limit
+            if reset is not None and reset != bucket.reset:
+                # a new window, the server is authoritative
+                bucket.reset = reset
+                bucket.remaining = remaining
+            elif bucket.remaining is None:
+                bucket.remaining = remaining
+            else:
+                # same window, keep tokens reserved by in-flight requests
+                bucket.remaining = min(bucket.remaining, remaining)
+
+    def penalize(self, endpoint: str, headers: Mapping[str, str], attempt: int) -> float:
+        """Empty the bucket of `endpoint` after a 429 response.
+
+        Returns:
+            float: seconds to wait before retrying
+        """
+        reset = _int_header(headers, "x-rate-limit-reset")
+        with self._lock:
+            bucket = self.buckets.setdefault(endpoint, Bucket())
+            bucket.remaining = 0
+            now = self.clock()
+            if reset is not None and reset > now:
+                bucket.reset = reset
+                return reset - now + self.margin
+
+            delay = self.backoff * 2**attempt
+            bucket.reset = now + delay
+            return delay
+
+
+def _int_header(headers: Mapping[str, str], name: str) -> int | None:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
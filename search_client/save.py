@@ -1,34 +1,439 @@
 from __future__ import annotations
 
 import csv
+import datetime as dt
+import functools
+import gzip
 import json
+import os
+from abc import ABC, abstractmethod
+from typing import IO, Any, Callable, Iterable, Sequence
 
+from search_client.decode import Decoder, default_decoder
+from search_client.field_enums import Expansions, TweetFields, UserFields
+from search_client.plan import Projection
 
-def write_to_csv(tweets: list[dict[str, str]], filename: str) -> None:
+# columns of the tweets returned by `SearchClient.get_tweets`
+DEFAULT_CSV_FIELDS = [
+    "id",
+    "text",
+    "author_id",
+    "conversation_id",
+    "created_at",
+    "in_reply_to_user_id",
+    "public_metrics.retweet_count",
+    "public_metrics.reply_count",
+    "public_metrics.like_count",
+    "public_metrics.quote_count",
+]
+
+
+def flatten(obj: dict, prefix: str = "") -> dict:
+    """Flatten nested dicts into dotted keys, lists are kept as JSON strings
+
+    >>> flatten({"id": "1", "public_metrics": {"like_count": 2}})
+    {'id': '1', 'public_metrics.like_count': 2}
+    """
+    flat = {}
+    for k, v in obj.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            flat.update(flatten(v, f"{key}."))
+        elif isinstance(v, list):
+            flat[key] = default_decoder().encode(v)
+        else:
+            flat[key] = v
+    return flat
+
+
+def open_output(filename: str, mode: str = "w", compression: str | None = None) -> IO[str]:
+    """Open a text file for writing, compressed with gzip or zstd.
+
+    Args:
+        filename (str): to save to
+        mode (str, optional): "w" or "a". Defaults to "w".
+        compression (str | None, optional):
+            "gzip", "zstd" or None. Inferred from a ".gz" or ".zst" suffix if None.
+    """
+    if compression is None:
+        if filename.endswith(".gz"):
+            compression = "gzip"
+        elif filename.endswith(".zst"):
+            compression = "zstd"
+
+    if compression == "gzip":
+        return gzip.open(filename, mode + "t", encoding="utf-8", newline="")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as err:
+            raise ImportError("zstd compression requires zstandard, `pip install zstandard`") from err
+        return zstandard.open(filename, mode + "t", encoding="utf-8", newline="")
+    if compression is not None:
+        raise ValueError(f"unknown compression {compression!r}")
+    return open(filename, mode, encoding="utf-8", newline="")
+
+
+def _page_tweets(page) -> list[dict]:
+    # accept `Page` objects, raw responses and plain lists of tweets
+    if isinstance(page, list):
+        return page
+    return getattr(page, "response", page).get("data") or []
+
+
+def jsonl_lines(response) -> list[str]:
+    """JSON Lines of the tweets of a page, see `JSONLinesSink`"""
+    encode = default_decoder().encode
+    return [encode(t) + "\n" for t in _page_tweets(response)]
+
+
+def csv_rows(response, fields: Sequence[str]) -> list[list]:
+    """CSV rows of the tweets of a page holding the flattened `fields`, see `CSVSink`"""
+    rows = []
+    for t in _page_tweets(response):
+        flat = flatten(t)
+        rows.append([flat.get(k) for k in fields])
+    return rows
+
+
+class Sink(ABC):
+    """Base of the streaming sinks, writes pages as they arrive and flushes after each one.
+
+    `transform` turns a decoded page into the rows taken by `write_rows`. It is
+    picklable so that a `ParsePipeline` can build the rows in other processes.
+    `projection` holds the fields the sink stores, None if it stores every field.
+    """
+
+    transform: Callable[[Any], list]
+    projection: Projection | None = None
+
+    def __init__(self, filename: str, *, append: bool = False, compression: str | None = None) -> None:
+        self.file = open_output(filename, "a" if append else "w", compression)
+        self.count = 0
+
+    def write_tweets(self, tweets: Iterable[dict]) -> None:
+        self.write_rows(self.transform(list(tweets)))
+
+    @abstractmethod
+    def write_rows(self, rows: list) -> None:
+        """Write rows built by `transform`"""
+
+    def write_page(self, page) -> None:
+        self.write_tweets(_page_tweets(page))
+
+    def write_pages(self, pages: Iterable) -> int:
+        """Write every page of an iterator, returns the number of tweets written"""
+        for page in pages:
+            self.write_page(page)
+        return self.count
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class JSONLinesSink(Sink):
+    """Stream tweets to a JSON Lines file, one tweet per line.
+
+    Every page is flushed as soon as it is written so memory stays bounded
+    however long the crawl is, and appending keeps the file valid.
+
+    >>> with JSONLinesSink("tweets.jsonl.gz") as sink:
+    ...     sink.write_pages(client.iter_pages(["from:TwitterDev"], max_page=None))
+
+    Args:
+        filename (str): to save to
+        append (bool, optional): append to an existing file. Defaults to False.
+        compression (str | None, optional): see `open_output`. Defaults to None.
+        encoder (Decoder | None, optional):
+            encodes each tweet, straight from the objects the client decoded (typed structs included).
+            Defaults to the fastest installed JSON library.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        *,
+        append: bool = False,
+        compression: str | None = None,
+        encoder: Decoder | None = None,
+    ) -> None:
+        super().__init__(filename, append=append, compression=compression)
+        self.encoder = encoder if encoder is not None else default_decoder()
+        # a process pool encodes with the default decoder of each worker
+        self.transform = jsonl_lines
+
+    def write_tweets(self, tweets: Iterable[dict]) -> None:
+        encode = self.encoder.encode
+        self.write_rows([encode(t) + "\n" for t in tweets])
+
+    def write_rows(self, rows: list[str]) -> None:
+        self.file.writelines(rows)
+        self.file.flush()
+        self.count += len(rows)
+
+
+class CSVSink(Sink):
+    """Stream tweets to a CSV file with flattened dotted columns.
+
+    The header comes from a declared schema instead of the first tweet, so
+    nested `public_metrics` and keys missing from some tweets are handled.
+    Keys that are not in `fields` are dropped.
+
+    >>> with CSVSink("tweets.csv", fields=["id", "text", "public_metrics.like_count"]) as sink:
+    ...     sink.write_pages(client.iter_pages(["from:TwitterDev"], max_page=None))
+
+    Args:
+        filename (str): to save to
+        fields (list[str] | None, optional): dotted columns to write. Defaults to `DEFAULT_CSV_FIELDS`.
+        append (bool, optional): append rows without writing the header again. Defaults to False.
+        compression (str | None, optional): see `open_output`. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        *,
+        fields: list[str] | None = None,
+        append: bool = False,
+        compression: str | None = None,
+    ) -> None:
+        write_header = not (append and os.path.exists(filename) and os.path.getsize(filename) > 0)
+        super().__init__(filename, append=append, compression=compression)
+        self.fields = list(fields or DEFAULT_CSV_FIELDS)
+        # rows are lists in the order of `fields`, see `csv_rows`
+        self.writer = csv.writer(self.file)
+        if write_header:
+            self.writer.writerow(self.fields)
+        self.transform = functools.partial(csv_rows, fields=tuple(self.fields))
+        self.projection = Projection.of_columns(self.fields)
+
+    def write_rows(self, rows: list[list]) -> None:
+        self.writer.writerows(rows)
+        self.file.flush()
+        self.count += len(rows)
+
+
+# arrow type of every field, anything missing is stored as a JSON string
+_INT_FIELDS = {"id", "author_id", "conversation_id", "in_reply_to_user_id", "pinned_tweet_id"}
+_BOOL_FIELDS = {"possibly_sensitive", "protected", "verified"}
+_TIMESTAMP_FIELDS = {"created_at"}
+_STRING_FIELDS = {
+    "text",
+    "lang",
+    "reply_settings",
+    "source",
+    "description",
+    "location",
+    "name",
+    "profile_image_url",
+    "url",
+    "username",
+}
+PUBLIC_METRICS = {
+    "tweet": ["retweet_count", "reply_count", "like_count", "quote_count", "impression_count"],
+    "user": ["followers_count", "following_count", "tweet_count", "listed_count"],
+}
+
+
+def arrow_schema(fields: list[str] | None = None, kind: str = "tweet"):
+    """Typed Arrow schema for tweets or users.
+
+    `public_metrics` is flattened into one int64 column per metric and
+    `created_at` is a UTC timestamp, nested objects are kept as JSON strings.
+
+    Args:
+        fields (list[str] | None, optional):
+            `TweetFields`/`UserFields` values to include, `id` is always included.
+            Defaults to every field of `kind`.
+
+        kind (str, optional): "tweet" or "user". Defaults to "tweet".
+    """
+    import pyarrow as pa
+
+    if fields is None:
+        fields = list(TweetFields) if kind == "tweet" else list(UserFields)
+    names = dict.fromkeys(["id", *(getattr(f, "value", f) for f in fields)])
+
+    columns = []
+    for name in names:
+        if name == "public_metrics":
+            columns.extend(pa.field(f"public_metrics.{m}", pa.int64()) for m in PUBLIC_METRICS[kind])
+        elif name in _INT_FIELDS:
+            columns.append(pa.field(name, pa.int64()))
+        elif name in _BOOL_FIELDS:
+            columns.append(pa.field(name, pa.bool_()))
+        elif name in _TIMESTAMP_FIELDS:
+            columns.append(pa.field(name, pa.timestamp("ms", tz="UTC")))
+        else:
+            columns.append(pa.field(name, pa.string()))
+    return pa.schema(columns)
+
+
+def parquet_rows(response, kind: str = "tweet") -> list[dict]:
+    """Rows of a page with `public_metrics` flattened, see `ParquetSink`"""
+    if kind == "user" and not isinstance(response, list):
+        response = (getattr(response, "response", response).get("includes") or {}).get("users") or []
+    rows = []
+    for t in _page_tweets(response):
+        # only the metrics are flattened, other objects become JSON strings
+        row = dict(t)
+        for k, v in (row.pop("public_metrics", None) or {}).items():
+            row[f"public_metrics.{k}"] = v
+        rows.append(row)
+    return rows
+
+
+def _arrow_value(value, name: str):
+    if value is None:
+        return None
+    if name in _TIMESTAMP_FIELDS:
+        return dt.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if name in _INT_FIELDS:
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return default_decoder().encode(value)
+    return value
+
+
+class ParquetSink(Sink):
+    """Stream tweets (or users) into a Parquet file with a typed schema.
+
+    Rows are buffered up to `row_group_size` and written as one row group,
+    so the file grows during the crawl while memory stays bounded. Analysts
+    can then memory-map the output and read only the columns they need.
+    Requires the optional `pyarrow` dependency, `pip install search_client[parquet]`.
+
+    >>> with ParquetSink("tweets.parquet", fields=["author_id", "created_at", "public_metrics", "text"]) as sink:
+    ...     sink.write_pages(client.iter_pages(["from:TwitterDev"], max_page=None))
+
+    Args:
+        filename (str): to save to
+        fields (list[str] | None, optional): fields to store, see `arrow_schema`. Defaults to None.
+        kind (str, optional): "tweet", or "user" to store `includes.users`. Defaults to "tweet".
+        row_group_size (int, optional): rows per row group. Defaults to 10_000.
+        compression (str, optional): Parquet codec. Defaults to "zstd".
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        *,
+        fields: list[str] | None = None,
+        kind: str = "tweet",
+        row_group_size: int = 10_000,
+        compression: str = "zstd",
+    ) -> None:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as err:
+            raise ImportError("ParquetSink requires pyarrow, `pip install search_client[parquet]`") from err
+
+        self.kind = kind
+        self.schema = arrow_schema(fields, kind)
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(filename, self.schema, compression=compression)
+        self.rows: list[dict] = []
+        self.count = 0
+        self.transform = functools.partial(parquet_rows, kind=kind)
+        if kind == "tweet":
+            self.projection = Projection.of_columns(self.schema.names)
+        else:
+            names = dict.fromkeys(n.split(".", 1)[0] for n in self.schema.names if n != "id")
+            self.projection = Projection(expansions=(Expansions.AUTHOR_ID.value,), user_fields=tuple(names))
+
+    def write_page(self, page) -> None:
+        self.write_rows(self.transform(page))
+
+    def write_tweets(self, tweets: Iterable[dict]) -> None:
+        self.write_rows(parquet_rows(list(tweets)))
+
+    def write_rows(self, rows: list[dict]) -> None:
+        for row in rows:
+            self.rows.append(row)
+            self.count += 1
+            if len(self.rows) >= self.row_group_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered rows as a row group"""
+        import pyarrow as pa
+
+        if not self.rows:
+            return
+        columns = [
+            pa.array([_arrow_value(row.get(f.name), f.name) for row in self.rows], type=f.type)
+            for f in self.schema
+        ]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=self.schema))
+        self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+
+def write_to_csv(tweets: list[dict[str, str]], filename: str, fields: list[str] | None = None) -> None:
     """Write tweets to csv file
 
+    Nested dicts are flattened into dotted columns. The header is `fields`
+    if given, otherwise every key found in any tweet.
+
     Args:
         tweets (list[dict[str, str]]): list of tweets
         filename (str): to save to
+        fields (list[str] | None, optional): dotted columns to write. Defaults to None.
     """
     assert len(tweets) != 0, "tweets must not be empty"
 
-    with open(filename, "w", newline="") as csvfile:
-        fieldnames = tweets[0].keys()
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+    if fields is None:
+        # dict keeps the order in which keys are first seen
+        fields = list(dict.fromkeys(k for t in tweets for k in flatten(t)))
 
-        writer.writeheader()
-        for t in tweets:
-            writer.writerow(t)
+    with CSVSink(filename, fields=fields) as sink:
+        sink.write_tweets(tweets)
+
+
+def _last_char(file: IO[bytes], end: int) -> tuple[int, bytes]:
+    """Offset and value of the last non-whitespace byte of `file` before `end`"""
+    while end > 0:
+        end -= 1
+        file.seek(end)
+        char = file.read(1)
+        if not char.isspace():
+            return end, char
+    return -1, b""
 
 
 def write_to_json(tweets: list[dict[str, str]], filename: str, append: bool = False) -> None:
+    """Write tweets to a JSON array, appending adds them to the array already in the file
 
-    mode = "a" if append else "w"
-    with open(filename, mode) as jsonfile:
+    Appending only rewrites the closing bracket, the tweets already in the file
+    are not read. Prefer `JSONLinesSink` for large or incremental exports.
+    """
+    if append and os.path.exists(filename) and os.path.getsize(filename) > 0:
+        with open(filename, "r+b") as jsonfile:
+            end, char = _last_char(jsonfile, os.path.getsize(filename))
+            if char != b"]":
+                raise ValueError(f"{filename} does not end with a JSON array")
+            if not tweets:
+                return
+            last, before = _last_char(jsonfile, end)
+            # the items of the new array, without its brackets
+            items = json.dumps(list(tweets), indent=4)[1:-2]
+            jsonfile.seek(last + 1)
+            jsonfile.truncate()
+            jsonfile.write(("" if before == b"[" else ",").encode() + items.encode() + b"\n]")
+        return
+
+    with open(filename, "w") as jsonfile:
         jsonfile.write(json.dumps(tweets, indent=4))
-        
-        
+
 
 def write_to_db(tweets: list[dict[str, str]], filename: str) -> None:
     ...
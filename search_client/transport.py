@@ -0,0 +1,98 @@
+"""Connection-pooled HTTP transport shared by every `SearchClient` endpoint
+"""
+
+from __future__ import annotations
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 429 is deliberately left out, rate limits need reset-aware handling
+# which a fixed urllib3 backoff cannot provide
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class Transport:
+    """Thin wrapper around `requests.Session` that keeps connections alive
+    and pools them between requests.
+
+    Every request made through the same `Transport` reuses the TCP/TLS
+    connections of the underlying pool instead of paying a new handshake
+    per page.
+
+    >>> with Transport(pool_maxsize=20, timeout=10) as transport:
+    ...     client = SearchClient("<your_token>", transport=transport)
+
+    Args:
+        pool_connections (int, optional):
+            Number of host pools to cache. Defaults to 10.
+
+        pool_maxsize (int, optional):
+            Maximum number of connections kept alive per host. Defaults to 10.
+
+        max_retries (int, optional):
+            Retries for connection errors and 5xx responses. Defaults to 3.
+
+        backoff_factor (float, optional):
+            Exponential backoff factor between retries. Defaults to 0.5.
+
+        timeout (float | tuple[float, float] | None, optional):
+            Connect/read timeout in seconds passed to every request. Defaults to (3.05, 30).
+
+        keep_alive (bool, optional):
+            Reuse connections between requests. Defaults to True.
+
+        session (requests.Session | None, optional):
+            Preconfigured session to use instead of creating one, useful for tests.
+            Pool and retry settings are not applied to a given session. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        *,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: float | tuple[float, float] | None = (3.05, 30),
+        keep_alive: bool = True,
+        session: requests.Session | None = None,
+    ) -> None:
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+
+        if session is None:
+            session = requests.Session()
+            retry = Retry(
+                total=max_retries,
+                backoff_factor=backoff_factor,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(["GET"]),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                max_retries=retry,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+
+        self.session = session
+
+    def get(self, url: str, *, headers: dict | None = None, params: dict | None = None) -> requests.Response:
+        """Send a GET request through the pooled session"""
+        return self.session.get(url, headers=headers, params=params, timeout=self.timeout)
+
+    def close(self) -> None:
+        """Close every pooled connection"""
+        self.session.close()
+
+    def __enter__(self) -> Transport:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,176 @@
+"""Incremental polling of /search/recent driven by since_id
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterator
+
+if TYPE_CHECKING:
+    from search_client.client import SearchClient
+    from search_client.database import CheckpointStore
+
+
+@dataclass
+class WatchedQuery:
+    """Polling state of one query"""
+
+    query: list[str]
+    interval: float
+    since_id: str | None = None
+    rate: float | None = None
+    last_poll: float | None = None
+    polls: int = 0
+    tweets: int = 0
+    kwargs: dict = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.query)
+
+
+class Watcher:
+    """Poll many queries in one loop, fetching only tweets newer than the last one seen.
+
+    Every poll is bounded by `since_id`, so only new tweets are transferred.
+    Each query's interval adapts to its observed rate so that a poll returns
+    about `target_per_poll` tweets: busy queries are polled more often and
+    quiet ones back off, spending quota in proportion to real volume.
+
+    >>> watcher = Watcher(client, store=CheckpointStore("watch.db"))
+    >>> watcher.add(["#python"], interval=30)
+    >>> watcher.add(["from:TwitterDev"], interval=300)
+    >>> watcher.run(lambda query, tweets: print(query.text, len(tweets)))
+
+    Args:
+        client (SearchClient): client used to poll /search/recent
+        store (CheckpointStore | None, optional): persists the newest id of each query across runs. Defaults to None.
+        min_interval (float, optional): shortest interval in seconds. Defaults to 5.
+        max_interval (float, optional): longest interval in seconds. Defaults to 900.
+        target_per_poll (int, optional): tweets a poll should return on average. Defaults to 100.
+        smoothing (float, optional): weight of the latest observation in the rate average. Defaults to 0.3.
+        clock, sleep (optional): Defaults to time.monotonic and time.sleep.
+    """
+
+    def __init__(
+        self,
+        client: SearchClient,
+        *,
+        store: CheckpointStore | None = None,
+        min_interval: float = 5,
+        max_interval: float = 900,
+        target_per_poll: int = 100,
+        smoothing: float = 0.3,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.client = client
+        self.store = store
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_per_poll = target_per_poll
+        self.smoothing = smoothing
+        self.clock = clock
+        self.sleep = sleep
+        self.queries: list[WatchedQuery] = []
+        self._schedule: list[tuple[float, int, WatchedQuery]] = []
+        self._counter = itertools.count()
+
+    def add(self, query: list[str], interval: float = 60, *, since_id: str | None = None, **kwargs) -> WatchedQuery:
+        """Start watching `query`, extra keyword arguments are passed to `SearchClient.iter_pages`"""
+        if since_id is None and self.store is not None:
+            since_id = self._checkpoint(query).newest_id
+
+        watched = WatchedQuery(query, self._clamp(interval), since_id=since_id, kwargs=kwargs)
+        self.queries.append(watched)
+        heapq.heappush(self._schedule, (self.clock(), next(self._counter), watched))
+        return watched
+
+    def _checkpoint(self, query: list[str]):
+        return self.store.start("watch", {"query": " ".join(query)}, resume=True)
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def poll(self, watched: WatchedQuery) -> list[dict]:
+        """Fetch every tweet newer than `since_id` of `watched`, newest first.
+
+        Without a `since_id` only the first page is fetched, not the whole 7-day backlog.
+        """
+        now = self.clock()
+        params = {"max_results": 100, **watched.kwargs}
+        if watched.since_id is None:
+            params.setdefault("max_page", 1)
+        tweets = []
+        for page in self.client.iter_pages(watched.query, since_id=watched.since_id, **params):
+            tweets.extend(page.data)
+
+        if tweets:
+            watched.since_id = str(max(int(t["id"]) for t in tweets))
+            if self.store is not None:
+                checkpoint = self._checkpoint(watched.query)
+                checkpoint.newest_id = watched.since_id
+                checkpoint.count += len(tweets)
+                checkpoint.pages += 1
+                self.store.save(checkpoint)
+
+        self._adapt(watched, len(tweets), now)
+        return tweets
+
+    def _adapt(self, watched: WatchedQuery, count: int, now: float) -> None:
+        # the first poll returns the backlog, not the rate of new tweets
+        if watched.last_poll is not None:
+            elapsed = max(now - watched.last_poll, 1e-9)
+            observed = count / elapsed
+            if watched.rate is None:
+                watched.rate = observed
+            else:
+                watched.rate = self.smoothing * observed + (1 - self.smoothing) * watched.rate
+
+            if watched.rate > 0:
+                watched.interval = self._clamp(self.target_per_poll / watched.rate)
+            else:
+                watched.interval = self._clamp(watched.interval * 2)
+
+        watched.last_poll = now
+        watched.polls += 1
+        watched.tweets += count
+
+    def __iter__(self) -> Iterator[tuple[WatchedQuery, list[dict]]]:
+        """Poll forever, yielding each query with its new tweets (possibly none)"""
+        while self._schedule:
+            due, _, watched = heapq.heappop(self._schedule)
+            delay = due - self.clock()
+            if delay > 0:
+                self.sleep(delay)
+
+            tweets = self.poll(watched)
+            heapq.heappush(self._schedule, (self.clock() + watched.interval, next(self._counter), watched))
+            yield watched, tweets
+
+    def run(self, callback: Callable[[WatchedQuery, list[dict]], None], *, max_polls: int | None = None) -> None:
+        """Poll until `max_polls` polls are done (forever if `None`), calling `callback` with new tweets"""
+        for watched, tweets in itertools.islice(self, max_polls):
+            if tweets:
+                callback(watched, tweets)
+
+    async def __aiter__(self) -> AsyncIterator[tuple[WatchedQuery, list[dict]]]:
+        """Async iteration, polls run in the default executor so the event loop is never blocked
+
+        >>> async for query, tweets in watcher:
+        ...     await publish(tweets)
+        """
+        loop = asyncio.get_running_loop()
+        while self._schedule:
+            due, _, watched = heapq.heappop(self._schedule)
+            delay = due - self.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            tweets = await loop.run_in_executor(None, self.poll, watched)
+            heapq.heappush(self._schedule, (self.clock() + watched.interval, next(self._counter), watched))
+            yield watched, tweets
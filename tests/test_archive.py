@@ -0,0 +1,43 @@
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.archive import ArchiveCrawler, plan_slices
+
+
+def day(i):
+    return f"2021-01-{i + 1:02d}T00:00:00.000Z"
+
+
+COUNTS = [40, 0, 0, 0, 40, 40, 0, 0, 0, 40]
+BUCKETS = [{"start": day(i), "end": day(i + 1), "tweet_count": c} for i, c in enumerate(COUNTS)]
+
+
+def test_plan_slices_equal_volume():
+    assert plan_slices(BUCKETS, 4) == [(day(0), day(1)), (day(1), day(5)), (day(5), day(6)), (day(6), day(10))]
+    assert plan_slices(BUCKETS, 1, start_time="2021-01-01T12:00:00Z") == [("2021-01-01T12:00:00Z", day(10))]
+    assert plan_slices([], 4) == []
+
+
+def test_crawl_merges_and_dedupes():
+    def counts(params):
+        return 200, {}, {"data": BUCKETS, "meta": {"total_tweet_count": sum(COUNTS)}}
+
+    def search(params):
+        days = [i for i in range(10) if params["start_time"] <= day(i) < params["end_time"] and COUNTS[i]]
+        page = int(params.get("next_token", 0))
+        # every day holds 2 pages of 20 tweets, and tweet 0 is returned by every slice
+        i, half = days[page // 2], page % 2
+        data = [{"id": str(i * 100 + half * 20 + j), "text": ""} for j in range(20)] + [{"id": "0", "text": ""}]
+        meta = {"result_count": len(data)}
+        if page + 1 < 2 * len(days):
+            meta["next_token"] = str(page + 1)
+        return 200, {}, {"data": data, "meta": meta}
+
+    routes = {"/2/tweets/counts/all": counts, "/2/tweets/search/all": search}
+    with FakeAPI(routes) as api, SearchClient("token", base_url=api.base_url) as client:
+        tweets = ArchiveCrawler(client, slices=4, workers=4).crawl(["q"], day(0), day(10))
+
+    assert len(tweets) == 160
+    assert tweets[0]["id"] == "939" and tweets[-1]["id"] == "0"
+    searches = [r[1] for r in api.requests if r[0].endswith("search/all")]
+    assert len(searches) == 8
+    assert {r["max_results"] for r in searches} == {"500"}
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from benchmarks.mock_api import FakeAPI
+from search_client.async_client import AsyncSearchClient
+from search_client.client import APIError
+from search_client.ratelimit import RateLimiter
+from tests.test_ratelimit import FakeClock
+
+
+def search_route(params):
+    query = params["query"]
+    page = int(params.get("next_token", 0))
+    meta = {"result_count": 1}
+    if page < 2:
+        meta["next_token"] = str(page + 1)
+    return 200, {}, {"data": [{"id": f"{query}-{page}", "text": query}], "meta": meta}
+
+
+def test_search_many_keeps_query_order():
+    queries = [[f"q{i}"] for i in range(20)]
+
+    async def main(base_url):
+        async with AsyncSearchClient("token", base_url=base_url) as client:
+            return await client.search_many(queries, concurrency=5, max_page=None)
+
+    with FakeAPI({"/2/tweets/search/recent": search_route}) as api:
+        results = asyncio.run(main(api.base_url))
+
+    assert len(api.requests) == 60
+    for (query,), tweets in zip(queries, results):
+        assert [t["id"] for t in tweets] == [f"{query}-0", f"{query}-1", f"{query}-2"]
+
+
+def test_shared_budget_across_queries():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, margin=0)
+
+    async def sleep(seconds):
+        clock.sleep(seconds)
+
+    def route(params):
+        status, _, body = search_route({**params, "next_token": "2"})
+        headers = {"x-rate-limit-limit": 3, "x-rate-limit-remaining": 0, "x-rate-limit-reset": int(clock.now) + 60}
+        return status, headers, body
+
+    async def main(base_url):
+        async with AsyncSearchClient("token", base_url=base_url, rate_limiter=limiter, sleep=sleep) as client:
+            users = await client.get_users(["a"])
+            # learn that the search budget is exhausted
+            await client.get_recent_tweets(["warmup"])
+            results = await client.search_many([["a"], ["b"]], concurrency=2)
+        return users, results
+
+    with FakeAPI({"/2/tweets/search/recent": route, "/2/users/by": lambda p: (200, {}, {"data": []})}) as api:
+        users, results = asyncio.run(main(api.base_url))
+
+    assert users == {"data": []}
+    assert [r[0]["text"] for r in results] == ["a", "b"]
+    # both queries waited for the one window reset, not a fixed sleep each
+    assert clock.sleeps == [60]
+
+
+def test_search_keyword_arguments_and_cooldown():
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    async def main(base_url):
+        async with AsyncSearchClient("token", base_url=base_url, sleep=sleep) as client:
+            return await client.get_all_tweets(["q"], cooldown=3, max_page=None, tweet_only=True, sort_order="recency")
+
+    with FakeAPI({"/2/tweets/search/all": search_route}) as api:
+        tweets = asyncio.run(main(api.base_url))
+
+    assert [t["id"] for t in tweets] == ["q-0", "q-1", "q-2"]
+    assert api.requests[0][1]["sort_order"] == "recency"
+    # no wait after the last page
+    assert sleeps == [3, 3]
+
+
+def test_tweet_count_raises_on_error_body():
+    def route(params):
+        return 400, {}, {"title": "Invalid Request", "detail": "invalid start_time", "status": 400}
+
+    async def main(base_url):
+        async with AsyncSearchClient("token", base_url=base_url) as client:
+            return await client.get_tweet_count(["q"])
+
+    with FakeAPI({"/2/tweets/counts/all": route}) as api, pytest.raises(APIError, match="invalid start_time"):
+        asyncio.run(main(api.base_url))
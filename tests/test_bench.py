@@ -0,0 +1,14 @@
+from benchmarks.bench import SCENARIOS, run_scenario
+from benchmarks.mock_api import FakeAPI, twitter_routes
+
+
+def test_scenarios_report_throughput_and_stages():
+    config = {"pages": 2, "decoder": "json"}
+    with FakeAPI(twitter_routes(pages=2, rate_limit=100)) as api:
+        results = [run_scenario(name, api.base_url, config) for name in SCENARIOS]
+
+    assert [(r["name"], r["pages"]) for r in results] == [(name, 2) for name in SCENARIOS]
+    assert [r["tweets"] for r in results] == [200, 1000, 200, 200]
+    assert all(r["stages"]["http"] > 0 and r["stages"]["decode"] > 0 and r["tweets_per_sec"] > 0 for r in results)
+    assert results[2]["stages"]["storage"] > 0
+    assert {r[1]["max_results"] for r in api.requests} == {"100", "500"}
@@ -0,0 +1,50 @@
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.cache import LRUCache, SQLiteCache, TieredCache, cache_key
+from tests.test_ratelimit import FakeClock
+
+
+def user_route(params):
+    return 200, {}, {"data": {"id": "1", "username": "dev"}}
+
+
+def test_cache_key_is_canonical():
+    assert cache_key("u", {"b": "2", "a": "1", "c": None}) == cache_key("u", {"a": "1", "b": "2"}) == "u?a=1&b=2"
+
+
+def test_lru_ttl_and_eviction():
+    clock = FakeClock()
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts b, the least recently used
+    assert cache.get("b") is None
+    clock.now += 11
+    assert cache.get("a") is None and len(cache) == 1
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (1, 2, 1)
+
+
+def test_client_serves_repeat_lookups_from_cache(tmp_path):
+    cache = TieredCache(LRUCache(), SQLiteCache(str(tmp_path / "cache.db")))
+    routes = {
+        "/2/users/by/username/dev": user_route,
+        "/2/tweets/search/recent": lambda p: (200, {}, {"data": [{"id": "1", "text": ""}], "meta": {}}),
+    }
+    with FakeAPI(routes) as api:
+        client = SearchClient("token", base_url=api.base_url, cache=cache)
+        for _ in range(3):
+            assert client.get_user("dev")["data"]["username"] == "dev"
+            client.get_recent_tweets(["q"])
+        assert len(api.requests) == 4
+
+        # a new process only has the disk tier
+        cache.memory.invalidate()
+        client.get_user("dev")
+        assert cache.disk.stats.hits == 1
+
+        assert cache.invalidate(where=lambda key, value: "users/by" in key) == 1
+        client.get_user("dev")
+        assert len(api.requests) == 5
+
+    assert (cache.stats.hits, cache.stats.misses) == (3, 2)
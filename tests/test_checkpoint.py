@@ -0,0 +1,87 @@
+import pytest
+
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.client import APIError
+from search_client.database import CheckpointStore
+from tests.test_pagination import search_route
+
+
+def count_route(params):
+    page = int(params.get("next_token", 0))
+    meta = {"total_tweet_count": 10}
+    if page < 3:
+        meta["next_token"] = str(page + 1)
+    return 200, {}, {"data": [{"start": str(page), "end": str(page + 1), "tweet_count": 10}], "meta": meta}
+
+
+def test_resume_search_after_crash(tmp_path):
+    store = CheckpointStore(str(tmp_path / "crawl.db"))
+    with FakeAPI({"/2/tweets/search/all": search_route(pages=5)}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        pages = client.iter_pages(["q"], archive=True, checkpoint=store, resume=True)
+        processed = [next(pages).data[0]["id"], next(pages).data[0]["id"]]
+        next(pages)  # the crawl dies while the third page is being processed
+        pages.close()
+
+        resumed = client.get_all_tweets(["q"], max_page=None, checkpoint=store, resume=True)
+        processed += [page["data"][0]["id"] for page in resumed]
+        again = client.get_all_tweets(["q"], max_page=None, checkpoint=store, resume=True)
+
+    assert processed == ["0", "1000", "2000", "3000", "4000"]
+    assert again == []
+    assert len(api.requests) == 6
+
+    (state,) = [store.load(key) for (key,) in store.conn.execute("select key from Checkpoint")]
+    assert (state.pages, state.count, state.done) == (5, 50, True)
+    assert (state.newest_id, state.oldest_id) == ("4009", "0")
+
+
+def test_resume_count(tmp_path):
+    store = CheckpointStore(str(tmp_path / "crawl.db"))
+    with FakeAPI({"/2/tweets/counts/all": count_route}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        pages = client.iter_count_pages(["q"], checkpoint=store)
+        next(pages), next(pages), next(pages)
+        pages.close()
+        assert client.get_tweet_count(["q"], checkpoint=store, resume=True) == 40
+
+    assert len(api.requests) == 5
+
+
+def failing_on(route, failing_page):
+    calls = []
+
+    def wrapped(params):
+        if int(params.get("next_token", 0)) == failing_page and not calls:
+            calls.append(params)
+            return 400, {}, {"title": "Invalid Request", "errors": [{"message": "transient"}]}
+        return route(params)
+
+    return wrapped
+
+
+def test_resume_search_after_error(tmp_path):
+    store = CheckpointStore(str(tmp_path / "crawl.db"))
+    with FakeAPI({"/2/tweets/search/all": failing_on(search_route(pages=5), 2)}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        first = client.get_all_tweets(["q"], max_page=None, checkpoint=store, resume=True)
+        (key,) = [key for (key,) in store.conn.execute("select key from Checkpoint")]
+        assert (store.load(key).pages, store.load(key).done) == (2, False)
+
+        resumed = client.get_all_tweets(["q"], max_page=None, checkpoint=store, resume=True)
+
+    assert [p["data"][0]["id"] for p in first + resumed] == ["0", "1000", "2000", "3000", "4000"]
+    assert (store.load(key).pages, store.load(key).done) == (5, True)
+
+
+def test_resume_count_after_error(tmp_path):
+    store = CheckpointStore(str(tmp_path / "crawl.db"))
+    with FakeAPI({"/2/tweets/counts/all": failing_on(count_route, 1)}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        with pytest.raises(APIError, match="Invalid Request"):
+            client.get_tweet_count(["q"], checkpoint=store, resume=True)
+        assert client.get_tweet_count(["q"], checkpoint=store, resume=True) == 40
+
+    (key,) = [key for (key,) in store.conn.execute("select key from Checkpoint")]
+    assert (store.load(key).pages, store.load(key).done) == (4, True)
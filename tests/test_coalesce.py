@@ -0,0 +1,84 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.mock_api import FakeAPI, make_user
+from search_client import SearchClient
+from search_client.coalesce import AsyncCoalescer, Coalescer
+
+
+def tweets_route(params):
+    ids = params["ids"].split(",")
+    data = [{"id": i, "text": f"tweet {i}", "author_id": "1"} for i in ids if i != "404"]
+    body = {"data": data, "includes": {"users": [make_user(1)]}}
+    if "404" in ids:
+        body["errors"] = [{"value": "404", "detail": "Could not find tweet"}]
+    return 200, {}, body
+
+
+ROUTES = {
+    "/2/users/by/username/TwitterDev": lambda params: (200, {}, {"data": make_user(1)}),
+    "/2/tweets": tweets_route,
+}
+ID_SETS = [["1", "2", "3"], ["2", "3", "4"], ["404", "4", "5", "1"]]
+
+
+def requested_ids(api):
+    return [i for path, params, _ in api.requests if path == "/2/tweets" for i in params["ids"].split(",")]
+
+
+def test_identical_requests_share_one_response():
+    coalescer = Coalescer()
+    with FakeAPI(ROUTES, latency=0.2) as api:
+        client = SearchClient("token", base_url=api.base_url, coalescer=coalescer)
+        with ThreadPoolExecutor(8) as pool:
+            users = list(pool.map(client.get_user, ["TwitterDev"] * 8))
+        with ThreadPoolExecutor(3) as pool:
+            responses = list(pool.map(client.get_tweet_info, ID_SETS))
+
+    assert len([r for r in api.requests if r[0].startswith("/2/users")]) == 1
+    assert all(user is users[0] for user in users)
+    assert coalescer.stats.shared == 7 and coalescer.stats.shared_ids == 4
+
+    # every id is fetched once, each caller gets its own ids in order
+    assert sorted(requested_ids(api)) == ["1", "2", "3", "4", "404", "5"]
+    assert [[t["id"] for t in r["data"]] for r in responses] == [["1", "2", "3"], ["2", "3", "4"], ["4", "5", "1"]]
+    assert responses[2]["errors"] == [{"value": "404", "detail": "Could not find tweet"}]
+    assert responses[1]["includes"]["users"] == [make_user(1)]
+
+
+def test_failures_reach_every_caller():
+    coalescer = Coalescer()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    with pytest.raises(ConnectionError):
+        coalescer.do("key", fail)
+    # nothing stays in flight after a failure
+    with pytest.raises(ConnectionError):
+        coalescer.do("key", fail)
+    assert len(calls) == 2
+
+
+def test_async_coalescing():
+    pytest.importorskip("aiohttp")
+    from search_client.async_client import AsyncSearchClient
+
+    async def main(base_url):
+        coalescer = AsyncCoalescer()
+        async with AsyncSearchClient("token", base_url=base_url, coalescer=coalescer) as client:
+            users = await asyncio.gather(*(client.get_user("TwitterDev") for _ in range(5)))
+            responses = await asyncio.gather(*(client.get_tweet_info(ids) for ids in ID_SETS))
+        return users, responses, coalescer.stats
+
+    with FakeAPI(ROUTES, latency=0.05) as api:
+        users, responses, stats = asyncio.run(main(api.base_url))
+
+    assert len([r for r in api.requests if r[0].startswith("/2/users")]) == 1
+    assert (stats.requests, stats.shared, stats.shared_ids) == (4, 4, 4)
+    assert sorted(requested_ids(api)) == ["1", "2", "3", "4", "404", "5"]
+    assert [t["id"] for t in responses[2]["data"]] == ["4", "5", "1"]
@@ -0,0 +1,129 @@
+import re
+
+import pytest
+
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.conversation import Conversation, ConversationBuilder
+from search_client.query import pack_terms
+
+BASE = 10**18
+
+
+def tweet(i, conversation, parent=None):
+    tweet = {"id": str(i), "text": f"tweet {i}", "conversation_id": str(conversation)}
+    if parent is not None:
+        tweet["referenced_tweets"] = [{"type": "replied_to", "id": str(parent)}]
+    return tweet
+
+
+def corpus(n):
+    """Conversations rooted at r with r+1 and r+3 replying to r, r+2 to r+1 and r+4 to r+2"""
+    tweets = {}
+    for c in range(n):
+        r = BASE + 10 * c
+        for t in (tweet(r, r), tweet(r + 1, r, r), tweet(r + 2, r, r + 1), tweet(r + 3, r, r), tweet(r + 4, r, r + 2)):
+            tweets[t["id"]] = t
+    return tweets
+
+
+def routes(tweets, hidden=()):
+    def search(params):
+        assert len(params["query"]) <= 512
+        ids = set(re.findall(r"conversation_id:(\d+)", params["query"]))
+        # roots are older than the search window
+        found = [t for t in tweets.values() if t["conversation_id"] in ids and t["id"] not in ids | set(hidden)]
+        start = int(params.get("next_token", 0))
+        end = start + int(params["max_results"])
+        body = {"data": found[start:end], "meta": {"next_token": str(end)} if end < len(found) else {}}
+        return 200, {}, body
+
+    def lookup(params):
+        ids = params["ids"].split(",")
+        body = {"data": [tweets[i] for i in ids if i in tweets]}
+        errors = [{"value": i, "detail": "Could not find tweet"} for i in ids if i not in tweets]
+        if errors:
+            body["errors"] = errors
+        return 200, {}, body
+
+    return {"/2/tweets/search/recent": search, "/2/tweets": lookup}
+
+
+def test_tree_assembled_in_any_order():
+    conversation = Conversation("1")
+    for t in (tweet(4, 1, 2), tweet(3, 1, 1), tweet(2, 1, 1), tweet(1, 1)):
+        conversation.add(t)
+    assert conversation.missing == set()
+    assert [(depth, t["id"]) for depth, t in conversation.walk()] == [(0, "1"), (1, "2"), (2, "4"), (1, "3")]
+
+    orphan = Conversation("1")
+    orphan.add(tweet(3, 1, 2))
+    assert orphan.missing == {"1", "2"}
+    assert [t["id"] for _, t in orphan.walk()] == ["3"]
+
+
+def test_pack_terms():
+    terms = [f"conversation_id:{BASE + i}" for i in range(100)]
+    queries = pack_terms(terms, max_length=512, common=["-is:retweet"])
+    # 12 terms of 35 characters fit in 512 along with the suffix
+    assert all(len(q) <= 512 for q in queries) and len(queries) == 9
+    assert sum(q.count("conversation_id:") for q in queries) == 100
+
+
+def test_builder_batches_searches_and_lookups():
+    tweets = corpus(300)
+    with FakeAPI(routes(tweets)) as api, SearchClient("token", base_url=api.base_url) as client:
+        builder = ConversationBuilder(client)
+        threads = builder.build(str(BASE + 10 * c) for c in range(300))
+
+    assert all(len(thread) == 5 and thread.missing == set() for thread in threads.values())
+    depths = [(depth, int(t["id"]) - BASE) for depth, t in threads[str(BASE)].walk()]
+    assert depths == [(0, 0), (1, 1), (2, 2), (3, 4), (1, 3)]
+
+    # 300 ids in 24 queries of up to 13, with 52 replies in one page each, then 300 roots in 3 lookups
+    searches = [r for r in api.requests if r[0] == "/2/tweets/search/recent"]
+    lookups = [r for r in api.requests if r[0] == "/2/tweets"]
+    assert len(searches) == builder.stats.queries == builder.stats.pages == 24
+    assert len(lookups) == builder.stats.lookups == 3
+    assert builder.stats.tweets == 1500
+
+
+def test_missing_parents_fetched_level_by_level():
+    tweets = corpus(2)
+    del tweets[str(BASE + 11)]  # deleted parent of BASE + 12
+    hidden = [str(BASE + 1), str(BASE + 2)]
+    with FakeAPI(routes(tweets, hidden)) as api, SearchClient("token", base_url=api.base_url) as client:
+        builder = ConversationBuilder(client)
+        threads = builder.build([str(BASE), str(BASE + 10)])
+
+    # BASE + 2 is only known from its reply, and BASE + 1 from BASE + 2
+    assert len(threads[str(BASE)]) == 5 and threads[str(BASE)].missing == set()
+    assert builder.stats.lookups == 2
+    # the deleted tweet is looked up once, its replies are walked after the root
+    assert threads[str(BASE + 10)].missing == {str(BASE + 11)}
+    depths = [(depth, int(t["id"]) - BASE) for depth, t in threads[str(BASE + 10)].walk()]
+    assert depths == [(0, 10), (1, 13), (0, 12), (1, 14)]
+    assert [len(r[1]["ids"].split(",")) for r in api.requests if r[0] == "/2/tweets"] == [4, 1]
+
+
+def test_parent_in_another_conversation_looked_up_once():
+    tweets = corpus(1)
+    # BASE + 3 replies to a tweet of a conversation that is not being rebuilt
+    outside = tweet(BASE + 500, BASE + 500)
+    tweets[outside["id"]] = outside
+    tweets[str(BASE + 3)] = tweet(BASE + 3, BASE, BASE + 500)
+    with FakeAPI(routes(tweets)) as api, SearchClient("token", base_url=api.base_url) as client:
+        builder = ConversationBuilder(client)
+        threads = builder.build([str(BASE)])
+
+    assert builder.stats.lookups == 1
+    assert len([r for r in api.requests if r[0] == "/2/tweets"]) == 1
+    assert list(builder.conversations) == [str(BASE)]
+    assert threads[str(BASE)].missing == {str(BASE + 500)}
+
+
+def test_fetch_missing_of_unknown_conversation():
+    builder = ConversationBuilder(SearchClient("token"))
+    builder.add([tweet(BASE + 1, BASE, BASE)])
+    with pytest.raises(ValueError, match=str(BASE + 10)):
+        builder.fetch_missing([BASE, BASE + 10])
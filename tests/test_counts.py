@@ -0,0 +1,99 @@
+import pytest
+
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.client import APIError
+from search_client.counts import CountSeries, CountsEngine, CountStore, split_ranges, to_epoch, to_iso
+from tests.test_ratelimit import FakeClock
+
+HOUR = 3600
+
+
+def counts_route(per_page=24):
+    """One tweet per hour of the epoch, e.g. 5 in the bucket starting at hour 5"""
+
+    def route(params):
+        step = {"hour": HOUR, "day": 24 * HOUR}[params["granularity"]]
+        start = to_epoch(params["start_time"]) + int(params.get("next_token", 0)) * step
+        end = to_epoch(params["end_time"])
+        starts = list(range(start, end, step))[:per_page]
+        data = [
+            {"start": to_iso(s), "end": to_iso(s + step), "tweet_count": sum(range(s // HOUR, (s + step) // HOUR))}
+            for s in starts
+        ]
+        meta = {"total_tweet_count": sum(b["tweet_count"] for b in data)}
+        if starts and starts[-1] + step < end:
+            meta["next_token"] = str(int(params.get("next_token", 0)) + per_page)
+        return 200, {}, {"data": data, "meta": meta}
+
+    return route
+
+
+def test_count_series_resample():
+    series = CountSeries("hour", 23 * HOUR, [1, 2, 3])
+    assert (series.total, len(series), series[1]) == (6, 3, 2)
+    day = series.resample("day")
+    assert (day.start, list(day.counts)) == (0, [1, 5])
+    assert day.to_buckets()[1] == {
+        "start": "1970-01-02T00:00:00.000Z",
+        "end": "1970-01-03T00:00:00.000Z",
+        "tweet_count": 5,
+    }
+    with pytest.raises(ValueError):
+        day.resample("hour")
+
+
+def test_split_ranges():
+    assert split_ranges([(0, 10), (20, 24)], 4, 1) == [(0, 4), (4, 8), (8, 10), (20, 24)]
+
+
+def test_series_fetches_concurrently_and_caches_finished_buckets():
+    clock = FakeClock(now=10 * 24 * HOUR + 90 * 60)
+    store = CountStore()
+    with FakeAPI({"/2/tweets/counts/all": counts_route()}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        series = client.count_series("q", "1970-01-01T00:30:00Z", "1970-01-09", granularity="hour", store=store)
+        assert (series.start, len(series)) == (0, 8 * 24)
+        assert list(series.counts) == list(range(8 * 24))
+        # 4 ranges of 2 days, each of 2 pages
+        assert len(api.requests) == 8
+
+        engine = CountsEngine(client, store=store, clock=clock)
+        api.requests.clear()
+        extended = engine.series("q", "1970-01-01", granularity="hour")
+
+    # only the tail after the cached window is requested, the running bucket up to now
+    requested = sorted((r[1]["start_time"], r[1]["end_time"]) for r in api.requests)
+    assert requested[0][0] == "1970-01-09T00:00:00.000Z"
+    assert requested[-1][1] == "1970-01-11T01:29:30.000Z"
+    assert len(extended) == 10 * 24 + 2
+    assert list(extended.counts)[: 8 * 24] == list(series.counts)
+    assert extended.total == sum(range(10 * 24 + 2))
+
+
+def test_series_never_reports_missing_buckets_as_zero():
+    clock = FakeClock(now=4 * 24 * HOUR)
+    route = counts_route()
+
+    def failing(params):
+        if params["start_time"].startswith("1970-01-02"):
+            return 400, {}, {"title": "Invalid Request", "status": 400}
+        return route(params)
+
+    def dropping(params):
+        status, headers, body = route(params)
+        body["data"] = [b for b in body["data"] if b["start"] != "1970-01-02T05:00:00.000Z"]
+        return status, headers, body
+
+    store = CountStore()
+    with FakeAPI({"/2/tweets/counts/all": failing}) as api:
+        engine = CountsEngine(SearchClient("token", base_url=api.base_url), workers=3, store=store, clock=clock)
+        with pytest.raises(APIError, match="Invalid Request"):
+            engine.series("q", "1970-01-01", "1970-01-04", granularity="hour")
+    # the days that were counted are kept
+    assert len(store.load("q", "hour", 0, 3 * 24 * HOUR)) == 2 * 24
+
+    with FakeAPI({"/2/tweets/counts/all": dropping}) as api:
+        engine = CountsEngine(SearchClient("token", base_url=api.base_url), workers=3, store=store, clock=clock)
+        with pytest.raises(RuntimeError, match="1970-01-02T05:00:00.000Z"):
+            engine.series("q", "1970-01-01", "1970-01-04", granularity="hour")
@@ -0,0 +1,82 @@
+from collections import Counter
+
+import pytest
+
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.constants import Config, get_config
+from search_client.credentials import CredentialPool
+from tests.test_ratelimit import FakeClock
+
+
+def headers(remaining, reset, limit=10):
+    return {"x-rate-limit-limit": limit, "x-rate-limit-remaining": remaining, "x-rate-limit-reset": reset}
+
+
+def test_picks_token_with_most_budget():
+    clock = FakeClock()
+    pool = CredentialPool(["a", "b", "c"], clock=clock, sleep=clock.sleep, margin=0)
+    reset = int(clock.now) + 60
+    for token, remaining in zip("abc", (2, 3, 1)):
+        credential = next(c for c in pool.credentials if c.token == token)
+        pool.update(credential, "search/all", headers(remaining, reset))
+
+    picked = [pool.reserve("search/all")[0].token for _ in range(6)]
+    assert picked[0] == "b" and Counter(picked) == {"a": 2, "b": 3, "c": 1}
+    assert pool.reserve("search/all") == (None, 60)
+    # other endpoints have their own budget
+    assert pool.reserve("counts/all")[0] is not None
+
+
+def test_quarantine_after_401_and_429():
+    clock = FakeClock()
+    pool = CredentialPool(["a", "b"], clock=clock, sleep=clock.sleep, margin=0, quarantine=300)
+    a, b = pool.credentials
+
+    assert pool.penalize(a, "search/all", 401, {}, 0) == 0
+    assert [pool.reserve("users")[0] for _ in range(3)] == [b, b, b]
+    # rejecting the last usable token is not retried, nor quarantined
+    assert pool.penalize(b, "users", 401, {}, 0) is None
+    assert b.quarantined_until == 0
+
+    clock.now += 300
+    assert pool.penalize(b, "search/all", 429, headers(0, int(clock.now) + 120), 0) == 0
+    assert pool.acquire("search/all") == (a, 0)
+
+
+def test_client_spreads_requests_across_tokens():
+    clock = FakeClock()
+    budgets = {"Bearer a": 2, "Bearer b": 2, "Bearer bad": 2}
+
+    def route(params):
+        token = api.requests[-1][2]["Authorization"]
+        if token == "Bearer bad":
+            return 401, {}, {"title": "Unauthorized"}
+        budgets[token] -= 1
+        page = int(params.get("next_token", 0))
+        meta = {"next_token": str(page + 1)} if page < 3 else {}
+        body = {"data": [{"id": str(page), "text": ""}], "meta": meta}
+        return 200, headers(budgets[token], int(clock.now) + 900, limit=2), body
+
+    pool = CredentialPool(["a", "bad", "b"], clock=clock, sleep=clock.sleep, margin=0)
+    with FakeAPI({"/2/tweets/search/all": route}) as api, SearchClient(pool, base_url=api.base_url) as client:
+        tweets = client.get_all_tweets(["q"], tweet_only=True, max_page=None)
+
+    assert [t["id"] for t in tweets] == ["0", "1", "2", "3"]
+    assert Counter(r[2]["Authorization"] for r in api.requests) == {"Bearer a": 2, "Bearer b": 2, "Bearer bad": 1}
+    # 4 pages within the budget of 2 tokens, no waiting
+    assert clock.sleeps == []
+
+
+def test_pool_from_config(tmp_path):
+    pool = CredentialPool.from_config(Config(BEARER_TOKEN="a", BEARER_TOKENS="b, a,,c"))
+    assert [c.token for c in pool.credentials] == ["a", "b", "c"]
+
+    env = tmp_path / ".env"
+    env.write_text("BEARER_TOKENS=d,e\n")
+    pool = CredentialPool.from_config(get_config(str(env)), margin=0)
+    assert [c.token for c in pool.credentials] == ["d", "e"]
+    assert pool.credentials[0].rate_limiter.margin == 0
+
+    with pytest.raises(ValueError):
+        CredentialPool.from_config(Config())
@@ -0,0 +1,92 @@
+import sqlite3
+
+from search_client.database import TweetStore, save_to_db
+
+
+def tweet(i, likes=0):
+    return {
+        "id": str(i),
+        "text": f"tweet {i}",
+        "author_id": str(i % 7),
+        "conversation_id": str(i),
+        "created_at": "2022-01-01T00:00:00.000Z",
+        "public_metrics": {"retweet_count": 0, "reply_count": 0, "like_count": likes, "quote_count": 0},
+    }
+
+
+def test_duplicates_are_ignored_and_metrics_upserted(tmp_path):
+    db = str(tmp_path / "tweets.db")
+    assert save_to_db([tweet(1), tweet(2)], db) == 2
+    assert save_to_db([tweet(2, likes=5), tweet(3)], db) == 1
+
+    conn = sqlite3.connect(db)
+    assert conn.execute("select count(*) from Tweet").fetchone() == (3,)
+    assert conn.execute("select like_count from TweetMetrics where tweet_id = 2").fetchone() == (5,)
+    assert conn.execute("pragma journal_mode").fetchone() == ("wal",)
+
+
+def test_save_pages_with_includes(tmp_path):
+    page = {
+        "data": [tweet(1)],
+        "includes": {
+            "users": [{"id": "1", "username": "dev", "public_metrics": {"followers_count": 10}}],
+            "tweets": [tweet(0)],
+            "media": [{"media_key": "3_1", "type": "photo"}],
+        },
+    }
+    with TweetStore(str(tmp_path / "tweets.db")) as store:
+        assert store.save_page(page) == 2
+        store.save_users([{"id": "1", "name": "Dev"}])
+        user = store.conn.execute(
+            "select username, name, followers_count from User join UserMetrics using (user_id)"
+        ).fetchone()
+        assert user == ("dev", "Dev", 10)
+        assert store.conn.execute("select type from Media").fetchone() == ("photo",)
+
+
+def test_migrates_old_tweet_table(tmp_path):
+    db = str(tmp_path / "tweets.db")
+    conn = sqlite3.connect(db)
+    conn.execute("create table Tweet (tweet_id integer primary key, text text not null)")
+    conn.execute("insert into Tweet values (1, 'old')")
+    conn.commit()
+
+    # the old row is completed with the new columns
+    assert save_to_db([tweet(1), tweet(2)], db) == 2
+    assert conn.execute("select author_id from Tweet where tweet_id = 2").fetchone() == (2,)
+    assert conn.execute("select text, author_id from Tweet where tweet_id = 1").fetchone() == ("old", 1)
+
+
+def test_bulk_save(tmp_path):
+    tweets = [tweet(i) for i in range(50_000)]
+    with TweetStore(str(tmp_path / "tweets.db")) as store:
+        assert store.save_tweets(tweets) == 50_000
+        assert store.save_tweets(tweets[:10]) == 0
+        assert store.conn.execute("select count(*) from TweetMetrics").fetchone() == (50_000,)
+
+
+def test_reused_username(tmp_path):
+    db = str(tmp_path / "tweets.db")
+    # databases created before the index was made non-unique
+    TweetStore(db).close()
+    conn = sqlite3.connect(db)
+    conn.execute("drop index idx_user_username")
+    conn.execute("create unique index idx_user_username on User (username)")
+    conn.commit()
+
+    with TweetStore(db) as store:
+        store.save_users([{"id": "1", "username": "dev"}])
+        page = {"data": [tweet(1)], "includes": {"users": [{"id": "2", "username": "dev"}]}}
+        assert store.save_page(page) == 1
+        assert store.conn.execute("select count(*) from User where username = 'dev'").fetchone() == (2,)
+
+
+def test_partial_tweet_from_includes_is_completed(tmp_path):
+    partial = {"id": "1", "text": "tweet 1", "author_id": "1"}
+    with TweetStore(sqlite3.connect(str(tmp_path / "tweets.db"))) as store:
+        assert store.conn.execute("pragma journal_mode").fetchone() == ("wal",)
+        assert store.save_page({"data": [tweet(2)], "includes": {"tweets": [partial]}}) == 2
+        assert store.save_tweets([tweet(1)]) == 1
+        assert store.save_tweets([tweet(1), partial]) == 0
+        row = store.conn.execute("select author_id, conversation_id, created_at from Tweet where tweet_id = 1")
+        assert row.fetchone() == (1, 1, "2022-01-01T00:00:00.000Z")
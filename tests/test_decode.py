@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.database import TweetStore
+from search_client.decode import DECODERS, get_decoder
+from search_client.save import CSVSink, JSONLinesSink
+
+RESPONSE = {
+    "data": [
+        {"id": "1", "text": "héllo", "author_id": "10", "public_metrics": {"like_count": 3}, "unknown": 1},
+        {"id": "2", "text": "world", "referenced_tweets": [{"type": "retweeted", "id": "1"}]},
+    ],
+    "includes": {"users": [{"id": "10", "username": "alice"}]},
+    "meta": {"result_count": 2, "next_token": "abc"},
+}
+
+
+@pytest.mark.parametrize("name", sorted(DECODERS))
+def test_decoders_round_trip(name):
+    pytest.importorskip(name)
+    decoder = get_decoder(name)
+    content = json.dumps(RESPONSE).encode()
+    assert decoder.decode(content) == RESPONSE
+    assert json.loads(decoder.encode(RESPONSE)) == RESPONSE
+
+
+def test_typed_search_pages_work_downstream(tmp_path):
+    pytest.importorskip("msgspec")
+
+    def route(params):
+        return 200, {}, RESPONSE
+
+    with FakeAPI({"/2/tweets/search/recent": route}) as api:
+        client = SearchClient("token", base_url=api.base_url, decoder=get_decoder("msgspec", typed=True))
+        page = next(client.iter_pages(["q"]))
+
+    tweet = page.data[0]
+    assert not isinstance(tweet, dict)
+    assert (tweet["id"], tweet.get("lang"), "lang" in tweet) == ("1", None, False)
+    assert page.next_token == "abc"
+    assert page.tweets()[0].author.username == "alice"
+
+    with JSONLinesSink(str(tmp_path / "tweets.jsonl")) as sink:
+        sink.write_page(page)
+    with open(tmp_path / "tweets.jsonl", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    # fields not declared on the struct are dropped, absent ones are not written as null
+    assert lines[0] == {"id": "1", "text": "héllo", "author_id": "10", "public_metrics": {"like_count": 3}}
+
+    with CSVSink(str(tmp_path / "tweets.csv"), fields=["id", "public_metrics.like_count"]) as sink:
+        sink.write_page(page)
+    with TweetStore(str(tmp_path / "tweets.db")) as store:
+        assert store.save_page(page) == 2
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, cwd):
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    return subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+
+
+def test_import_does_no_io_nor_heavy_imports(tmp_path):
+    (tmp_path / ".env").write_text("BEARER_TOKEN=abc\n")
+    code = """
+import sys
+import search_client
+from search_client import constants, database
+assert not {"requests", "dotenv", "asyncio", "aiohttp"} & set(sys.modules), sys.modules.keys()
+assert constants.get_config.cache_info().currsize == 0
+from search_client import SearchClient
+assert not {"requests", "dotenv", "asyncio"} & set(sys.modules)
+print(constants.config.BEARER_TOKEN)
+"""
+    assert run(code, tmp_path).stdout.strip() == "abc"
+    assert os.listdir(tmp_path) == [".env"]
+
@@ -0,0 +1,72 @@
+import pytest
+
+from search_client.database import TweetStore
+from search_client.index import TweetIndex
+from search_client.query import Rule
+
+
+def tweet(i, text, author="1", **fields):
+    return {"id": str(i), "text": text, "author_id": author, "created_at": f"2022-01-{i:02d}T00:00:00.000Z", **fields}
+
+
+PAGE = {
+    "data": [
+        tweet(1, "Learning #Python with machine learning", lang="en"),
+        tweet(2, "python web app, no django", author="2", lang="en"),
+        tweet(3, "RT python tips", referenced_tweets=[{"type": "retweeted", "id": "1"}], lang="en"),
+        tweet(4, "Rust est rapide", author="2", lang="fr", conversation_id="1"),
+        tweet(5, "#pythonista #python_fr", author="2", lang="en"),
+    ],
+    "includes": {
+        "users": [
+            {"id": "1", "username": "TwitterDev", "public_metrics": {"followers_count": 50_000}},
+            {"id": "2", "username": "small", "public_metrics": {"followers_count": 10}},
+        ]
+    },
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    db = str(tmp_path / "tweets.db")
+    with TweetStore(db) as store:
+        store.save_page(PAGE)
+    with TweetIndex(db) as index:
+        yield index
+
+
+def ids(tweets):
+    return [t["id"] for t in tweets]
+
+
+def test_operators(index):
+    assert ids(index.search("python")) == ["5", "3", "2", "1"]
+    assert ids(index.search("python -is:retweet -django -pythonista")) == ["1"]
+    assert ids(index.search('"machine learning" from:twitterdev')) == ["1"]
+    assert ids(index.search("#python")) == ["1"]
+    assert ids(index.search("(rust OR django) lang:fr")) == ["4"]
+    assert ids(index.search("from:2 is:retweet")) == []
+    with pytest.raises(ValueError):
+        index.search("python has:links")
+
+
+def test_metadata_filters(index):
+    assert ids(index.search("python", min_followers=10_000)) == ["3", "1"]
+    assert ids(index.search(start_time="2022-01-02", end_time="2022-01-04")) == ["3", "2"]
+    assert ids(index.search(Rule("", authors=["small"]), conversation_id="1")) == ["4"]
+    assert index.count("python -is:retweet") == 3
+    assert index.search("django", limit=1)[0] == {
+        "id": "2",
+        "text": "python web app, no django",
+        "author_id": "2",
+        "created_at": "2022-01-02T00:00:00.000Z",
+        "lang": "en",
+    }
+
+
+def test_new_tweets_are_indexed(index):
+    store = TweetStore(index.conn)
+    store.save_tweets([tweet(i, f"bulk tweet {i} python") for i in range(10, 20_010)])
+
+    assert index.count("bulk python -is:retweet", start_time="2022-01-10") == 20_000
+    assert len(index.search("bulk python", limit=100)) == 100
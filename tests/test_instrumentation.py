@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.instrumentation import Instrumentation, LogHook, histogram_quantile
+from search_client.ratelimit import RateLimiter
+from tests.test_ratelimit import FakeClock, paged_route
+
+
+def test_histogram_quantile():
+    # 10 requests under 5 ms and 10 between 50 and 100 ms, out of 11 finite buckets and "+Inf"
+    counts = [10, 0, 0, 0, 10, 0, 0, 0, 0, 0, 0, 0]
+    assert histogram_quantile(counts, 25, 0.09) == pytest.approx(0.0025)
+    assert histogram_quantile(counts, 75, 0.09) == pytest.approx(0.075)
+    assert histogram_quantile(counts, 100, 0.09) == 0.09
+    assert histogram_quantile([0] * 11 + [4], 50, 30.0) == 20.0
+    assert histogram_quantile([0] * 12, 50, 0.0) == 0.0
+
+
+def test_events_metrics_and_prometheus_export(caplog):
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep, margin=0)
+    route = paged_route(clock, pages=3, limit=1)
+    # another consumer used up the quota, the limiter only learns it from the 429
+    route({})
+
+    instrumentation = Instrumentation()
+    retries = []
+    instrumentation.on("retry", retries.append)
+    instrumentation.on("*", LogHook())
+
+    with FakeAPI({"/2/tweets/search/all": route}) as api, caplog.at_level(logging.DEBUG, "search_client"):
+        client = SearchClient("token", base_url=api.base_url, rate_limiter=limiter, instrumentation=instrumentation)
+        with instrumentation.measure() as crawl:
+            tweets = client.get_all_tweets(["q"], tweet_only=True, max_page=None)
+        client.get_all_tweets(["q"], tweet_only=True, max_page=1)
+
+    assert len(tweets) == 3
+    assert [(e.status, e.attempt, e.seconds) for e in retries] == [(429, 1, 900)]
+
+    summary = crawl.summary()
+    assert (summary["requests"], summary["errors"], summary["retries"]) == (4, 1, 1)
+    assert (summary["pages"], summary["tweets"]) == (3, 3)
+    # waited for the reset after the 429, then before each of the 2 next pages
+    assert summary["sleep_seconds"] == 3 * 900
+    assert 0 < summary["latency_p50"] <= summary["latency_p99"]
+    assert instrumentation.metrics.summary("search/all")["requests"] == 5
+
+    text = instrumentation.metrics.to_prometheus()
+    assert 'search_client_requests_total{endpoint="search/all",status="200"} 4' in text
+    assert 'search_client_request_duration_seconds_count{endpoint="search/all"} 5' in text
+    assert "# TYPE search_client_request_duration_seconds histogram" in text
+    assert any('"name": "request_end"' in r.message for r in caplog.records)
+
+
+def test_summary_without_requests():
+    instrumentation = Instrumentation()
+    with instrumentation.measure() as crawl:
+        pass
+
+    assert crawl.summary()["requests"] == 0
+    assert crawl.summary()["latency_p99"] == 0.0
+    assert instrumentation.metrics.summary("search/all")["latency_p50"] == 0.0
+
+
+def test_disabled_by_default():
+    with FakeAPI({"/2/tweets": lambda params: (200, {}, {"data": []})}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        client.get_tweet_info("1")
+    assert client.instrumentation is None
@@ -0,0 +1,35 @@
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+
+
+def users_route(params):
+    ids = params["ids"].split(",")
+    assert len(ids) <= 100 and len(set(ids)) == len(ids)
+    data = [{"id": i, "username": f"user{i}"} for i in ids if int(i) % 50]
+    errors = [{"value": i, "detail": "Could not find user", "title": "Not Found Error"} for i in ids if not int(i) % 50]
+    return 200, {}, {"data": data, "errors": errors}
+
+
+def test_lookup_users_batches_and_keeps_order():
+    ids = [str(i) for i in range(1, 251)] * 4 + [7]
+    with FakeAPI({"/2/users": users_route}) as api:
+        results = SearchClient("token", base_url=api.base_url).lookup_users(ids)
+
+    assert len(api.requests) == 3
+    assert [r.key for r in results] == [str(i) for i in ids]
+    assert results[0].data["username"] == "user1" and results[-1].data["username"] == "user7"
+    assert results[49].error["title"] == "Not Found Error" and not results[49].ok
+
+
+def test_lookup_by_username_and_failed_chunk():
+    def by_username(params):
+        return 200, {}, {"data": [{"id": "1", "username": "Dev"}]}
+
+    with FakeAPI({"/2/users/by": by_username, "/2/tweets": lambda p: (401, {}, {"title": "Unauthorized"})}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        users = client.lookup_users(["dev", "DEV", "gone"], by="username")
+        tweets = client.lookup_tweets(["1", "2"])
+
+    assert [u.ok for u in users] == [True, True, False]
+    assert api.requests[0][1]["usernames"] == "dev,gone"
+    assert [t.error["title"] for t in tweets] == ["Unauthorized", "Unauthorized"]
@@ -0,0 +1,75 @@
+import json
+import tracemalloc
+
+from search_client.models import Tweet, User
+from search_client.page import Page
+
+RESPONSE = {
+    "data": [
+        {
+            "id": "2",
+            "text": "hello #dev @api",
+            "author_id": "10",
+            "attachments": {"media_keys": ["3_1"], "poll_ids": ["7"]},
+            "geo": {"place_id": "p1"},
+            "referenced_tweets": [{"type": "quoted", "id": "1"}],
+            "entities": {"hashtags": [{"start": 6, "end": 10, "tag": "dev"}], "mentions": [{"username": "api"}]},
+            "public_metrics": {"retweet_count": 1, "reply_count": 0, "like_count": 5, "quote_count": 0},
+        }
+    ],
+    "includes": {
+        "users": [{"id": "10", "username": "dev", "public_metrics": {"followers_count": 20000}}],
+        "media": [{"media_key": "3_1", "type": "photo"}],
+        "places": [{"id": "p1", "full_name": "Manila"}],
+        "polls": [{"id": "7", "voting_status": "closed", "options": []}],
+        "tweets": [{"id": "1", "text": "quoted", "author_id": "10"}],
+    },
+}
+
+
+def test_includes_resolved_by_id():
+    (tweet,) = Page(RESPONSE).tweets()
+    assert tweet.like_count == 5 and tweet.public_metrics["retweet_count"] == 1
+    assert tweet.author.username == "dev" and tweet.author.followers_count == 20000
+    assert [m.type for m in tweet.media] == ["photo"]
+    assert tweet.place.full_name == "Manila"
+    assert tweet.poll.voting_status == "closed"
+    assert tweet.referenced[0].text == "quoted" and tweet.referenced[0].author is tweet.author
+
+
+def test_lazy_fields_and_round_trip():
+    tweet = Tweet.from_dict(RESPONSE["data"][0])
+    assert isinstance(tweet._entities, dict)
+    assert tweet.entities.tags == ["dev"] and tweet.entities.usernames == ["api"]
+    assert tweet.author is None and tweet.media == []
+    assert tweet.to_dict() == RESPONSE["data"][0]
+    assert not hasattr(tweet, "__dict__")
+    assert User.from_dict({"id": "1"}).to_dict() == {"id": "1"}
+
+
+def test_models_are_smaller_than_dicts():
+    tweet = {
+        "id": "1445880548472328192",
+        "text": "a",
+        "author_id": "2244994945",
+        "conversation_id": "1445880548472328192",
+        "created_at": "2021-10-06T22:41:43.000Z",
+        "lang": "en",
+        "public_metrics": {"retweet_count": 1, "reply_count": 2, "like_count": 3, "quote_count": 4},
+    }
+    payload = json.dumps([tweet] * 5_000)
+
+    tracemalloc.start()
+    try:
+        dicts = json.loads(payload)
+        dict_size = tracemalloc.get_traced_memory()[0]
+        del dicts
+
+        start = tracemalloc.get_traced_memory()[0]
+        models = [Tweet.from_dict(t) for t in json.loads(payload)]
+        model_size = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+
+    assert len(models) == 5_000
+    assert model_size < 0.75 * dict_size
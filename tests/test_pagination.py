@@ -0,0 +1,43 @@
+import types
+
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+
+
+def search_route(pages):
+    def route(params):
+        page = int(params.get("next_token", 0))
+        size = int(params["max_results"])
+        meta = {"result_count": size}
+        if page + 1 < pages:
+            meta["next_token"] = str(page + 1)
+        return 200, {}, {"data": [{"id": str(page * 1000 + i), "text": ""} for i in range(size)], "meta": meta}
+
+    return route
+
+
+def test_iter_pages_is_lazy_and_resumable():
+    with FakeAPI({"/2/tweets/search/all": search_route(pages=5)}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        pages = client.iter_pages(["q"], archive=True)
+        assert isinstance(pages, types.GeneratorType)
+        assert api.requests == []
+
+        first, second = next(pages), next(pages)
+        assert (first.number, first.next_token, second.next_token) == (1, "1", "2")
+        pages.close()
+        assert len(api.requests) == 2
+
+        # resume from the cursor of the last processed page
+        resumed = list(client.iter_pages(["q"], archive=True, next_token=second.next_token))
+        assert [p.data[0]["id"] for p in resumed] == ["2000", "3000", "4000"]
+        assert resumed[-1].next_token is None
+
+
+def test_limit_trims_last_page():
+    with FakeAPI({"/2/tweets/search/recent": search_route(pages=5)}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        tweets = client.get_tweets(["q"], number_of_tweets=130)
+
+    assert len(tweets) == 130
+    assert [r[1]["max_results"] for r in api.requests] == ["100", "30"]
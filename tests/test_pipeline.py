@@ -0,0 +1,72 @@
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.mock_api import FakeAPI, make_tweet, twitter_routes
+from search_client import SearchClient
+from search_client.client import APIError
+from search_client.database import TweetStore
+from search_client.pipeline import ParsePipeline
+from search_client.save import CSVSink, JSONLinesSink
+
+
+def test_crawl_writes_every_sink_in_page_order(tmp_path):
+    csv_path = str(tmp_path / "tweets.csv")
+    with FakeAPI(twitter_routes(pages=6)) as api, SearchClient("token", base_url=api.base_url) as client:
+        with TweetStore(str(tmp_path / "tweets.db")) as store, CSVSink(csv_path) as sink:
+            with ParsePipeline([store, sink], workers=2, max_in_flight=3) as pipeline:
+                stats = pipeline.crawl(client, ["q"], max_results=20)
+            assert store.conn.execute("select count(*) from TweetMetrics").fetchone() == (120,)
+
+    assert (stats.pages, stats.tweets) == (6, 120)
+    with open(csv_path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [int(r["id"]) for r in rows] == list(range(120, 0, -1))
+    assert rows[0]["public_metrics.like_count"] == str(120 % 11)
+
+
+def test_crawl_raises_on_error_response(tmp_path):
+    routes = twitter_routes(pages=6)
+    search = routes["/2/tweets/search/recent"]
+
+    def route(params):
+        if params.get("next_token") == "2":
+            return 400, {}, {"title": "Invalid Request", "detail": "invalid next_token"}
+        return search(params)
+
+    routes["/2/tweets/search/recent"] = route
+    with FakeAPI(routes) as api, SearchClient("token", base_url=api.base_url) as client:
+        with CSVSink(str(tmp_path / "tweets.csv")) as sink, ParsePipeline([sink], workers=1) as pipeline:
+            with pytest.raises(APIError, match="invalid next_token") as info:
+                pipeline.crawl(client, ["q"], max_results=20)
+
+    assert (info.value.endpoint, info.value.status) == ("search/recent", 400)
+
+
+class Recorder(JSONLinesSink):
+    def __init__(self, filename, fetched):
+        super().__init__(filename)
+        self.fetched = fetched
+        self.lag = []
+
+    def write_rows(self, rows):
+        self.lag.append(len(self.fetched) - self.count // 10)
+        super().write_rows(rows)
+
+
+def test_in_flight_pages_are_bounded(tmp_path):
+    fetched = []
+
+    def contents():
+        for i in range(20):
+            fetched.append(i)
+            yield json.dumps({"data": [make_tweet(i * 10 + j) for j in range(10)]}).encode()
+
+    sink = Recorder(str(tmp_path / "tweets.jsonl"), fetched)
+    with ThreadPoolExecutor(4) as executor, sink:
+        ParsePipeline([sink], max_in_flight=4, executor=executor).run(contents())
+
+    assert sink.count == 200
+    assert max(sink.lag) <= 4
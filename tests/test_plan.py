@@ -0,0 +1,91 @@
+import csv
+
+import pytest
+
+from benchmarks.mock_api import FakeAPI, twitter_routes
+from search_client import SearchClient
+from search_client.client import APIError
+from search_client.database import STORE_PROJECTION, TweetStore
+from search_client.instrumentation import Instrumentation
+from search_client.plan import CrawlPlan, Projection, plan_crawl
+from search_client.save import CSVSink, JSONLinesSink
+
+
+def projected_routes():
+    """Search routes that, like the API, only return the tweet fields asked for"""
+    routes = twitter_routes(pages=10)
+    search = routes["/2/tweets/search/recent"]
+
+    def projected(params):
+        status, headers, body = search(params)
+        keep = {"id", "text", *params.get("tweet.fields", "").split(",")}
+        body["data"] = [{k: v for k, v in t.items() if k in keep} for t in body["data"]]
+        return status, headers, body
+
+    return {**routes, "/2/tweets/search/recent": projected}
+
+
+def test_page_sizes():
+    plan = plan_crawl(1234, archive=True)
+    assert plan.page_sizes == [500, 500, 234]
+    assert (plan.requests, plan.requests_saved) == (3, 121)
+    assert plan_crawl(95).page_sizes == [95]
+    assert plan_crawl(1005).page_sizes == [100] * 10 + [10]
+    assert plan_crawl().params() == {"archive": False, "max_results": 100, "limit": None}
+
+
+def test_projection_of_sinks(tmp_path):
+    fields = ["id", "text", "created_at", "public_metrics.like_count"]
+    with CSVSink(str(tmp_path / "t.csv"), fields=fields) as sink, TweetStore(":memory:") as store:
+        assert plan_crawl(sinks=[sink]).projection == Projection(tweet_fields=("created_at", "public_metrics"))
+        union = plan_crawl(sinks=[sink, store]).projection
+        assert set(union.tweet_fields) == set(STORE_PROJECTION.tweet_fields)
+        assert union.expansions == STORE_PROJECTION.expansions
+        with JSONLinesSink(str(tmp_path / "t.jsonl")) as jsonl:
+            # a sink storing everything leaves the fields to the caller
+            assert plan_crawl(sinks=[sink, jsonl]).projection is None
+
+    extra = Projection(expansions=("author_id",))
+    assert plan_crawl(projection=extra).params()["expansions"] == ["author_id"]
+
+
+def test_run_trims_pages_and_fields(tmp_path):
+    with FakeAPI(projected_routes()) as api, SearchClient("token", base_url=api.base_url) as client:
+        with CSVSink(str(tmp_path / "t.csv"), fields=["id", "created_at", "public_metrics.like_count"]) as sink:
+            plan = plan_crawl(250, sinks=[sink])
+            stats = plan.run(client, ["q"], sinks=[sink])
+        full = CrawlPlan(limit=250)
+        list(full.iter_pages(client, ["q"], tweet_fields=list(STORE_PROJECTION.tweet_fields)))
+
+    assert [r[1]["max_results"] for r in api.requests[:3]] == ["100", "100", "50"]
+    assert api.requests[0][1]["tweet.fields"] == "created_at,public_metrics"
+    assert (stats.requests, stats.tweets, stats.requests_saved) == (3, 250, 22)
+    assert stats.bytes_per_tweet < full.stats.bytes_per_tweet
+
+    with open(tmp_path / "t.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 251 and rows[1][1] == "2022-01-01T00:00:00.000Z"
+
+
+def test_run_goes_through_the_client_and_raises_on_errors(tmp_path):
+    routes = projected_routes()
+    search = routes["/2/tweets/search/recent"]
+
+    def failing(params):
+        if params.get("next_token") == "2":
+            return 400, {}, {"title": "Invalid Request", "detail": "invalid next_token"}
+        return search(params)
+
+    routes["/2/tweets/search/recent"] = failing
+    instrumentation = Instrumentation()
+    with FakeAPI(routes) as api:
+        client = SearchClient("token", base_url=api.base_url, instrumentation=instrumentation)
+        with JSONLinesSink(str(tmp_path / "t.jsonl")) as sink:
+            plan = plan_crawl(500, sinks=[sink])
+            with pytest.raises(APIError, match="invalid next_token"):
+                plan.run(client, ["q"], sinks=[sink])
+            assert sink.count == 200
+
+    summary = instrumentation.metrics.summary("search/recent")
+    assert (summary["requests"], summary["errors"], summary["pages"]) == (3, 1, 2)
+    assert (plan.stats.requests, plan.stats.tweets) == (2, 200)
@@ -0,0 +1,56 @@
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.query import AhoCorasick, Rule, RuleMatcher, pack_rules
+
+
+def test_pack_rules_stays_under_the_length_limit():
+    rules = [Rule(f"r{i}", keywords=[f"keyword{i}"], exclude=["spam"]) for i in range(60)]
+    batches = pack_rules(rules, max_length=200, common=["-is:retweet", "lang:en"])
+
+    assert all(len(b.query) <= 200 for b in batches)
+    assert all(b.query.endswith(") -is:retweet lang:en") for b in batches)
+    assert sorted(r.tag for b in batches for r in b.rules) == sorted(r.tag for r in rules)
+    # 8 clauses of 17 characters fit alongside the suffix, the shorter single digit ones fill the gaps
+    assert len(batches) == 8
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert sorted(automaton.find("ushers")) == [(3, "he"), (3, "she"), (5, "hers")]
+
+
+def test_rule_matcher_routes_by_whole_words():
+    rules = [
+        Rule("py", keywords=["python"], exclude=["snake"]),
+        Rule("ml", any_of=["machine learning", "pytorch"], retweets=False),
+        Rule("dev", hashtags=["#dev"], authors=["TwitterDev"]),
+    ]
+    matcher = RuleMatcher(rules)
+
+    assert matcher.match({"text": "Python and PyTorch"}) == ["py", "ml"]
+    assert matcher.match({"text": "pythonic code"}) == []
+    assert matcher.match({"text": "a python is a snake"}) == []
+    retweet = {"text": "machine learning", "referenced_tweets": [{"type": "retweeted", "id": "1"}]}
+    assert matcher.match(retweet) == []
+    assert matcher.match({"text": "hi #dev"}, author="twitterdev") == ["dev"]
+    assert matcher.match({"text": "hi #dev"}, author="someone") == []
+
+
+def test_iter_rule_matches_packs_queries_and_routes_tweets():
+    def route(params):
+        data = [
+            {"id": "1", "text": "I like python", "author_id": "10"},
+            {"id": "2", "text": "Rust rocks", "author_id": "11"},
+        ]
+        users = [{"id": "10", "username": "alice"}, {"id": "11", "username": "bob"}]
+        return 200, {}, {"data": data, "includes": {"users": users}, "meta": {"result_count": 2}}
+
+    rules = [Rule("py", keywords=["python"]), Rule("rs", keywords=["rust"], authors=["bob"])]
+    with FakeAPI({"/2/tweets/search/recent": route}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        matches = list(client.iter_rule_matches(rules, common=["-is:retweet"]))
+
+    assert len(api.requests) == 1
+    assert api.requests[0][1]["query"] == "((rust from:bob) OR python) -is:retweet"
+    assert "author_id" in api.requests[0][1]["expansions"]
+    assert [(t["id"], tags) for t, tags in matches] == [("1", ["py"]), ("2", ["rs"])]
@@ -0,0 +1,79 @@
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.ratelimit import RateLimiter, endpoint_key
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def paged_route(clock, pages, limit=2, window=900):
+    """Serve `pages` pages with a quota of `limit` requests per window, 429 once exceeded"""
+    state = {"reset": clock.now + window, "used": 0}
+
+    def route(params):
+        if clock.now >= state["reset"]:
+            state["reset"], state["used"] = clock.now + window, 0
+
+        headers = {
+            "x-rate-limit-limit": limit,
+            "x-rate-limit-reset": int(state["reset"]),
+        }
+        if state["used"] >= limit:
+            return 429, {**headers, "x-rate-limit-remaining": 0}, {"title": "Too Many Requests"}
+
+        state["used"] += 1
+        page = int(params.get("next_token", 0))
+        meta = {"result_count": 1}
+        if page + 1 < pages:
+            meta["next_token"] = str(page + 1)
+        headers["x-rate-limit-remaining"] = limit - state["used"]
+        return 200, headers, {"data": [{"id": str(page), "text": ""}], "meta": meta}
+
+    return route
+
+
+def test_endpoint_key():
+    assert endpoint_key("https://api.twitter.com/2/tweets/search/all") == "search/all"
+    assert endpoint_key("http://127.0.0.1:80/2/tweets/counts/all") == "counts/all"
+    assert endpoint_key("https://api.twitter.com/2/users/by/username/TwitterDev") == "users/by"
+    assert endpoint_key("https://api.twitter.com/2/tweets") == "tweets"
+
+
+def test_only_blocks_when_budget_exhausted():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep, margin=0)
+    routes = {"/2/tweets/search/all": paged_route(clock, pages=5)}
+
+    with FakeAPI(routes) as api, SearchClient("token", base_url=api.base_url, rate_limiter=limiter) as client:
+        tweets = client.get_all_tweets(["q"], tweet_only=True, max_page=None)
+
+    assert [t["id"] for t in tweets] == ["0", "1", "2", "3", "4"]
+    # 2 requests per window: waits only twice, each time until the reset
+    assert clock.sleeps == [900, 900]
+    assert len(api.requests) == 5
+
+
+def test_429_waits_for_reset():
+    clock = FakeClock()
+    limiter = RateLimiter(clock=clock, sleep=clock.sleep, margin=0)
+    route = paged_route(clock, pages=3, limit=1)
+    # another consumer used up the quota, the limiter only learns it from the 429
+    route({})
+
+    with FakeAPI({"/2/tweets/search/recent": route}) as api:
+        client = SearchClient("token", base_url=api.base_url, rate_limiter=limiter)
+        tweets = client.get_recent_tweets(["q"], tweet_only=True, max_page=1)
+
+    assert tweets == [{"id": "0", "text": ""}]
+    assert clock.sleeps == [900]
+    assert limiter.bucket("search/recent").remaining == 0
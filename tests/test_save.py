@@ -0,0 +1,132 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from search_client.page import Page
+from search_client.save import (
+    CSVSink,
+    JSONLinesSink,
+    ParquetSink,
+    Sink,
+    jsonl_lines,
+    write_to_csv,
+    write_to_json,
+)
+
+
+def pages():
+    yield Page({"data": [{"id": "1", "text": "a", "public_metrics": {"like_count": 1}}]})
+    yield {"data": [{"id": "2", "text": "b,\nc", "lang": "en"}]}
+    yield Page({"meta": {"result_count": 0}})
+
+
+def test_jsonl_sink_appends_valid_lines(tmp_path):
+    path = str(tmp_path / "tweets.jsonl.gz")
+    with JSONLinesSink(path) as sink:
+        assert sink.write_pages(pages()) == 2
+    with JSONLinesSink(path, append=True) as sink:
+        sink.write_tweets([{"id": "3", "text": "é"}])
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["id"] for line in f] == ["1", "2", "3"]
+
+
+def test_zstd_sink(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    path = str(tmp_path / "tweets.jsonl.zst")
+    with JSONLinesSink(path) as sink:
+        sink.write_pages(pages())
+
+    with zstandard.open(path, "rt") as f:
+        assert len(f.readlines()) == 2
+
+
+def test_csv_sink_flattens_declared_schema(tmp_path):
+    path = str(tmp_path / "tweets.csv")
+    with CSVSink(path, fields=["id", "text", "lang", "public_metrics.like_count"]) as sink:
+        sink.write_pages(pages())
+    with CSVSink(path, fields=["id", "text", "lang", "public_metrics.like_count"], append=True) as sink:
+        sink.write_tweets([{"id": "3", "text": "c", "extra": "dropped"}])
+
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0] == {"id": "1", "text": "a", "lang": "", "public_metrics.like_count": "1"}
+    assert rows[1]["text"] == "b,\nc" and rows[1]["lang"] == "en"
+    assert len(rows) == 3
+
+
+def test_write_to_csv_uses_every_key(tmp_path):
+    path = str(tmp_path / "tweets.csv")
+    write_to_csv([{"id": "1", "public_metrics": {"like_count": 1}}, {"id": "2", "lang": "en"}], path)
+
+    with open(path, newline="") as f:
+        assert list(csv.reader(f)) == [["id", "public_metrics.like_count", "lang"], ["1", "1", ""], ["2", "", "en"]]
+
+
+def test_write_to_json_append_stays_valid(tmp_path):
+    path = str(tmp_path / "tweets.json")
+    write_to_json([], path)
+    write_to_json([{"id": "1"}], path, append=True)
+    write_to_json([{"id": "2"}, {"id": "3"}], path, append=True)
+
+    with open(path) as f:
+        assert f.read() == json.dumps([{"id": "1"}, {"id": "2"}, {"id": "3"}], indent=4)
+
+
+def test_write_to_json_rejects_unserializable(tmp_path):
+    with pytest.raises(TypeError):
+        write_to_json([{"id": "1", "entities": {("hashtags", 1)}}], str(tmp_path / "tweets.json"))
+
+
+def test_parquet_sink_typed_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "tweets.parquet")
+    tweet = {
+        "id": "1445880548472328192",
+        "text": "a",
+        "created_at": "2021-10-06T22:41:43.000Z",
+        "author_id": "2244994945",
+        "entities": {"hashtags": [{"tag": "dev"}]},
+        "public_metrics": {"retweet_count": 1, "like_count": 2},
+    }
+    fields = ["text", "created_at", "author_id", "entities", "public_metrics"]
+    with ParquetSink(path, fields=fields, row_group_size=2) as sink:
+        assert sink.write_pages([{"data": [tweet] * 3}, Page({"data": [tweet]})]) == 4
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 2
+    table = pq.read_table(path, columns=["id", "created_at", "public_metrics.like_count", "entities"])
+    row = table.to_pylist()[0]
+    assert row["id"] == 1445880548472328192
+    assert row["created_at"].year == 2021 and str(table.schema.field("created_at").type) == "timestamp[ms, tz=UTC]"
+    assert row["public_metrics.like_count"] == 2
+    assert json.loads(row["entities"]) == tweet["entities"]
+
+
+def test_parquet_user_sink(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "users.parquet")
+    page = {"data": [], "includes": {"users": [{"id": "1", "username": "dev", "public_metrics": {"followers_count": 3}}]}}
+    with ParquetSink(path, kind="user", fields=["username", "public_metrics"]) as sink:
+        sink.write_page(page)
+
+    assert pq.read_table(path).to_pylist() == [
+        {
+            "id": 1,
+            "username": "dev",
+            "public_metrics.followers_count": 3,
+            "public_metrics.following_count": None,
+            "public_metrics.tweet_count": None,
+            "public_metrics.listed_count": None,
+        }
+    ]
+
+
+def test_sink_must_write_rows(tmp_path):
+    class Incomplete(Sink):
+        transform = staticmethod(jsonl_lines)
+
+    with pytest.raises(TypeError):
+        Incomplete(str(tmp_path / "tweets.jsonl"))
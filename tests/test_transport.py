@@ -0,0 +1,43 @@
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.transport import Transport
+
+
+def user_route(params):
+    names = params["usernames"].split(",")
+    return 200, {}, {"data": [{"id": str(i), "username": n} for i, n in enumerate(names)]}
+
+
+def test_endpoints_share_pooled_connection():
+    routes = {
+        "/2/users/by": user_route,
+        "/2/tweets": lambda params: (200, {}, {"data": [{"id": params["ids"]}]}),
+    }
+    with FakeAPI(routes) as api, SearchClient("token", base_url=api.base_url) as client:
+        assert client.get_users(["a", "b"])["data"][1]["username"] == "b"
+        assert client.get_tweet_info("1")["data"] == [{"id": "1"}]
+        client.get_users("c")
+
+    assert len(api.requests) == 3
+    assert len(api.connections) == 1
+    assert api.requests[0][2]["Authorization"] == "Bearer token"
+
+
+def test_retries_server_errors():
+    calls = []
+
+    def flaky(params):
+        calls.append(params)
+        if len(calls) < 3:
+            return 503, {}, {"title": "Service Unavailable"}
+        return 200, {}, {"data": []}
+
+    transport = Transport(backoff_factor=0)
+    with FakeAPI({"/2/tweets": flaky}) as api, transport:
+        client = SearchClient("token", transport=transport, base_url=api.base_url)
+        assert client.get_tweet_info("1") == {"data": []}
+        # injected transports are not closed by the client
+        client.close()
+        assert client.get_tweet_info("1") == {"data": []}
+
+    assert len(calls) == 4
@@ -0,0 +1,80 @@
+import asyncio
+
+from benchmarks.mock_api import FakeAPI
+from search_client import SearchClient
+from search_client.database import CheckpointStore
+from search_client.watch import Watcher
+from tests.test_ratelimit import FakeClock
+
+
+def live_route(clock, per_second):
+    """Each query produces `per_second` tweets per second with increasing ids"""
+
+    def route(params):
+        rate = per_second[params["query"]]
+        newest = int(clock.now * rate)
+        since = int(params.get("since_id") or newest - 10)
+        ids = list(range(newest, since, -1))
+        data = [{"id": str(i), "text": params["query"]} for i in ids]
+        return 200, {}, {"data": data, "meta": {"result_count": len(data)}}
+
+    return route
+
+
+def test_polls_since_newest_and_adapts_interval(tmp_path):
+    clock = FakeClock(now=1_000.0)
+    rates = {"busy": 10, "quiet": 0.01}
+    store = CheckpointStore(str(tmp_path / "watch.db"))
+
+    with FakeAPI({"/2/tweets/search/recent": live_route(clock, rates)}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        watcher = client.watch(["busy"], interval=60, store=store, clock=clock, sleep=clock.sleep, target_per_poll=100)
+        quiet = watcher.add(["quiet"], interval=60)
+        seen = []
+        watcher.run(lambda query, tweets: seen.extend(int(t["id"]) for t in tweets), max_polls=12)
+
+    busy = watcher.queries[0]
+    assert len(seen) == len(set(seen))
+    assert all(r[1].get("since_id") for r in api.requests[2:])
+    assert busy.interval == 10
+    assert quiet.interval > busy.interval
+    assert busy.polls > quiet.polls
+
+    # a new watcher continues after the newest stored id
+    assert Watcher(client, store=store).add(["busy"]).since_id == busy.since_id
+
+
+def test_async_iteration():
+    clock = FakeClock(now=1_000.0)
+
+    async def main(client):
+        watcher = Watcher(client, clock=clock)
+        watcher.add(["busy"])
+        polls = []
+        async for query, tweets in watcher:
+            polls.append(len(tweets))
+            clock.now += 60
+            if len(polls) == 2:
+                return polls
+
+    with FakeAPI({"/2/tweets/search/recent": live_route(clock, {"busy": 1})}) as api:
+        polls = asyncio.run(main(SearchClient("token", base_url=api.base_url)))
+
+    assert polls == [10, 60]
+
+
+def test_first_poll_is_one_page():
+    def route(params):
+        page = int(params.get("next_token", 0))
+        size = int(params["max_results"])
+        data = [{"id": str(10_000 - page * size - i), "text": ""} for i in range(size)]
+        return 200, {}, {"data": data, "meta": {"result_count": size, "next_token": str(page + 1)}}
+
+    with FakeAPI({"/2/tweets/search/recent": route}) as api:
+        client = SearchClient("token", base_url=api.base_url)
+        watcher = Watcher(client)
+        watched = watcher.add(["backlog"], max_results=10)
+        tweets = watcher.poll(watched)
+
+    assert len(tweets) == 10 and watched.since_id == "10000"
+    assert [r[1]["max_results"] for r in api.requests] == ["10"]